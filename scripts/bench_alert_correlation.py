@@ -0,0 +1,133 @@
+"""告警关联吞吐基准
+
+模拟告警风暴：少量根因 (服务 x 主告警名) 在多个 Pod 上反复触发，部分告警为同一服务的
+伴随告警 (其他告警名)，另混入一定比例的
+零散独立告警，按给定速率 (默认 10k 条/分钟) 打上时间戳，依次喂给 ``AlertCorrelator``，输出：
+
+- alerts_per_second: 处理吞吐 (含新建事件的 ``create_initial_state``)
+- ingest_us_p50 / p99: 单条告警处理耗时
+- incidents: 创建的事件数 (即需要启动的 Graph 数)，对照 naive_incidents (逐条建事件)
+- reduction: 告警数 / 事件数
+
+用法:
+    uv run python -m scripts.bench_alert_correlation --alerts 100000 --rate 10000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import string
+import time
+
+from src.sre.agents.shared.correlation import AlertCorrelator
+from src.sre.agents.shared.state import Severity
+
+T0 = 1_700_000_000.0
+ALERTNAMES = [
+    "HighErrorRate",
+    "HighLatency",
+    "PodCrashLooping",
+    "CPUThrottling",
+    "MemoryPressure",
+    "DiskFull",
+]
+SEVERITIES = [Severity.LOW, Severity.MEDIUM, Severity.HIGH, Severity.CRITICAL]
+
+
+def pod_name(rng: random.Random, service: str, replicaset: str) -> str:
+    return f"{service}-{replicaset}-{''.join(rng.choices(string.ascii_lowercase + string.digits, k=5))}"
+
+
+def generate(args: argparse.Namespace) -> list[dict]:
+    rng = random.Random(args.seed)
+    roots = [
+        (f"svc-{i}", f"ns-{i % 8}", rng.choice(ALERTNAMES), f"{rng.getrandbits(40):010x}")
+        for i in range(args.roots)
+    ]
+    pods = {root: [pod_name(rng, root[0], root[3]) for _ in range(args.pods)] for root in roots}
+    interval = 60.0 / args.rate
+    alerts = []
+    for k in range(args.alerts):
+        if rng.random() < args.noise:
+            # 零散告警：每条都是独立的服务
+            service = f"batch-{k}"
+            labels = {"alertname": rng.choice(ALERTNAMES), "namespace": "jobs", "service": service}
+            resource = service
+        else:
+            root = rng.choice(roots)
+            service, namespace, alertname, _ = root
+            if rng.random() < args.related:
+                alertname = rng.choice(ALERTNAMES)
+            resource = rng.choice(pods[root])
+            labels = {
+                "alertname": alertname,
+                "namespace": namespace,
+                "service": service,
+                "pod": resource,
+                "instance": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}:9090",
+            }
+        alerts.append(
+            {
+                "source": "prometheus",
+                "severity": rng.choice(SEVERITIES),
+                "title": labels["alertname"],
+                "description": f"value={rng.random() * 100:.2f}",
+                "resource": resource,
+                "labels": labels,
+                "timestamp": T0 + k * interval,
+            }
+        )
+    return alerts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument(
+        "--rate", type=float, default=10_000, help="告警速率 (条/分钟)，决定时间戳间隔"
+    )
+    parser.add_argument("--roots", type=int, default=20, help="根因数")
+    parser.add_argument("--pods", type=int, default=30, help="每个根因涉及的 Pod 数")
+    parser.add_argument("--related", type=float, default=0.2, help="根因告警中伴随告警的比例")
+    parser.add_argument("--noise", type=float, default=0.01, help="零散独立告警比例")
+    parser.add_argument("--window-seconds", type=float, default=300)
+    parser.add_argument("--max-lifetime-seconds", type=float, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    alerts = generate(args)
+    correlator = AlertCorrelator(
+        window_seconds=args.window_seconds, max_lifetime_seconds=args.max_lifetime_seconds
+    )
+    latencies = []
+    start = time.perf_counter()
+    for alert in alerts:
+        begin = time.perf_counter()
+        correlator.ingest(alert)
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    stats = correlator.stats
+    report = {
+        "config": vars(args),
+        "alerts_per_second": round(len(alerts) / elapsed),
+        "realtime_headroom": round(len(alerts) / elapsed / (args.rate / 60), 1),
+        "ingest_us_p50": round(statistics.median(latencies) * 1e6, 1),
+        "ingest_us_p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "naive_incidents": len(alerts),
+        "incidents": stats["incidents"],
+        "duplicates": stats["duplicates"],
+        "correlated": stats["correlated"],
+        "expired": stats["expired"],
+        "open_incidents": len(correlator.groups),
+        "reduction": round(len(alerts) / max(stats["incidents"], 1), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""IVF 近似最近邻索引基准
+
+以精确内积检索为基准，报告不同 nprobe 下的 recall@k 与单查询 QPS。
+默认使用合成的高斯混合向量；传 --kb 时改用已导入知识库的真实向量。
+
+用法:
+    uv run python -m scripts.bench_ann --vectors 200000 --k 10
+    uv run python -m scripts.bench_ann --kb data/kb --nprobe 4 8 16 32
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from src.app.services.local_kb.ann import IVFIndex
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)]
+    vectors += 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def timed(fn, queries: np.ndarray) -> tuple[list, float]:
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000, help="合成数据的混合成分数")
+    parser.add_argument("--kb", default="", help="使用该知识库目录下的 embeddings.npy")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="簇数，默认 sqrt(N)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.kb:
+        vectors = np.load(f"{args.kb}/embeddings.npy", mmap_mode="r")
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim, args.clusters, args.seed)
+
+    rng = np.random.default_rng(args.seed + 1)
+    # 查询取库内向量加噪声，模拟与某些文档相近的问题
+    queries = np.asarray(vectors[rng.choice(len(vectors), args.queries, replace=False)])
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    truth, exact_qps = timed(lambda q: exact_top_k(vectors, q, args.k), queries)
+    report: dict = {"vectors": len(vectors), "k": args.k, "exact": {"qps": round(exact_qps, 1)}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        IVFIndex.build(vectors, tmp, nlist=args.nlist, seed=args.seed)
+        report["build_seconds"] = round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        index = IVFIndex(tmp)
+        report["load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        report["nlist"] = index.nlist
+
+        report["ivf"] = []
+        for nprobe in args.nprobe:
+            hits, qps = timed(lambda q, n=nprobe: index.search(q, args.k, nprobe=n), queries)
+            recall = np.mean(
+                [
+                    len({i for i, _ in found} & set(expected.tolist())) / args.k
+                    for found, expected in zip(hits, truth, strict=True)
+                ]
+            )
+            report["ivf"].append(
+                {"nprobe": nprobe, "recall": round(float(recall), 4), "qps": round(qps, 1)}
+            )
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
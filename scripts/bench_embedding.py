@@ -0,0 +1,97 @@
+"""批量向量化服务吞吐基准
+
+模拟大量并发协程各自请求少量文本（全部为不同文本，不命中缓存），
+对比不同 max_batch_size 下的吞吐 (texts/s) 与单请求 p95 延迟，以及线程池/进程池。
+
+用法:
+    uv run python -m scripts.bench_embedding --texts 20000 --concurrency 256
+    uv run python -m scripts.bench_embedding --executor process --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from src.app.services.embedding import HashingEmbedder
+from src.app.services.embedding_service import EmbeddingService
+
+
+def make_texts(count: int, offset: int) -> list[str]:
+    return [f"如何配置 service {offset + i} 的 timeout 与 retry 策略" for i in range(count)]
+
+
+async def run_case(args: argparse.Namespace, batch_size: int, offset: int) -> dict:
+    service = EmbeddingService(
+        HashingEmbedder(args.dim),
+        max_batch_size=batch_size,
+        max_wait_ms=args.max_wait_ms,
+        cache_max_entries=0,
+        executor=args.executor,
+        workers=args.workers,
+    )
+    texts = make_texts(args.texts, offset)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(text: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await service.embed(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await service.embed("warmup")
+    start = time.perf_counter()
+    await asyncio.gather(*(one(t) for t in texts))
+    elapsed = time.perf_counter() - start
+    stats = service.stats()
+    service.close()
+
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "throughput": round(len(texts) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "avg_batch": round(stats["avg_batch_size"], 1),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    # 基线：不经过服务，直接在事件循环里逐条同步计算
+    texts = make_texts(args.texts, 0)
+    direct = HashingEmbedder(args.dim)
+    start = time.perf_counter()
+    for text in texts:
+        direct.embed_one(text)
+    report: dict = {
+        "texts": args.texts,
+        "concurrency": args.concurrency,
+        "executor": args.executor,
+        "workers": args.workers,
+        "direct_throughput": round(args.texts / (time.perf_counter() - start), 1),
+        "cases": [],
+    }
+    for i, batch_size in enumerate(args.batch_sizes):
+        report["cases"].append(await run_case(args, batch_size, (i + 1) * args.texts))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 32, 64, 128])
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--dim", type=int, default=512)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""本地知识库检索延迟基准
+
+用合成语料构建索引，分别测量 BM25、向量、混合检索的 p50/p95 延迟。
+向量一路默认全量内积，延迟随块数线性增长，块数很大时是主要瓶颈；加 --ivf 改用 IVF 索引。
+
+用法:
+    uv run python -m scripts.bench_local_kb --chunks 100000 --queries 200
+    uv run python -m scripts.bench_local_kb --chunks 100000 --ivf --nprobe 8
+"""
+
+import argparse
+import itertools
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from src.app.services.local_kb import Chunk, LocalKnowledgeBase
+
+
+def synthetic_chunks(count: int, vocab_size: int, words: int, seed: int):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    # Zipf 分布近似真实语料的词频
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(vocab_size)))
+    for i in range(count):
+        yield Chunk(" ".join(rng.choices(vocab, cum_weights=cum_weights, k=words)), f"doc{i // 20}")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def measure(fn, queries: list[str]) -> dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--words", type=int, default=60, help="每块词数")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--ivf", action="store_true", help="向量一路使用 IVF 索引")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    queries = [
+        " ".join(f"w{int(rng.paretovariate(1.2)) % args.vocab}" for _ in range(4))
+        for _ in range(args.queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        kb = LocalKnowledgeBase.build(
+            synthetic_chunks(args.chunks, args.vocab, args.words, args.seed),
+            tmp,
+            dim=args.dim,
+            ivf_nlist=None if args.ivf else 0,
+        )
+        build_seconds = time.perf_counter() - start
+        if kb.ann is not None:
+            kb.ann.nprobe = args.nprobe
+
+        report = {
+            "chunks": len(kb),
+            "dim": args.dim,
+            "vector_index": "ivf" if args.ivf else "exact",
+            "build_seconds": round(build_seconds, 2),
+            "bm25": measure(lambda q: kb.search_bm25(q, 50), queries),
+            "vector": measure(lambda q: kb.search_vector(q, 50), queries),
+            "hybrid": measure(lambda q: kb.search(q, 5), queries),
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
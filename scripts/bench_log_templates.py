@@ -0,0 +1,178 @@
+"""日志模板挖掘吞吐基准
+
+用若干条带变量的日志模式（IP、端口、耗时、ID、路径、用户名等）生成合成日志，
+流式喂给 ``DrainParser``，输出：
+
+- lines_per_second: 吞吐 (含掩码)，分别测开启/关闭 token 序列缓存
+- templates / compression: 模板数与 行数/模板数
+- purity: 只包含单一来源模式的模板占比
+- fragmentation: 平均每个来源模式被拆成的模板数 (理想为 1)
+
+用法:
+    uv run python -m scripts.bench_log_templates --lines 100000 --patterns 200
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from datetime import datetime, timedelta
+
+from src.sre.analysis.log_templates import DrainParser
+
+SERVICES = ["api-gateway", "order-service", "payment", "inventory", "auth", "search", "notifier"]
+USERS = ["alice", "bob", "carol", "dave", "erin", "frank"]
+VERBS = ["GET", "POST", "PUT", "DELETE"]
+LEVELS = ["INFO", "WARN", "ERROR"]
+
+
+def ip(rng: random.Random) -> str:
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+FRAGMENTS: list[Callable[[random.Random], str]] = [
+    lambda r: f"from {ip(r)}:{r.randint(1024, 65535)}",
+    lambda r: f"after {r.randint(1, 30000)} ms",
+    lambda r: f"request_id={r.getrandbits(64):016x}",
+    lambda r: f"{r.choice(VERBS)} /api/v1/orders/{r.randint(1, 10**6)}",
+    lambda r: f"status {r.choice([200, 404, 500, 503])}",
+    lambda r: f"retry {r.randint(1, 5)} of 5",
+    lambda r: f"user {r.choice(USERS)}",
+    lambda r: f"size {r.randint(1, 4096)}kb",
+    lambda r: f"latency {r.random() * 1000:.2f}",
+]
+
+WORDS = [
+    "connection",
+    "timeout",
+    "refused",
+    "reset",
+    "pool",
+    "exhausted",
+    "cache",
+    "miss",
+    "hit",
+    "evicted",
+    "queue",
+    "full",
+    "lag",
+    "consumer",
+    "rebalance",
+    "leader",
+    "election",
+    "failed",
+    "succeeded",
+    "started",
+    "stopped",
+    "healthcheck",
+    "disk",
+    "memory",
+    "pressure",
+    "throttled",
+    "quota",
+    "exceeded",
+    "token",
+    "expired",
+    "invalid",
+    "schema",
+    "migration",
+    "deadlock",
+    "detected",
+    "replica",
+    "sync",
+    "snapshot",
+    "compaction",
+    "gc",
+    "pause",
+    "heartbeat",
+    "lost",
+    "restored",
+    "circuit",
+    "breaker",
+    "open",
+    "closed",
+]
+
+
+def make_patterns(count: int, seed: int) -> list[Callable[[random.Random], str]]:
+    """每个模式 = 固定的关键词序列 + 1~3 个变量片段"""
+    rng = random.Random(seed)
+    patterns = []
+    for _ in range(count):
+        service = rng.choice(SERVICES)
+        level = rng.choice(LEVELS)
+        words = " ".join(rng.sample(WORDS, rng.randint(3, 6)))
+        fragments = rng.sample(FRAGMENTS, rng.randint(1, 3))
+
+        def render(
+            r: random.Random, service=service, level=level, words=words, fragments=fragments
+        ) -> str:
+            return " ".join([level, f"[{service}]", words, *(f(r) for f in fragments)])
+
+        patterns.append(render)
+    return patterns
+
+
+def generate(lines: int, patterns: list, seed: int) -> Iterator[tuple[int, dict]]:
+    """按 Zipf 分布挑选模式，产出 (来源模式编号, 日志条目)"""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(patterns))]
+    choices = rng.choices(range(len(patterns)), weights=weights, k=lines)
+    start = datetime(2024, 1, 1)
+    for i, source in enumerate(choices):
+        yield (
+            source,
+            {"timestamp": start + timedelta(milliseconds=i), "message": patterns[source](rng)},
+        )
+
+
+def run(entries: list[tuple[int, dict]], cache_size: int) -> dict:
+    parser = DrainParser(cache_size=cache_size)
+    sources: dict[int, set[int]] = defaultdict(set)
+    start = time.perf_counter()
+    for _ in parser.parse(entry for _, entry in entries):
+        pass
+    elapsed = time.perf_counter() - start
+
+    # 第二遍只做归属统计，不计入耗时
+    check = DrainParser(cache_size=cache_size)
+    for source, entry in entries:
+        template = check.add(entry["message"], entry["timestamp"])
+        sources[template.template_id].add(source)
+    by_source: dict[int, set[int]] = defaultdict(set)
+    for template_id, members in sources.items():
+        for source in members:
+            by_source[source].add(template_id)
+
+    templates = len(parser.templates)
+    return {
+        "lines_per_second": round(len(entries) / elapsed),
+        "templates": templates,
+        "compression": round(len(entries) / max(templates, 1), 1),
+        "purity": round(sum(len(m) == 1 for m in sources.values()) / max(len(sources), 1), 3),
+        "fragmentation": round(sum(len(t) for t in by_source.values()) / max(len(by_source), 1), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--patterns", type=int, default=200, help="来源日志模式数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    entries = list(generate(args.lines, make_patterns(args.patterns, args.seed), args.seed))
+    report = {
+        "config": vars(args),
+        "cached": run(entries, cache_size=100_000),
+        "uncached": run(entries, cache_size=0),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""模型分级基准：单一模型 vs 按角色分级的调用延迟
+
+对比两种配置：
+
+- single: 所有角色共用主模型，temperature 0.7，不限输出长度（分级前的行为）
+- tiered: check / refine / review 使用小模型、低温度并限制 max_tokens，generate 保持主模型
+
+默认启动假 OpenAI 兼容服务：主模型首 token 慢、吐字慢，判定类回复在结论后附带解释；
+小模型更快。先逐角色测真实 prompt 的调用延迟，再用假检索跑完整 Graph 测端到端延迟。
+``--live`` 时不启动假服务，tiered 直接使用环境变量中的 CHECK_MODEL 等配置调用真实接口。
+
+用法:
+    uv run python -m scripts.bench_model_tiering --calls 20 --questions 10
+    uv run python -m scripts.bench_model_tiering --live --calls 10 --questions 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from contextlib import ExitStack
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from scripts.fakes import LLMProfile, create_fake_openai_app, free_port, serve_in_thread
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+
+QUESTIONS = [
+    "2024年诺贝尔物理学奖是谁获得的",
+    "最近的 Python 版本有哪些新特性",
+    "解释一下快速排序的原理",
+    "LangGraph 和 LangChain 有什么区别",
+    "介绍一下 Transformer 架构",
+]
+
+LARGE_MODEL = "fake-large"
+SMALL_MODEL = "fake-small"
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    arr = np.asarray(values) * 1000
+    p50, p95 = np.percentile(arr, [50, 95])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "mean": round(float(arr.mean()), 1),
+    }
+
+
+def role_prompts(question: str) -> dict[str, str]:
+    from src.app.core.prompts import CHECK_PROMPT_DEFAULT, REFINE_PROMPT, REFLECT_PROMPT
+
+    return {
+        "check": CHECK_PROMPT_DEFAULT.format(last_message=question),
+        "refine": REFINE_PROMPT.format(query=question, reflection="缺少最新数据"),
+        "review": REFLECT_PROMPT.format(
+            question=question, answer="这是一个回答。", knowledge_context="无外部知识"
+        ),
+    }
+
+
+def tier_settings(mode: str, args: argparse.Namespace) -> dict[str, Any]:
+    """single 模式把各角色恢复为主模型的默认参数；tiered 模式在假服务上把判定类角色指向小模型"""
+    from src.app.core.config import settings
+    from src.app.services.llm import ROLES
+
+    overrides: dict[str, Any] = {}
+    if mode == "single":
+        for role in ROLES:
+            overrides.update(
+                {
+                    f"{role}_model": "",
+                    f"{role}_base_url": "",
+                    f"{role}_temperature": settings.generate_temperature,
+                    f"{role}_max_tokens": settings.generate_max_tokens,
+                }
+            )
+    elif not args.live:
+        overrides.update({f"{role}_model": SMALL_MODEL for role in ("check", "refine", "review")})
+    return overrides
+
+
+def make_upstream(delay: float):
+    async def upstream(query: str, max_results: int, *_args: Any) -> list[dict]:
+        await asyncio.sleep(delay)
+        return [
+            {
+                "content": f"{query} 相关资料 {i}。",
+                "source": f"https://kb/{i}",
+                "score": 0.9 - i * 0.1,
+            }
+            for i in range(max_results)
+        ]
+
+    return upstream
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    from src.app.agents import specialized_nodes
+    from src.app.agents.graph import build_graph
+    from src.app.api.routes.chat import get_initial_state
+    from src.app.core.config import settings
+    from src.app.services.knowledge import KnowledgeService
+    from src.app.services.llm import ROLES, LLMGateway, create_http_client, get_llm
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.multiple(settings, **tier_settings(mode, args)))
+        http_client = create_http_client()
+        models = {role: get_llm(role, http_client) for role in ROLES}
+        gateway = LLMGateway(
+            models["generate"],
+            timeout_seconds=settings.llm_timeout_seconds,
+            max_retries=0,
+            models=models,
+        )
+        config = {
+            role: {
+                "model": model.model_name,
+                "temperature": model.temperature,
+                "max_tokens": model.max_tokens,
+            }
+            for role, model in models.items()
+        }
+
+        latencies: dict[str, list[float]] = {}
+        for i in range(args.calls):
+            question = QUESTIONS[i % len(QUESTIONS)]
+            for role, prompt in role_prompts(question).items():
+                start = time.perf_counter()
+                await gateway.ainvoke([HumanMessage(content=prompt)], role=role)
+                latencies.setdefault(role, []).append(time.perf_counter() - start)
+
+        service = KnowledgeService(cache_ttl_seconds=0, cache_max_entries=0, backend="tavily")
+        service.client = AsyncMock()
+        service._search_upstream = make_upstream(args.search_delay)  # type: ignore[method-assign]
+        stack.enter_context(patch.object(specialized_nodes, "llm", gateway))
+        stack.enter_context(patch.object(specialized_nodes, "knowledge_service", service))
+        graph = build_graph()
+        end_to_end: list[float] = []
+        for i in range(args.questions):
+            state = get_initial_state(QUESTIONS[i % len(QUESTIONS)])
+            start = time.perf_counter()
+            await graph.ainvoke(state)
+            end_to_end.append(time.perf_counter() - start)
+        await http_client.aclose()
+
+    return {
+        "models": config,
+        "role_latency_ms": {role: percentiles(values) for role, values in latencies.items()},
+        "classifier_latency_ms_mean": round(
+            statistics.mean(sum(values) for values in zip(*latencies.values(), strict=True)) * 1000,
+            1,
+        ),
+        "end_to_end_ms": percentiles(end_to_end),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    report: dict[str, Any] = {"config": vars(args)}
+    for mode in ("single", "tiered"):
+        report[mode] = await run_mode(mode, args)
+    report["end_to_end_speedup"] = round(
+        report["single"]["end_to_end_ms"]["mean"]
+        / max(report["tiered"]["end_to_end_ms"]["mean"], 1e-9),
+        2,
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--calls", type=int, default=20, help="每个判定类角色的调用次数")
+    parser.add_argument("--questions", type=int, default=10, help="端到端 Graph 运行次数")
+    parser.add_argument("--search-delay", type=float, default=0.1, help="假检索延迟 (秒)")
+    parser.add_argument(
+        "--live", action="store_true", help="调用真实接口，tiered 使用环境变量中的分角色配置"
+    )
+    parser.add_argument("--large-ttft", type=float, default=0.4, help="假主模型首 token 延迟 (秒)")
+    parser.add_argument("--large-tps", type=float, default=40.0, help="假主模型吐字速率 (token/秒)")
+    parser.add_argument("--small-ttft", type=float, default=0.1, help="假小模型首 token 延迟 (秒)")
+    parser.add_argument(
+        "--small-tps", type=float, default=150.0, help="假小模型吐字速率 (token/秒)"
+    )
+    parser.add_argument(
+        "--explain-tokens", type=int, default=40, help="判定类回复附带的解释 token 数"
+    )
+    parser.add_argument("--answer-tokens", type=int, default=100, help="generate 回答 token 数")
+    args = parser.parse_args()
+
+    server = None
+    if not args.live:
+        large = LLMProfile(args.large_ttft, args.large_tps, args.answer_tokens, args.explain_tokens)
+        small = LLMProfile(args.small_ttft, args.small_tps, args.answer_tokens, args.explain_tokens)
+        port = free_port()
+        server = serve_in_thread(create_fake_openai_app(large, {SMALL_MODEL: small}), port)
+        # 必须在导入 src.app 之前设置，配置与服务单例在导入时初始化
+        os.environ.update(
+            {
+                "DEEPSEEK_API_KEY": "fake",
+                "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{port}/v1",
+                "DEEPSEEK_MODEL": LARGE_MODEL,
+                "CHECKPOINTER": "none",
+            }
+        )
+
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        if server is not None:
+            server.should_exit = True
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
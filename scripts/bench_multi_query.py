@@ -0,0 +1,189 @@
+"""多查询检索基准：反思轮数与端到端延迟
+
+构造需要多方面信息的问题（如"X 的 A、B、C 分别是什么"）。假检索每次只返回查询中
+第一个方面的资料，假评审在可用知识未覆盖全部方面时要求改进，模拟单一查询需要多轮
+反思才能凑齐证据的情况。对比单查询 (MULTI_QUERY_COUNT=0) 与多查询模式下的
+平均轮数、LLM 调用次数、检索次数与延迟。
+
+用法:
+    uv run python -m scripts.bench_multi_query --questions 20 --llm-delay 0.2 --search-delay 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from collections import Counter
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+
+SUBJECTS = ["Redis", "Kafka", "PostgreSQL", "Kubernetes", "Nginx"]
+FACETS = ["持久化机制", "高可用方案", "性能调优", "安全配置", "监控指标"]
+
+
+def make_questions(count: int, facets_per_question: int) -> dict[str, tuple[str, list[str]]]:
+    questions = {}
+    for i in range(count):
+        subject = SUBJECTS[i % len(SUBJECTS)]
+        facets = [FACETS[(i + j) % len(FACETS)] for j in range(facets_per_question)]
+        questions[f"{subject} 的{'、'.join(facets)}分别是什么？"] = (subject, facets)
+    return questions
+
+
+def fact(subject: str, facet: str) -> str:
+    return f"[{subject}·{facet}] {subject} 的{facet}要点说明。"
+
+
+class FakeAgentLLM(BaseChatModel):
+    """按 prompt 角色给出确定性回复的假 LLM"""
+
+    questions: dict = {}
+    delay: float = 0.2
+    calls: Counter = Counter()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-agent"
+
+    def _lookup(self, prompt: str) -> tuple[str, list[str]]:
+        for question, value in self.questions.items():
+            if question in prompt:
+                return value
+        return "", []
+
+    def _reply(self, messages: list[BaseMessage]) -> tuple[str, str]:
+        prompt = str(messages[-1].content)
+        subject, facets = self._lookup(prompt)
+        if "YES 或 NO" in prompt:
+            return "check", "YES"
+        if "请评估以下问答的质量" in prompt:
+            knowledge = prompt.split("可用知识:", 1)[-1]
+            missing = [f for f in facets if fact(subject, f) not in knowledge]
+            verdict = {
+                "satisfied": not missing,
+                "score": 9 if not missing else 5,
+                "needs_search": bool(missing),
+            }
+            verdict["missing_info"] = f"缺少: {'、'.join(missing)}" if missing else ""
+            return "review", json.dumps(verdict, ensure_ascii=False)
+        missing = re.search(r"缺少: (\S+)", prompt)
+        wanted = missing.group(1).split("、") if missing else facets
+        if "拆分成最多" in prompt:
+            return "decompose", "\n".join(f"{subject} {f}" for f in wanted)
+        if "请生成一个更好的搜索查询" in prompt:
+            return "refine", f"{subject} {wanted[0]}"
+        return "generate", "根据资料整理的回答。"
+
+    def _generate(self, messages: list[BaseMessage], *_args: Any, **_kwargs: Any) -> ChatResult:
+        role, content = self._reply(messages)
+        self.calls[role] += 1
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], *_args: Any, **_kwargs: Any
+    ) -> ChatResult:
+        role, content = self._reply(messages)
+        self.calls[role] += 1
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def make_upstream(questions: dict, delay: float, calls: Counter):
+    async def upstream(query: str, *_args: Any) -> list[dict]:
+        calls["search"] += 1
+        await asyncio.sleep(delay)
+        # 检索结果只聚焦查询里出现的第一个方面
+        for subject, facets in questions.values():
+            if subject in query:
+                hit = min((f for f in facets if f in query), key=query.find, default=facets[0])
+                return [
+                    {
+                        "content": fact(subject, hit),
+                        "source": f"https://kb/{subject}/{hit}",
+                        "score": 0.9,
+                    }
+                ]
+        return []
+
+    return upstream
+
+
+async def run_mode(args: argparse.Namespace, multi_query_count: int) -> dict:
+    from src.app.agents import specialized_nodes
+    from src.app.agents.graph import build_graph
+    from src.app.api.routes.chat import get_initial_state
+    from src.app.core.config import settings
+    from src.app.services.knowledge import KnowledgeService
+
+    questions = make_questions(args.questions, args.facets)
+    fake_llm = FakeAgentLLM(questions=questions, delay=args.llm_delay, calls=Counter())
+    search_calls: Counter = Counter()
+    service = KnowledgeService(cache_ttl_seconds=0, cache_max_entries=0, backend="tavily")
+    service.client = AsyncMock()
+    service._search_upstream = make_upstream(questions, args.search_delay, search_calls)  # type: ignore[method-assign]
+
+    iterations: list[int] = []
+    latencies: list[float] = []
+    satisfied = 0
+    with (
+        patch.object(specialized_nodes, "llm", fake_llm),
+        patch.object(specialized_nodes, "knowledge_service", service),
+        patch.object(settings, "multi_query_count", multi_query_count),
+        patch.object(settings, "multi_query_concurrency", args.concurrency),
+        patch.object(settings, "max_iterations", args.max_iterations),
+    ):
+        graph = build_graph()
+        for question in questions:
+            state = get_initial_state(question)
+            start = time.perf_counter()
+            result = await graph.ainvoke(state)
+            latencies.append(time.perf_counter() - start)
+            iterations.append(result["iteration"])
+            satisfied += bool(result.get("is_satisfied"))
+
+    return {
+        "avg_iterations": round(statistics.mean(iterations), 2),
+        "satisfied_rate": round(satisfied / len(questions), 2),
+        "latency_ms_p50": round(statistics.median(latencies) * 1000, 1),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 1),
+        "llm_calls_per_question": round(sum(fake_llm.calls.values()) / len(questions), 2),
+        "searches_per_question": round(search_calls["search"] / len(questions), 2),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    report = {
+        "config": vars(args),
+        "single_query": await run_mode(args, 0),
+        "multi_query": await run_mode(args, args.count),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--facets", type=int, default=3, help="每个问题涉及的方面数")
+    parser.add_argument("--count", type=int, default=3, help="多查询模式的子查询数上限")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--max-iterations", type=int, default=3)
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="每次 LLM 调用延迟 (秒)")
+    parser.add_argument("--search-delay", type=float, default=0.3, help="每次检索延迟 (秒)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""重排序离线评估：质量与延迟
+
+数据集为 JSONL，每行::
+
+    {"question": "...", "passages": [{"content": "...", "score": 0.8, "relevant": true}, ...]}
+
+score 为检索端原始分数（决定原有排序），relevant 为人工标注。
+不传 --dataset 时生成合成数据：相关段落与问题共享关键词，干扰段落只共享部分词，
+原始分数随机，模拟检索端排序噪声。
+
+输出原有排序与重排序后的 MRR、recall@k、写入 prompt 的 token 数，以及打分延迟。
+
+用法:
+    uv run python -m scripts.bench_rerank --top-k 5
+    uv run python -m scripts.bench_rerank --dataset rerank.jsonl --mode cross-encoder
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from src.app.agents.context import count_tokens, rank_passages, render_context
+from src.app.services.reranker import Reranker, build_scorer
+
+TOPICS = [
+    ("LangGraph", "检查点", "状态持久化"),
+    ("FastAPI", "依赖注入", "路由"),
+    ("Redis", "过期策略", "内存淘汰"),
+    ("Kubernetes", "滚动更新", "就绪探针"),
+    ("PostgreSQL", "索引", "查询计划"),
+    ("Prometheus", "直方图", "分位数"),
+    ("Tavily", "检索深度", "摘要"),
+    ("numpy", "广播", "向量化"),
+]
+FILLER = "在实际项目中需要结合监控数据与业务场景评估，并在变更前做好回滚预案。"
+
+
+def synthetic_dataset(size: int, candidates: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(size):
+        subject, aspect, detail = rng.choice(TOPICS)
+        question = f"{subject} 的{aspect}如何影响{detail}？"
+        passages = [
+            {
+                "content": f"{subject} 中{aspect}直接决定了{detail}的行为。{FILLER}",
+                "relevant": True,
+            }
+        ]
+        for _ in range(candidates - 1):
+            other = rng.choice([t for t in TOPICS if t[0] != subject])
+            # 干扰项：同主题不同方面，或不同主题同方面
+            content = (
+                f"{subject} 的{other[1]}与{other[2]}相关。{FILLER}"
+                if rng.random() < 0.5
+                else f"{other[0]} 的{aspect}与{other[2]}相关。{FILLER}"
+            )
+            passages.append({"content": content, "relevant": False})
+        for p in passages:
+            p["score"] = rng.random()
+        rng.shuffle(passages)
+        samples.append({"question": question, "passages": passages})
+    return samples
+
+
+def load_dataset(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_passages(sample: dict) -> list[dict]:
+    return [
+        {
+            "content": p["content"],
+            "source": f"p{i}",
+            "score": float(p.get("score", 0.0)),
+            "round": 0,
+            "hash": f"p{i}",
+            "relevant": bool(p.get("relevant")),
+        }
+        for i, p in enumerate(sample["passages"])
+    ]
+
+
+def evaluate(ranked: list[dict], k: int) -> tuple[float, float]:
+    """返回 (reciprocal rank, recall@k)"""
+    relevant = sum(p["relevant"] for p in ranked)
+    rr = next((1 / (i + 1) for i, p in enumerate(ranked) if p["relevant"]), 0.0)
+    recall = sum(p["relevant"] for p in ranked[:k]) / relevant if relevant else 0.0
+    return rr, recall
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    samples = (
+        load_dataset(args.dataset)
+        if args.dataset
+        else synthetic_dataset(args.samples, args.candidates, args.seed)
+    )
+    reranker = Reranker(build_scorer(args.mode, args.model), top_k=args.top_k, budget_ms=10_000)
+
+    metrics: dict[str, list[float]] = {
+        key: [] for key in ("base_rr", "base_recall", "rr", "recall", "base_tokens", "tokens", "ms")
+    }
+    for sample in samples:
+        passages = to_passages(sample)
+        base_rr, base_recall = evaluate(rank_passages(passages), args.top_k)
+        metrics["base_rr"].append(base_rr)
+        metrics["base_recall"].append(base_recall)
+        metrics["base_tokens"].append(count_tokens(render_context(passages)))
+
+        start = time.perf_counter()
+        reranked = await reranker.rerank(sample["question"], passages)
+        metrics["ms"].append((time.perf_counter() - start) * 1000)
+        rr, recall = evaluate(rank_passages(reranked), args.top_k)
+        metrics["rr"].append(rr)
+        metrics["recall"].append(recall)
+        metrics["tokens"].append(
+            count_tokens(render_context(reranked, max_passages=reranker.max_passages))
+        )
+
+    latencies = sorted(metrics["ms"])
+    report = {
+        "samples": len(samples),
+        "mode": args.mode,
+        "top_k": args.top_k,
+        "original": {
+            "mrr": round(statistics.mean(metrics["base_rr"]), 4),
+            f"recall@{args.top_k}": round(statistics.mean(metrics["base_recall"]), 4),
+            "context_tokens": round(statistics.mean(metrics["base_tokens"]), 1),
+        },
+        "reranked": {
+            "mrr": round(statistics.mean(metrics["rr"]), 4),
+            f"recall@{args.top_k}": round(statistics.mean(metrics["recall"]), 4),
+            "context_tokens": round(statistics.mean(metrics["tokens"]), 1),
+        },
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 3),
+            "p95": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        },
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--dataset", default="", help="评估集 JSONL，缺省使用合成数据")
+    parser.add_argument("--mode", choices=["lexical", "cross-encoder"], default="lexical")
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=20, help="合成数据每题候选数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""SREState 更新开销基准：整状态复制 vs 增量更新
+
+构造带大量 ``log_entries`` / ``metrics_data`` / ``messages`` 的事件状态，在一个自循环的
+LangGraph 节点中连续执行状态转移（update_status + add_action_to_plan），对比：
+
+- full: 旧写法，节点返回 ``{**state, "action_plan": [*plan, action], ...}``，
+  列表字段为覆盖语义，每次转移都把整个状态重新写回各 channel
+- delta: 节点返回 state_utils 生成的增量，action_plan 由 reducer 追加
+
+输出各状态规模下单次转移的平均耗时 (微秒)，delta 应不随状态规模增长。
+
+用法:
+    uv run python -m scripts.bench_sre_state --sizes 0 1000 10000 50000 --steps 50
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Annotated, Any, TypedDict, get_args, get_origin, get_type_hints
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from src.sre.agents.shared.state import ActionItem, ActionType, IncidentStatus, Severity, SREState
+from src.sre.agents.shared.state_utils import (
+    add_action_to_plan,
+    create_initial_state,
+    update_status,
+)
+
+STATUSES = [IncidentStatus.MONITORING, IncidentStatus.DIAGNOSING]
+
+
+def legacy_schema() -> type:
+    """去掉 reducer 的 SREState（保留 messages 的 add_messages），即增量更新之前的定义"""
+    fields: dict[str, Any] = {}
+    for name, hint in get_type_hints(SREState, include_extras=True).items():
+        if get_origin(hint) is Annotated and name != "messages":
+            hint = get_args(hint)[0]
+        fields[name] = hint
+    return TypedDict("LegacySREState", fields)  # type: ignore[operator]
+
+
+def make_action(index: int) -> ActionItem:
+    return {
+        "id": f"act-{index}",
+        "type": ActionType.QUERY,
+        "tool_name": "get_pod_logs",
+        "parameters": {"pod": f"web-{index}"},
+        "description": "查询 Pod 日志",
+        "requires_approval": False,
+        "estimated_impact": "无",
+        "created_at": datetime.now(),
+    }
+
+
+def full_step(state: dict) -> dict:
+    """旧写法：复制整个状态"""
+    status = STATUSES[state["iteration"] % 2]
+    return {
+        **state,
+        "previous_status": state["status"],
+        "status": status,
+        "action_plan": [*state.get("action_plan", []), make_action(state["iteration"])],
+        "iteration": state["iteration"] + 1,
+        "updated_at": datetime.now(),
+    }
+
+
+def delta_step(state: dict) -> dict:
+    status = STATUSES[state["iteration"] % 2]
+    return {
+        **update_status(state, status),  # type: ignore[arg-type]
+        **add_action_to_plan(make_action(state["iteration"])),  # type: ignore[arg-type]
+        "iteration": state["iteration"] + 1,
+    }
+
+
+def build(schema: type, step: Any, steps: int) -> Any:
+    graph = StateGraph(schema)
+    graph.add_node("step", step)
+    graph.add_edge(START, "step")
+    graph.add_conditional_edges("step", lambda s: "step" if s["iteration"] < steps else END)
+    return graph.compile()
+
+
+def make_state(size: int) -> dict:
+    state = create_initial_state(alert_source="bench", severity=Severity.HIGH, title="bench")
+    state["log_entries"] = [
+        {"ts": i, "level": "ERROR", "message": f"request {i} failed"} for i in range(size)
+    ]
+    state["metrics_data"] = {f"metric_{i}": float(i) for i in range(size)}
+    state["messages"] = [HumanMessage(content=f"note {i}", id=f"m{i}") for i in range(size // 10)]
+    return dict(state)
+
+
+def timed_invoke(graph: Any, size: int, config: dict) -> tuple[float, dict]:
+    state = make_state(size)
+    start = time.perf_counter()
+    final = graph.invoke(state, config)
+    return time.perf_counter() - start, final
+
+
+def per_step_us(single: Any, multi: Any, size: int, steps: int, repeat: int) -> float:
+    """跑 steps 步的耗时减去只跑一步的耗时（各取 repeat 次最小值），扣除输入写入等一次性开销"""
+    config = {"recursion_limit": steps * 2 + 10}
+    one = min(timed_invoke(single, size, config)[0] for _ in range(repeat))
+    many = float("inf")
+    for _ in range(repeat):
+        elapsed, final = timed_invoke(multi, size, config)
+        assert len(final["action_plan"]) == steps
+        many = min(many, elapsed)
+    return round((many - one) / (steps - 1) * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[0, 1000, 10000, 50000], help="log_entries 条数"
+    )
+    parser.add_argument("--steps", type=int, default=50, help="每次运行的状态转移次数")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    legacy = legacy_schema()
+    modes = {
+        "full": (build(legacy, full_step, 1), build(legacy, full_step, args.steps)),
+        "delta": (build(SREState, delta_step, 1), build(SREState, delta_step, args.steps)),
+    }
+    results = {
+        name: {
+            str(size): per_step_us(single, multi, size, args.steps, args.repeat)
+            for size in args.sizes
+        }
+        for name, (single, multi) in modes.items()
+    }
+    print(json.dumps({"config": vars(args), "per_update_us": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""流式接口首字节时间 (TTFB) 基准测试
+
+对比 /chat/stream 在两种模式下的首个回答字节到达时间：
+- updates: 仅在节点完成后推送步骤事件（旧行为）
+- tokens:  writer 逐 token 推送 delta 事件
+
+LLM 与 Tavily 均以本地假实现替换，延迟可配置，不访问网络。
+
+用法:
+    uv run python -m scripts.bench_stream_ttfb --runs 5 --tokens 200 --token-delay 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+from unittest.mock import patch
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+
+from langchain_core.callbacks import (  # noqa: E402
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """按固定速率吐 token 的假 LLM：判断/评审类 prompt 返回短回复，其余返回长回答"""
+
+    answer_tokens: int = 200
+    token_delay: float = 0.01
+    first_token_delay: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _reply_for(self, messages: list[BaseMessage]) -> list[str]:
+        prompt = str(messages[-1].content)
+        if "只回答 YES 或 NO" in prompt or "回答 YES 或 NO" in prompt:
+            return ["YES"]
+        if "请评估以下问答的质量" in prompt:
+            return ["SATISFIED"]
+        return [f"词{i} " for i in range(self.answer_tokens)]
+
+    def _generate(self, messages: list[BaseMessage], *_args: Any, **_kwargs: Any) -> ChatResult:
+        tokens = self._reply_for(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], *_args: Any, **_kwargs: Any
+    ) -> ChatResult:
+        tokens = self._reply_for(messages)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        *_args: Any,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **_kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for token in self._reply_for(messages):
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        *_args: Any,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **_kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_delay)
+        for token in self._reply_for(messages):
+            await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class FakeKnowledgeService:
+    """固定延迟返回检索结果的假 Tavily"""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    async def search(self, query: str, _max_results: int = 5) -> list[dict]:
+        await asyncio.sleep(self.delay)
+        return [{"content": f"关于 {query} 的资料", "source": "https://example.com", "score": 0.9}]
+
+
+async def measure_once(stream_tokens: bool) -> tuple[float, float]:
+    """返回 (首个回答字节耗时, 总耗时)，单位秒"""
+    from src.app.api.routes.chat import chat_stream
+    from src.app.api.schemas import ChatRequest
+
+    start = time.perf_counter()
+    response = await chat_stream(
+        ChatRequest(message="什么是 LangGraph", stream_tokens=stream_tokens)
+    )
+    ttfb = None
+    async for frame in response.body_iterator:
+        text = frame if isinstance(frame, str) else frame.decode()
+        event = json.loads(text.removeprefix("data: "))
+        if ttfb is None and event["step"] in ("delta", "writer"):
+            ttfb = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return (ttfb if ttfb is not None else total), total
+
+
+async def run(args: argparse.Namespace) -> dict:
+    fake_llm = FakeStreamingLLM(
+        answer_tokens=args.tokens,
+        token_delay=args.token_delay,
+        first_token_delay=args.first_token_delay,
+    )
+    fake_knowledge = FakeKnowledgeService(args.search_delay)
+
+    report: dict = {"config": vars(args), "modes": {}}
+    with (
+        patch("src.app.agents.specialized_nodes.llm", fake_llm),
+        patch("src.app.agents.specialized_nodes.knowledge_service", fake_knowledge),
+    ):
+        for mode, stream_tokens in (("updates", False), ("tokens", True)):
+            samples = [await measure_once(stream_tokens) for _ in range(args.runs)]
+            ttfbs = [s[0] for s in samples]
+            totals = [s[1] for s in samples]
+            report["modes"][mode] = {
+                "ttfb_ms_p50": round(statistics.median(ttfbs) * 1000, 1),
+                "ttfb_ms_max": round(max(ttfbs) * 1000, 1),
+                "total_ms_p50": round(statistics.median(totals) * 1000, 1),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=200, help="writer 回答 token 数")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="每个 token 间隔 (秒)")
+    parser.add_argument(
+        "--first-token-delay", type=float, default=0.2, help="LLM 首 token 延迟 (秒)"
+    )
+    parser.add_argument("--search-delay", type=float, default=0.3, help="检索延迟 (秒)")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
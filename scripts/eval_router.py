@@ -0,0 +1,64 @@
+"""检索前置路由回放评估
+
+回放集为 JSONL，每行 {"text": "...", "label": true/false}，label 为 LLM 的判定
+(可通过配置 ROUTER_DECISION_LOG_PATH 在线上收集)。输出短路率与短路部分的准确率。
+
+用法:
+    # 评估规则分类器
+    uv run python -m scripts.eval_router --replay decisions.jsonl
+    # 用 80% 数据训练逻辑回归并在剩余 20% 上评估，模型保存到 router.npz
+    uv run python -m scripts.eval_router --replay decisions.jsonl --train-out router.npz
+"""
+
+import argparse
+import json
+import os
+import random
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+
+from src.app.agents.router import (  # noqa: E402
+    ChainClassifier,
+    HashedLogisticClassifier,
+    RuleBasedClassifier,
+    evaluate,
+)
+
+
+def load_replay(path: str) -> list[tuple[str, bool]]:
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record["text"], bool(record["label"])))
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--replay", required=True, help="回放集 JSONL 路径")
+    parser.add_argument("--train-out", default="", help="训练逻辑回归并保存到该路径")
+    parser.add_argument("--test-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    samples = load_replay(args.replay)
+    report: dict = {"rules": evaluate(RuleBasedClassifier(), samples)}
+
+    if args.train_out:
+        random.Random(args.seed).shuffle(samples)
+        split = int(len(samples) * (1 - args.test_ratio))
+        train, test = samples[:split], samples[split:]
+        model = HashedLogisticClassifier().fit([t for t, _ in train], [y for _, y in train])
+        model.save(args.train_out)
+        report["model"] = evaluate(model, test)
+        report["rules+model"] = evaluate(ChainClassifier([RuleBasedClassifier(), model]), test)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""压测/基准用的本地假上游服务
+
+- ``create_fake_openai_app``: OpenAI 兼容的 ``/v1/chat/completions``，支持流式与非流式，
+  首 token 延迟与吐字速率可配置，可按请求的 model 使用不同参数，遵守 ``max_tokens``
+- ``create_fake_tavily_app``: Tavily ``/search``，延迟可配置
+
+两者都在 ``app.state.calls`` 上记录调用次数，``serve_in_thread`` 把任意 ASGI 应用
+跑在独立线程的 uvicorn 中，避免与被测服务争用同一个事件循环。
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class LLMProfile:
+    """假 LLM 的延迟参数"""
+
+    def __init__(
+        self,
+        ttft: float = 0.3,
+        tokens_per_second: float = 50.0,
+        answer_tokens: int = 200,
+        explain_tokens: int = 0,
+    ) -> None:
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        # 判定类回复（check / review）在结论后附带的解释 token 数，模拟不限长度时大模型的啰嗦输出
+        self.explain_tokens = explain_tokens
+
+
+def classify_prompt(messages: list[dict]) -> str:
+    """根据 prompt 内容识别调用角色"""
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    if "YES 或 NO" in prompt:
+        return "check"
+    if "请评估以下问答的质量" in prompt:
+        return "review"
+    if "请生成一个更好的搜索查询" in prompt:
+        return "refine"
+    if "压缩成一段简洁的摘要" in prompt:
+        return "summarize"
+    if "拆分成最多" in prompt:
+        return "decompose"
+    return "generate"
+
+
+def reply_tokens(role: str, profile: LLMProfile) -> list[str]:
+    explanation = [f"理由{i} " for i in range(profile.explain_tokens)]
+    if role == "check":
+        return ["YES", *explanation]
+    if role == "review":
+        return [
+            '{"satisfied": true, ',
+            '"score": 9, ',
+            '"missing_info": "", ',
+            '"needs_search": false}',
+            *explanation,
+        ]
+    if role in ("refine", "summarize"):
+        return ["优化", "后的", "查询"]
+    if role == "decompose":
+        return ["子查询一\n", "子查询二\n", "子查询三"]
+    return [f"词{i} " for i in range(profile.answer_tokens)]
+
+
+def create_fake_openai_app(
+    profile: LLMProfile, models: dict[str, LLMProfile] | None = None
+) -> FastAPI:
+    """models 按请求中的 model 名覆盖 profile；``app.state.models`` 记录各 (model, 角色) 的调用次数"""
+    app = FastAPI()
+    app.state.calls = Counter()
+    app.state.models = Counter()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        body = await request.json()
+        model = body.get("model", "fake")
+        model_profile = (models or {}).get(model, profile)
+        role = classify_prompt(body.get("messages", []))
+        app.state.calls[role] += 1
+        app.state.models[(model, role)] += 1
+        tokens = reply_tokens(role, model_profile)
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        finish_reason = "stop"
+        if max_tokens and len(tokens) > max_tokens:
+            tokens = tokens[:max_tokens]
+            finish_reason = "length"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in body.get("messages", [])),
+            "completion_tokens": len(tokens),
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        token_delay = (
+            1.0 / model_profile.tokens_per_second if model_profile.tokens_per_second > 0 else 0.0
+        )
+
+        if not body.get("stream"):
+            await asyncio.sleep(model_profile.ttft + token_delay * len(tokens))
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(tokens)},
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        async def stream() -> Any:
+            def chunk(delta: dict, finish_reason: str | None = None, **extra: Any) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            await asyncio.sleep(model_profile.ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                await asyncio.sleep(token_delay)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def create_fake_tavily_app(latency: float = 0.5, results: int = 5) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = Counter()
+
+    @app.post("/search")
+    async def search(request: Request) -> dict:
+        body = await request.json()
+        app.state.calls["search"] += 1
+        await asyncio.sleep(latency)
+        query = body.get("query", "")
+        return {
+            "query": query,
+            "answer": f"关于 {query} 的摘要",
+            "results": [
+                {
+                    "title": f"结果 {i}",
+                    "url": f"https://example.com/{uuid.uuid4().hex[:8]}",
+                    "content": f"{query} 相关资料 {i}。" * 10,
+                    "score": round(0.9 - i * 0.1, 2),
+                }
+                for i in range(min(results, body.get("max_results", results)))
+            ],
+            "response_time": latency,
+        }
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def serve_in_thread(app: Any, port: int) -> uvicorn.Server:
+    """在后台线程启动 uvicorn，等待就绪后返回 server（调用 ``server.should_exit = True`` 停止）"""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"服务启动失败: 127.0.0.1:{port}")
+        time.sleep(0.01)
+    return server
@@ -0,0 +1,56 @@
+"""本地知识库导入
+
+把 Markdown / 纯文本 / PDF 文档切块后构建 BM25 + 向量混合索引。
+PDF 解析依赖 pypdf: uv sync --extra kb
+
+用法:
+    uv run python -m scripts.ingest_knowledge --input docs/ notes.md --output data/kb
+    # 之后在 .env 中设置 KNOWLEDGE_BACKEND=local 即可启用
+    # 块数较多时加 --ivf 同时构建 IVF 索引，并设置 LOCAL_KB_VECTOR_INDEX=ivf
+    uv run python -m scripts.ingest_knowledge --input docs/ --ivf
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from src.app.services.local_kb import LocalKnowledgeBase, chunk_text, load_documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--input", nargs="+", required=True, help="文档文件或目录")
+    parser.add_argument("--output", default="data/kb", help="索引输出目录")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=256, help="向量维度")
+    parser.add_argument("--ivf", action="store_true", help="同时构建 IVF 近似最近邻索引")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF 簇数，默认 sqrt(块数)")
+    args = parser.parse_args()
+
+    stats = {"documents": 0}
+
+    def chunks():
+        for source, text in load_documents([Path(p) for p in args.input]):
+            stats["documents"] += 1
+            yield from chunk_text(text, source, args.chunk_size, args.overlap)
+
+    start = time.perf_counter()
+    kb = LocalKnowledgeBase.build(
+        chunks(), args.output, dim=args.dim, ivf_nlist=(args.nlist or None) if args.ivf else 0
+    )
+    report = {
+        **stats,
+        "chunks": len(kb),
+        "vocab": len(kb.vocab),
+        "output": args.output,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
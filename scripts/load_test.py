@@ -0,0 +1,201 @@
+"""端到端压测：/chat 与 /chat/stream 的延迟与吞吐
+
+启动假 OpenAI 兼容服务与假 Tavily 服务（延迟、吐字速率可配置），让 ``create_app()``
+通过真实 HTTP 调用它们，再以固定并发驱动接口，输出机器可读的 JSON 报告：
+p50/p95/p99 延迟、TTFB、首 token 时间、QPS、每请求 LLM/检索调用次数。
+
+默认关闭回答缓存与检索缓存，确保每个请求都走完整链路。
+
+用法:
+    uv run python -m scripts.load_test --requests 200 --concurrency 20 --output bench.json
+    uv run python -m scripts.load_test --endpoints stream --llm-ttft 0.5 --llm-tps 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+import numpy as np
+
+from scripts.fakes import (
+    LLMProfile,
+    create_fake_openai_app,
+    create_fake_tavily_app,
+    free_port,
+    serve_in_thread,
+)
+
+QUESTIONS = [
+    "2024年诺贝尔物理学奖是谁获得的",
+    "最近的 Python 版本有哪些新特性",
+    "解释一下快速排序的原理",
+    "LangGraph 和 LangChain 有什么区别",
+    "你好",
+    "今天上海天气怎么样",
+    "介绍一下 Transformer 架构",
+    "谢谢",
+]
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    arr = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "mean": round(float(arr.mean()), 1),
+        "max": round(float(arr.max()), 1),
+    }
+
+
+async def one_request(client: httpx.AsyncClient, path: str, message: str) -> dict[str, Any]:
+    start = time.perf_counter()
+    ttfb = first_token = None
+    status = 0
+    try:
+        async with client.stream("POST", path, json={"message": message}) as response:
+            status = response.status_code
+            async for chunk in response.aiter_text():
+                now = time.perf_counter() - start
+                if ttfb is None:
+                    ttfb = now
+                if first_token is None and '"step": "delta"' in chunk:
+                    first_token = now
+    except httpx.HTTPError:
+        status = -1
+    latency = time.perf_counter() - start
+    return {
+        "status": status,
+        "latency": latency,
+        "ttfb": ttfb if ttfb is not None else latency,
+        "first_token": first_token,
+    }
+
+
+async def drive(base_url: str, path: str, total: int, concurrency: int) -> dict[str, Any]:
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    samples: list[dict[str, Any]] = []
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(120.0),
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+
+        async def worker() -> None:
+            while not queue.empty():
+                i = queue.get_nowait()
+                samples.append(await one_request(client, path, QUESTIONS[i % len(QUESTIONS)]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    ok = [s for s in samples if s["status"] == 200]
+    first_tokens = [s["first_token"] for s in ok if s["first_token"] is not None]
+    return {
+        "requests": total,
+        "succeeded": len(ok),
+        "failed": total - len(ok),
+        "rejected_503": sum(s["status"] == 503 for s in samples),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles([s["latency"] for s in ok]),
+        "ttfb_ms": percentiles([s["ttfb"] for s in ok]),
+        "first_token_ms": percentiles(first_tokens) if first_tokens else None,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=100, help="每个接口的请求总数")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--endpoints", choices=["chat", "stream", "both"], default="both")
+    parser.add_argument("--llm-ttft", type=float, default=0.3, help="假 LLM 首 token 延迟 (秒)")
+    parser.add_argument("--llm-tps", type=float, default=50.0, help="假 LLM 吐字速率 (token/秒)")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="writer 回答 token 数")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="假 Tavily 延迟 (秒)")
+    parser.add_argument("--cache", action="store_true", help="保留回答缓存与检索缓存")
+    parser.add_argument("--output", default="", help="JSON 报告输出路径 (默认 stdout)")
+    args = parser.parse_args()
+
+    fake_llm = create_fake_openai_app(LLMProfile(args.llm_ttft, args.llm_tps, args.answer_tokens))
+    fake_tavily = create_fake_tavily_app(args.search_latency)
+    llm_port, tavily_port, app_port = free_port(), free_port(), free_port()
+    servers = [serve_in_thread(fake_llm, llm_port), serve_in_thread(fake_tavily, tavily_port)]
+
+    # 必须在导入 src.app 之前设置，配置与服务单例在导入时初始化
+    os.environ.update(
+        {
+            "DEEPSEEK_API_KEY": "fake",
+            "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "TAVILY_API_KEY": "fake",
+            "TAVILY_BASE_URL": f"http://127.0.0.1:{tavily_port}",
+            "CHECKPOINTER": "none",
+        }
+    )
+    if not args.cache:
+        os.environ.update({"ANSWER_CACHE_ENABLED": "false", "SEARCH_CACHE_TTL_SECONDS": "0"})
+
+    from src.app.main import create_app
+
+    servers.append(serve_in_thread(create_app(), app_port))
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    endpoints = {"chat": "/chat", "stream": "/chat/stream"}
+    selected = list(endpoints) if args.endpoints == "both" else [args.endpoints]
+    results: dict[str, Any] = {}
+    for name in selected:
+        fake_llm.state.calls.clear()
+        fake_tavily.state.calls.clear()
+        result = asyncio.run(drive(base_url, endpoints[name], args.requests, args.concurrency))
+        done = max(result["succeeded"], 1)
+        result["llm_calls_per_request"] = {
+            role: round(count / done, 3) for role, count in sorted(fake_llm.state.calls.items())
+        }
+        result["llm_calls_per_request"]["total"] = round(
+            sum(fake_llm.state.calls.values()) / done, 3
+        )
+        result["search_calls_per_request"] = round(fake_tavily.state.calls["search"] / done, 3)
+        results[name] = result
+
+    for server in servers:
+        server.should_exit = True
+
+    report = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
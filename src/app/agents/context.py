@@ -0,0 +1,162 @@
+"""检索上下文组装
+
+检索结果以结构化的 passage 记录保存在状态中，而不是不断拼接的字符串：
+
+- 按来源 URL 与内容哈希去重
+- 有重排序分数时按其排序，否则按相关度分数 + 检索轮次（越新越靠前）排序
+- 在 token 预算内装箱渲染为 prompt 上下文
+- 多轮会话中保留的 passage 数有上限，本次检索结果优先
+
+这样无论反思循环多少轮，写入 writer prompt 的上下文大小都有上限。
+"""
+
+import hashlib
+import math
+import re
+from collections.abc import Iterable
+
+from src.app.core.config import settings
+from src.app.services.embedding import embedder
+
+# 中日韩字符单独计数，其余按单词/数字串或单个符号切分
+_TOKEN_PIECE_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[A-Za-z0-9_]+|\S")
+
+# 非 URL 来源（如 Tavily AI Summary）只按内容去重
+_URL_RE = re.compile(r"^https?://", re.IGNORECASE)
+
+
+def count_tokens(text: str) -> int:
+    """本地估算 token 数：CJK 字符 1 token，英文/数字串约 4 字符 1 token，符号 1 token"""
+    total = 0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        total += math.ceil(len(piece) / 4) if len(piece) > 1 else 1
+    return total
+
+
+def content_hash(content: str) -> str:
+    """归一化空白后的内容哈希"""
+    return hashlib.sha1(" ".join(content.split()).encode("utf-8")).hexdigest()
+
+
+def merge_passages(existing: list[dict], results: list[dict], round_: int) -> list[dict]:
+    """把新检索结果合并进已有 passage 列表
+
+    同一 URL 或同一内容只保留一条：分数取较高者，轮次取较新者。
+    """
+    merged = [dict(p) for p in existing]
+    by_url = {p["source"]: p for p in merged if _URL_RE.match(p["source"])}
+    by_hash = {p["hash"]: p for p in merged}
+
+    for result in results:
+        content = str(result.get("content", "")).strip()
+        if not content:
+            continue
+        source = str(result.get("source", "") or "未知")
+        digest = content_hash(content)
+        score = float(result.get("score", 0.0) or 0.0)
+
+        duplicate = by_hash.get(digest) or (by_url.get(source) if _URL_RE.match(source) else None)
+        if duplicate is not None:
+            if score > duplicate["score"]:
+                duplicate.update(content=content, hash=digest, score=score)
+                by_hash[digest] = duplicate
+            duplicate["round"] = max(duplicate["round"], round_)
+            continue
+
+        passage = {
+            "content": content,
+            "source": source,
+            "score": score,
+            "round": round_,
+            "hash": digest,
+        }
+        merged.append(passage)
+        by_hash[digest] = passage
+        if _URL_RE.match(source):
+            by_url[source] = passage
+
+    return merged
+
+
+def fuse_results(result_lists: list[list[dict]], k: int = 60) -> list[dict]:
+    """多路检索结果做 RRF (reciprocal rank fusion) 融合并去重
+
+    同一内容或同一 URL 视为同一结果，融合分数归一化到 0-1：
+    在每一路中都排第一的结果得 1 分。
+    """
+    fused: dict[str, dict] = {}
+    totals: dict[str, float] = {}
+    # 内容哈希与 URL 都映射到同一个规范 key
+    aliases: dict[str, str] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            content = str(result.get("content", "")).strip()
+            if not content:
+                continue
+            digest = content_hash(content)
+            source = str(result.get("source", ""))
+            url = source if _URL_RE.match(source) else None
+            key = aliases.get(digest) or (aliases.get(url) if url else None) or digest
+            aliases[digest] = key
+            if url:
+                aliases[url] = key
+            fused.setdefault(key, result)
+            totals[key] = totals.get(key, 0.0) + 1.0 / (k + rank + 1)
+
+    best = len(result_lists) / (k + 1) if result_lists else 1.0
+    ranked = sorted(totals, key=totals.__getitem__, reverse=True)
+    return [{**fused[key], "score": round(totals[key] / best, 6)} for key in ranked]
+
+
+def rank_passages(passages: list[dict], recency_weight: float = 0.1) -> list[dict]:
+    """全部带 rerank_score 时按其降序，否则按 score + recency_weight * round 降序"""
+    if passages and all("rerank_score" in p for p in passages):
+        return sorted(passages, key=lambda p: p["rerank_score"], reverse=True)
+    return sorted(passages, key=lambda p: p["score"] + recency_weight * p["round"], reverse=True)
+
+
+def trim_passages(passages: list[dict], limit: int, fresh: Iterable[dict] = ()) -> list[dict]:
+    """超过 limit 时只保留 limit 条，避免多轮会话中 passage 无限增长
+
+    本次检索结果 (fresh) 对应的 passage 优先保留，其余按排序补足；
+    round 是轮内迭代序号，跨轮次不可比较，不能只靠排序淘汰旧 passage。
+    """
+    if limit <= 0 or len(passages) <= limit:
+        return passages
+    fresh_hashes = {content_hash(str(r.get("content", "")).strip()) for r in fresh}
+    ranked = rank_passages(passages)
+    kept = [p for p in ranked if p["hash"] in fresh_hashes][:limit]
+    kept += [p for p in ranked if p["hash"] not in fresh_hashes][: limit - len(kept)]
+    return kept
+
+
+def render_context(
+    passages: list[dict], token_budget: int | None = None, max_passages: int | None = None
+) -> str:
+    """按排序结果在 token 预算内贪心装箱，渲染为 prompt 上下文，最多 max_passages 条"""
+    budget = settings.context_token_budget if token_budget is None else token_budget
+    blocks: list[str] = []
+    used = 0
+    for passage in rank_passages(passages):
+        if max_passages is not None and len(blocks) >= max_passages:
+            break
+        block = f"[来源: {passage['source']}]\n{passage['content']}"
+        cost = count_tokens(block)
+        if used + cost > budget:
+            continue
+        blocks.append(block)
+        used += cost
+    return "\n\n".join(blocks)
+
+
+def context_coverage(question: str, passages: list[dict]) -> float:
+    """问题的 unigram/bigram 被已有 passage 覆盖的比例 (0-1)"""
+    question_terms = set(embedder.tokenize(question))
+    if not question_terms:
+        return 0.0
+    covered: set[str] = set()
+    for passage in passages:
+        covered |= question_terms & set(embedder.tokenize(passage["content"]))
+        if covered == question_terms:
+            break
+    return len(covered) / len(question_terms)
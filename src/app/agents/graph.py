@@ -1,50 +1,61 @@
 """Agent Graph 构建"""
 
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
 from src.app.agents.specialized_nodes import (
+    compact_history_node,
     searcher_agent,
     writer_agent,
     reviewer_agent,
 )
 from src.app.agents.nodes import finalize_node
 from src.app.agents.state import AgentState
+from src.app.core.metrics import instrument_node
 
 
 def route_after_reviewer(state: AgentState) -> str:
     """路由：根据 Reviewer 的决定路由"""
     next_agent = state.get("next_agent", "end")
-    if next_agent == "searcher":
-        return "searcher"
+    if next_agent in ("searcher", "writer"):
+        return next_agent
     return "finalize"
 
 
-def build_graph() -> CompiledStateGraph:
-    """构建多智能体协同 Graph"""
+def build_graph(checkpointer: BaseCheckpointSaver | None = None) -> CompiledStateGraph:
+    """构建多智能体协同 Graph
+
+    传入 checkpointer 时状态按 thread_id 持久化，并在入口增加会话压缩节点。
+    """
     graph = StateGraph(AgentState)
 
     # 添加专家节点
-    graph.add_node("searcher", searcher_agent)
-    graph.add_node("writer", writer_agent)
-    graph.add_node("reviewer", reviewer_agent)
-    graph.add_node("finalize", finalize_node)
+    graph.add_node("searcher", instrument_node("searcher")(searcher_agent))
+    graph.add_node("writer", instrument_node("writer")(writer_agent))
+    graph.add_node("reviewer", instrument_node("reviewer")(reviewer_agent))
+    graph.add_node("finalize", instrument_node("finalize")(finalize_node))
 
     # 定义流程
-    graph.add_edge(START, "searcher")
+    if checkpointer is not None:
+        graph.add_node("compact", instrument_node("compact")(compact_history_node))
+        graph.add_edge(START, "compact")
+        graph.add_edge("compact", "searcher")
+    else:
+        graph.add_edge(START, "searcher")
     graph.add_edge("searcher", "writer")
     graph.add_edge("writer", "reviewer")
     
-    # Reviewer 决定是打回重写还是最终交付
+    # Reviewer 决定是重新检索、直接重写还是最终交付
     graph.add_conditional_edges(
         "reviewer", 
         route_after_reviewer, 
-        {"searcher": "searcher", "finalize": "finalize"}
+        {"searcher": "searcher", "writer": "writer", "finalize": "finalize"}
     )
     
     graph.add_edge("finalize", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 
 # Agent 单例
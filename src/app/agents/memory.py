@@ -0,0 +1,75 @@
+"""会话记忆
+
+基于 LangGraph checkpointer 按 ``conversation_id`` (thread_id) 持久化 Agent 状态，
+后端可插拔：``sqlite`` (默认，本地文件)、``memory`` (进程内) 或 ``none`` (关闭)。
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.state import CompiledStateGraph
+
+
+@asynccontextmanager
+async def open_checkpointer(
+    backend: str, db_path: str = ""
+) -> AsyncIterator[BaseCheckpointSaver | None]:
+    """按配置打开 checkpointer，退出时释放连接"""
+    if backend == "none":
+        yield None
+    elif backend == "memory":
+        yield InMemorySaver()
+    elif backend == "sqlite":
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        async with AsyncSqliteSaver.from_conn_string(db_path) as saver:
+            yield saver
+    else:
+        raise ValueError(f"未知的 checkpointer 后端: {backend}")
+
+
+class ConversationMemory:
+    """持有带 checkpointer 的 Agent，供聊天路由按会话调用"""
+
+    def __init__(self) -> None:
+        self.agent: CompiledStateGraph | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.agent is not None
+
+    @staticmethod
+    def config(conversation_id: str) -> RunnableConfig:
+        return {"configurable": {"thread_id": conversation_id}}
+
+    @staticmethod
+    def turn_input(message: str) -> dict[str, Any]:
+        """新一轮对话的输入：只追加消息并重置单轮字段
+
+        历史 passage 与摘要沿用，供后续问题复用；渲染后的 knowledge_context 按轮重置，
+        本轮未检索也未复用时回答不会带上上一轮的资料 (used_knowledge 只反映本轮)。
+        """
+        return {
+            "messages": [HumanMessage(content=message)],
+            "knowledge_context": "",
+            "need_knowledge": False,
+            "current_answer": "",
+            "previous_answer": "",
+            "reflection": "",
+            "is_satisfied": False,
+            "early_stop_reason": "",
+            "new_sources": 0,
+            "iteration": 0,
+        }
+
+
+# 会话记忆单例（由应用生命周期初始化）
+conversation_memory = ConversationMemory()
+
@@ -2,6 +2,9 @@ from typing import Any, cast
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
+from src.app.agents.context import merge_passages, render_context, trim_passages
+from src.app.agents.review import parse_review
+from src.app.agents.router import knowledge_router
 from src.app.agents.state import AgentState
 from src.app.core.config import settings
 from src.app.core.logging import logger
@@ -16,6 +19,7 @@ from src.app.core.prompts import (
 )
 from src.app.services.knowledge import knowledge_service
 from src.app.services.llm import llm
+from src.app.services.reranker import reranker
 
 
 def get_last_content(messages: list) -> str:
@@ -32,16 +36,20 @@ async def check_node(state: AgentState) -> dict[str, Any]:
     last_message = get_last_content(messages)
     reflection = state.get("reflection", "")
 
-    if reflection:
-        check_prompt = CHECK_PROMPT_REFLECTION.format(
-            reflection=reflection, last_message=last_message
-        )
-    else:
-        check_prompt = CHECK_PROMPT_DEFAULT.format(last_message=last_message)
-
-    response = await llm.ainvoke([HumanMessage(content=check_prompt)])
-    content = str(response.content)
-    need_knowledge = "YES" in content.upper()
+    need_knowledge = None if reflection else knowledge_router.decide(last_message)
+    if need_knowledge is None:
+        if reflection:
+            check_prompt = CHECK_PROMPT_REFLECTION.format(
+                reflection=reflection, last_message=last_message
+            )
+        else:
+            check_prompt = CHECK_PROMPT_DEFAULT.format(last_message=last_message)
+
+        response = await llm.ainvoke([HumanMessage(content=check_prompt)], role="check")
+        content = str(response.content)
+        need_knowledge = "YES" in content.upper()
+        if not reflection:
+            knowledge_router.record_llm_decision(last_message, need_knowledge)
 
     logger.info(f"需要检索知识: {need_knowledge}")
     return {"need_knowledge": need_knowledge}
@@ -53,30 +61,28 @@ async def retrieve_node(state: AgentState) -> dict[str, Any]:
         return {"knowledge_context": ""}
 
     messages = state["messages"]
-    query = get_last_content(messages)
+    question = query = get_last_content(messages)
     reflection = state.get("reflection", "")
 
     # 如果有反思，优化查询
     if reflection:
         refine_prompt = REFINE_PROMPT.format(query=query, reflection=reflection)
-        response = await llm.ainvoke([HumanMessage(content=refine_prompt)])
+        response = await llm.ainvoke([HumanMessage(content=refine_prompt)], role="refine")
         query = str(response.content).strip()
         logger.info(f"优化后的查询: {query}")
 
     results = await knowledge_service.search(query)
 
+    passages = state.get("knowledge_passages", [])
     if results:
-        old_context = state.get("knowledge_context", "")
-        new_context = "\n\n".join(
-            [f"[来源: {r.get('source', '未知')}]\n{r.get('content', '')}" for r in results]
-        )
-        context = (
-            f"{old_context}\n\n--- 新检索结果 ---\n{new_context}" if old_context else new_context
-        )
+        passages = merge_passages(passages, results, state.get("iteration", 0))
+        passages = await reranker.rerank(question, passages)
+        passages = trim_passages(passages, settings.memory_max_passages, fresh=results)
+        context = render_context(passages, max_passages=reranker.max_passages)
     else:
         context = state.get("knowledge_context", "")
 
-    return {"knowledge_context": context}
+    return {"knowledge_context": context, "knowledge_passages": passages}
 
 
 async def generate_node(state: AgentState) -> dict[str, Any]:
@@ -122,14 +128,14 @@ async def reflect_node(state: AgentState) -> dict[str, Any]:
         knowledge_context=knowledge_context[:1000] if knowledge_context else "无外部知识",
     )
 
-    response = await llm.ainvoke([HumanMessage(content=reflect_prompt)])
-    response_text = str(response.content).strip()
+    response = await llm.ainvoke([HumanMessage(content=reflect_prompt)], role="review")
+    verdict = parse_review(str(response.content))
 
-    if "SATISFIED" in response_text.upper() and "NEEDS_IMPROVEMENT" not in response_text.upper():
+    if verdict.satisfied:
         logger.info("反思评估: 满意")
         return {"is_satisfied": True, "reflection": ""}
     else:
-        reflection = response_text.replace("NEEDS_IMPROVEMENT", "").strip()
+        reflection = verdict.missing_info or "回答不够好，请改进"
         logger.info(f"反思评估: 需要改进 - {reflection[:50]}...")
         return {"is_satisfied": False, "reflection": reflection}
 
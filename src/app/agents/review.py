@@ -0,0 +1,80 @@
+"""评审结论解析
+
+Reviewer 输出紧凑的 JSON 结论::
+
+    {"satisfied": false, "score": 6, "missing_info": "缺少 2024 年数据", "needs_search": true}
+
+``needs_search`` 为 false 时 Graph 跳过 Searcher，直接带着反思意见回到 Writer。
+输出被 max_tokens 截断时按字段逐个提取；完全不是 JSON 时回退到
+SATISFIED / NEEDS_IMPROVEMENT 关键词判定（此时总是重新检索）。
+"""
+
+import json
+import re
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src.app.core.metrics import register_stats
+
+_BOOL_FIELD_RE = r'"{}"\s*:\s*(true|false)'
+_SCORE_RE = re.compile(r'"score"\s*:\s*(\d+(?:\.\d+)?)')
+_MISSING_RE = re.compile(r'"missing_info"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+# 评审解析统计：structured = JSON 解析成功，partial = 截断后按字段提取，
+# fallback = 关键词判定，skip_search = 跳过检索直接重写
+review_stats = {"structured": 0, "partial": 0, "fallback": 0, "skip_search": 0}
+register_stats("reviewer", lambda: review_stats)
+
+
+class ReviewVerdict(BaseModel):
+    """评审结论"""
+
+    satisfied: bool
+    score: float = Field(default=0, ge=0, le=10)
+    missing_info: str = ""
+    needs_search: bool = True
+
+
+def _parse_json(text: str) -> ReviewVerdict | None:
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        return ReviewVerdict.model_validate(json.loads(text[start : end + 1]))
+    except (json.JSONDecodeError, ValidationError):
+        return None
+
+
+def _parse_fields(text: str) -> ReviewVerdict | None:
+    satisfied = re.search(_BOOL_FIELD_RE.format("satisfied"), text)
+    if not satisfied:
+        return None
+    score = _SCORE_RE.search(text)
+    missing = _MISSING_RE.search(text)
+    needs_search = re.search(_BOOL_FIELD_RE.format("needs_search"), text)
+    return ReviewVerdict(
+        satisfied=satisfied.group(1) == "true",
+        score=min(float(score.group(1)), 10) if score else 0,
+        missing_info=missing.group(1).replace('\\"', '"') if missing else "",
+        needs_search=needs_search.group(1) == "true" if needs_search else True,
+    )
+
+
+def parse_review(text: str) -> ReviewVerdict:
+    """解析 Reviewer 输出"""
+    text = text.strip()
+    verdict = _parse_json(text)
+    if verdict is not None:
+        review_stats["structured"] += 1
+        return verdict
+
+    verdict = _parse_fields(text)
+    if verdict is not None:
+        review_stats["partial"] += 1
+        return verdict
+
+    review_stats["fallback"] += 1
+    upper = text.upper()
+    if "SATISFIED" in upper and "NEEDS_IMPROVEMENT" not in upper:
+        return ReviewVerdict(satisfied=True, needs_search=False)
+    return ReviewVerdict(satisfied=False, missing_info=text.replace("NEEDS_IMPROVEMENT", "").strip())
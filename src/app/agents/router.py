@@ -0,0 +1,241 @@
+"""知识检索前置路由
+
+在调用 LLM 判断 "是否需要检索" 之前先做本地判定：能确定时直接返回 YES/NO，
+拿不准 (返回 None) 再回退到 LLM。分类器可插拔：
+
+- ``RuleBasedClassifier``: 正则规则，覆盖问候/闲聊和明显的时效性、事实性问题
+- ``HashedLogisticClassifier``: 基于哈希特征的逻辑回归，可用 LLM 的历史判定训练
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import register_stats
+from src.app.services.embedding import HashingEmbedder, embedder
+
+
+class KnowledgeClassifier(Protocol):
+    """前置分类器接口：True/False 表示确定的判定，None 表示交给 LLM"""
+
+    def classify(self, text: str) -> bool | None: ...
+
+
+# 闲聊/问候：整句匹配才判定为 NO
+_SMALL_TALK_RE = re.compile(
+    r"^(你好|您好|嗨|哈喽|在吗|早上好|中午好|下午好|晚上好|早安|晚安|谢谢|多谢|谢谢你|"
+    r"再见|拜拜|好的|好|嗯|嗯嗯|哈+|ok|okay|hi|hello|hey|thanks|thank you|bye|"
+    r"你是谁|你叫什么|你叫什么名字|你能做什么|who are you)"
+    r"[\s,，!！。.~～?？呀啊呢吧]*$",
+    re.IGNORECASE,
+)
+# 纯算式
+_ARITHMETIC_RE = re.compile(r"^[\d\s+\-*/×÷().=?？]+$")
+# 明确要求检索：只认祈使/短语形式，"二分搜索"、"SQL 查询"、"search engine" 之类的提及不算；
+# 英文词用 ASCII 字母边界，中英混排时也能匹配
+_EXPLICIT_SEARCH_RE = re.compile(
+    r"(查一下|查查|搜一下|搜搜|搜索一下|检索一下|查询一下|帮我(搜|查|检索)|上网(搜|查)|联网(搜|查)|"
+    r"^\s*(please\s+)?(search|google|look\s+up)(?![a-z])|"
+    r"(?<![a-z])(search|look)\s+(the\s+web|online|the\s+internet)(?![a-z])|"
+    r"(?<![a-z])(google\s+it|look\s+it\s+up)(?![a-z]))",
+    re.IGNORECASE,
+)
+# 时效性/事实性线索
+_FACTUAL_RE = re.compile(
+    r"(最新|最近|今天|昨天|今年|去年|本周|目前|现任|新闻|股价|汇率|天气|价格|"
+    r"\d{4}\s*年|\b(19|20)\d{2}\b|谁(是|获得|发明|创立|赢)|哪一?年|什么时候|"
+    r"(?<![a-z])(latest|today|yesterday|news|prices?|weather|"
+    r"who\s+(is|was|won)|when\s+(did|was|is))(?![a-z]))",
+    re.IGNORECASE,
+)
+
+
+class RuleBasedClassifier:
+    """规则分类器"""
+
+    def classify(self, text: str) -> bool | None:
+        text = text.strip()
+        if not text:
+            return False
+
+        explicit = bool(_EXPLICIT_SEARCH_RE.search(text))
+        if explicit:
+            return True
+
+        if _SMALL_TALK_RE.match(text) or _ARITHMETIC_RE.match(text):
+            return False
+
+        if _FACTUAL_RE.search(text):
+            return True
+
+        return None
+
+
+class HashedLogisticClassifier:
+    """哈希特征 + 逻辑回归
+
+    概率 >= ``upper`` 判定 YES，<= ``lower`` 判定 NO，介于两者之间交给 LLM。
+    """
+
+    def __init__(
+        self,
+        text_embedder: HashingEmbedder | None = None,
+        lower: float = 0.15,
+        upper: float = 0.85,
+    ) -> None:
+        self.embedder = text_embedder or embedder
+        self.lower = lower
+        self.upper = upper
+        self.weights = np.zeros(self.embedder.dim, dtype=np.float32)
+        self.bias = 0.0
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        logits = self.embedder.embed(texts) @ self.weights + self.bias
+        probs: np.ndarray = 1.0 / (1.0 + np.exp(-logits))
+        return probs
+
+    def classify(self, text: str) -> bool | None:
+        proba = float(self.predict_proba([text])[0])
+        if proba >= self.upper:
+            return True
+        if proba <= self.lower:
+            return False
+        return None
+
+    def fit(
+        self,
+        texts: list[str],
+        labels: list[bool],
+        epochs: int = 300,
+        learning_rate: float = 0.5,
+        l2: float = 1e-3,
+    ) -> "HashedLogisticClassifier":
+        """批量梯度下降训练"""
+        x = self.embedder.embed(texts)
+        y = np.asarray(labels, dtype=np.float32)
+        n = len(texts)
+        for _ in range(epochs):
+            proba = 1.0 / (1.0 + np.exp(-(x @ self.weights + self.bias)))
+            error = proba - y
+            self.weights -= learning_rate * (x.T @ error / n + l2 * self.weights)
+            self.bias -= learning_rate * float(error.mean())
+        return self
+
+    def save(self, path: str | Path) -> None:
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            thresholds=np.array([self.lower, self.upper]),
+            dim=self.embedder.dim,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "HashedLogisticClassifier":
+        data = np.load(path)
+        lower, upper = (float(v) for v in data["thresholds"])
+        model = cls(HashingEmbedder(int(data["dim"])), lower=lower, upper=upper)
+        model.weights = data["weights"].astype(np.float32)
+        model.bias = float(data["bias"])
+        return model
+
+
+class ChainClassifier:
+    """依次询问多个分类器，取第一个确定的判定"""
+
+    def __init__(self, classifiers: list[KnowledgeClassifier]) -> None:
+        self.classifiers = classifiers
+
+    def classify(self, text: str) -> bool | None:
+        for classifier in self.classifiers:
+            decision = classifier.classify(text)
+            if decision is not None:
+                return decision
+        return None
+
+
+class KnowledgeRouter:
+    """前置路由：统计短路率，并可把 LLM 判定落盘作为训练数据"""
+
+    def __init__(
+        self,
+        classifier: KnowledgeClassifier | None,
+        decision_log_path: str = "",
+    ) -> None:
+        self.classifier = classifier
+        self.decision_log_path = decision_log_path
+        self._stats = {"short_circuit_yes": 0, "short_circuit_no": 0, "llm_fallbacks": 0}
+
+    def decide(self, text: str) -> bool | None:
+        """本地判定，无法确定时返回 None"""
+        decision = self.classifier.classify(text) if self.classifier else None
+        if decision is None:
+            self._stats["llm_fallbacks"] += 1
+        elif decision:
+            self._stats["short_circuit_yes"] += 1
+        else:
+            self._stats["short_circuit_no"] += 1
+        return decision
+
+    def record_llm_decision(self, text: str, need_knowledge: bool) -> None:
+        """记录 LLM 的判定，供离线训练和回放评估"""
+        if not self.decision_log_path:
+            return
+        try:
+            with open(self.decision_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text, "label": need_knowledge}, ensure_ascii=False))
+                f.write("\n")
+        except OSError as e:
+            logger.warning(f"写入路由判定日志失败: {e}")
+
+    def stats(self) -> dict[str, float]:
+        short_circuits = self._stats["short_circuit_yes"] + self._stats["short_circuit_no"]
+        total = short_circuits + self._stats["llm_fallbacks"]
+        return {
+            **self._stats,
+            "short_circuit_rate": short_circuits / total if total else 0.0,
+        }
+
+
+def evaluate(classifier: KnowledgeClassifier, samples: list[tuple[str, bool]]) -> dict[str, float]:
+    """在回放集上评估：短路率，以及短路部分相对 LLM 判定的准确率"""
+    decided = correct = false_no = 0
+    for text, label in samples:
+        decision = classifier.classify(text)
+        if decision is None:
+            continue
+        decided += 1
+        correct += decision == label
+        false_no += label and not decision
+    return {
+        "samples": len(samples),
+        "short_circuit_rate": decided / len(samples) if samples else 0.0,
+        "accuracy": correct / decided if decided else 0.0,
+        "false_no": false_no,
+    }
+
+
+def build_classifier(mode: str, model_path: str = "") -> KnowledgeClassifier | None:
+    """根据配置构建分类器：off / rules / model"""
+    if mode == "off":
+        return None
+    if mode == "model":
+        if model_path and Path(model_path).exists():
+            return ChainClassifier(
+                [RuleBasedClassifier(), HashedLogisticClassifier.load(model_path)]
+            )
+        logger.warning(f"路由模型文件不存在: {model_path!r}，仅使用规则")
+    return RuleBasedClassifier()
+
+
+# 路由单例
+knowledge_router = KnowledgeRouter(
+    build_classifier(settings.router_mode, settings.router_model_path),
+    decision_log_path=settings.router_decision_log_path,
+)
+register_stats("knowledge_router", knowledge_router.stats)
@@ -1,19 +1,49 @@
+import asyncio
+import re
+from difflib import SequenceMatcher
 from typing import Any
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from src.app.agents.context import (
+    context_coverage,
+    count_tokens,
+    fuse_results,
+    merge_passages,
+    render_context,
+    trim_passages,
+)
+from src.app.agents.review import parse_review, review_stats
+from src.app.agents.router import knowledge_router
 from src.app.agents.state import AgentState
 from src.app.core.config import settings
 from src.app.core.logging import logger
+from src.app.core.metrics import register_stats
 from src.app.core.prompts import (
     CHECK_PROMPT_DEFAULT,
     CHECK_PROMPT_REFLECTION,
+    DECOMPOSE_PROMPT,
+    DECOMPOSE_REFLECTION,
     GENERATE_SYSTEM_PROMPT_BASE,
     GENERATE_SYSTEM_PROMPT_KNOWLEDGE,
     GENERATE_SYSTEM_PROMPT_REFLECTION,
+    GENERATE_SYSTEM_PROMPT_SUMMARY,
     REFINE_PROMPT,
     REFLECT_PROMPT,
+    SUMMARIZE_HISTORY_PROMPT,
 )
 from src.app.services.knowledge import knowledge_service
-from src.app.services.llm import llm
+from src.app.services.llm import DeadlineExceeded, llm
+from src.app.services.reranker import reranker
+
+# 投机检索统计：launched = 发起数，used = 结果被采用，wasted = 判断为 NO 后作废，
+# wasted_completed = 作废时上游请求已完成（成本已付出）
+speculation_stats = {"launched": 0, "used": 0, "wasted": 0, "wasted_completed": 0}
+register_stats("speculative_search", lambda: speculation_stats)
+
+# 多查询检索统计：rounds = 执行轮数，queries = 子查询总数
+multi_query_stats = {"rounds": 0, "queries": 0}
+register_stats("multi_query", lambda: multi_query_stats)
+
+_QUERY_PREFIX_RE = re.compile(r"^\s*(?:[-*•]|\d+[.、)）]|查询\s*\d*[:：])\s*")
 
 def get_last_content(messages: list) -> str:
     """获取最后一条消息的内容"""
@@ -22,6 +52,92 @@ def get_last_content(messages: list) -> str:
     content = messages[-1].content
     return str(content) if content is not None else ""
 
+def answer_similarity(previous: str, current: str) -> float:
+    """两版回答的相似度 (0-1)，1 - 相似度即编辑比例"""
+    return SequenceMatcher(None, previous, current, autojunk=False).ratio()
+
+def discard_task(task: asyncio.Task) -> None:
+    """取消不再需要的任务，并由回调取走取消前已抛出的异常，避免事件循环告警"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+def render_history(messages: list) -> str:
+    """把消息列表渲染为纯文本对话记录"""
+    roles = {"human": "用户", "ai": "助手", "system": "系统"}
+    return "\n".join(
+        f"{roles.get(getattr(m, 'type', ''), '消息')}: {m.content}" for m in messages
+    )
+
+def parse_queries(text: str, limit: int) -> list[str]:
+    """解析 LLM 输出的子查询：每行一个，去掉编号与重复"""
+    queries: list[str] = []
+    seen: set[str] = set()
+    for line in text.splitlines():
+        query = _QUERY_PREFIX_RE.sub("", line).strip().strip("\"'")
+        if query and query.lower() not in seen:
+            seen.add(query.lower())
+            queries.append(query)
+    return queries[:limit]
+
+async def multi_query_search(
+    question: str, reflection: str, first_round: asyncio.Task[list[dict]] | None = None
+) -> list[dict]:
+    """
+    多查询检索：一次 LLM 调用拆出子查询，与原问题一起并发检索后 RRF 融合。
+
+    首轮原问题也作为一路（投机检索已发起时直接复用其结果）；反思轮只检索子查询。
+    """
+    prompt = DECOMPOSE_PROMPT.format(
+        question=question,
+        reflection=DECOMPOSE_REFLECTION.format(reflection=reflection) if reflection else "",
+        count=settings.multi_query_count,
+    )
+    try:
+        response = await llm.ainvoke([HumanMessage(content=prompt)], role="refine")
+    except BaseException:
+        if first_round:
+            discard_task(first_round)
+        raise
+    queries = parse_queries(str(response.content), settings.multi_query_count) or [question]
+    logger.info(f"[Searcher] 子查询: {queries}")
+
+    if not reflection and first_round is None:
+        first_round = asyncio.create_task(knowledge_service.search(question))
+    sub_queries = knowledge_service.search_many(
+        queries, concurrency=settings.multi_query_concurrency
+    )
+    if first_round is not None:
+        original, sub_results = await asyncio.gather(first_round, sub_queries)
+        result_lists = [original, *sub_results]
+    else:
+        result_lists = await sub_queries
+
+    multi_query_stats["rounds"] += 1
+    multi_query_stats["queries"] += len(queries)
+    return fuse_results([r for r in result_lists if r])
+
+async def compact_history_node(state: AgentState) -> dict[str, Any]:
+    """
+    会话压缩：历史超过 token 阈值时，把较早的消息总结进 conversation_summary 并移除。
+    """
+    history = state["messages"][:-1]
+    keep = settings.memory_keep_messages
+    if len(history) <= keep or count_tokens(render_history(history)) <= settings.memory_max_history_tokens:
+        return {}
+
+    stale = history[:-keep] if keep else history
+    prompt = SUMMARIZE_HISTORY_PROMPT.format(
+        summary=state.get("conversation_summary", "") or "无",
+        history=render_history(stale),
+    )
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
+
+    logger.info(f"[Memory] 压缩 {len(stale)} 条历史消息")
+    return {
+        "conversation_summary": str(response.content).strip(),
+        "messages": [RemoveMessage(id=m.id) for m in stale],
+    }
+
 async def searcher_agent(state: AgentState) -> dict[str, Any]:
     """
     Searcher Agent: 专门负责判断是否需要检索并执行检索。
@@ -30,39 +146,90 @@ async def searcher_agent(state: AgentState) -> dict[str, Any]:
     last_message = get_last_content(messages)
     reflection = state.get("reflection", "")
     
-    # 1. 判断是否需要检索
-    if reflection:
-        check_prompt = CHECK_PROMPT_REFLECTION.format(
-            reflection=reflection, last_message=last_message
-        )
+    # 1. 判断是否需要检索（首轮先走本地路由，拿不准再问 LLM）
+    need_knowledge = None if reflection else knowledge_router.decide(last_message)
+    speculative_search: asyncio.Task[list[dict]] | None = None
+    if need_knowledge is None:
+        if reflection:
+            check_prompt = CHECK_PROMPT_REFLECTION.format(
+                reflection=reflection, last_message=last_message
+            )
+        else:
+            check_prompt = CHECK_PROMPT_DEFAULT.format(last_message=last_message)
+            # 投机检索：首轮查询词就是原问题，可与判断调用并发执行
+            if settings.speculative_search:
+                speculative_search = asyncio.create_task(knowledge_service.search(last_message))
+                speculation_stats["launched"] += 1
+
+        try:
+            response = await llm.ainvoke([HumanMessage(content=check_prompt)], role="check")
+        except BaseException:
+            if speculative_search:
+                discard_task(speculative_search)
+            raise
+        content = str(response.content)
+        need_knowledge = "YES" in content.upper()
+        if not reflection:
+            knowledge_router.record_llm_decision(last_message, need_knowledge)
     else:
-        check_prompt = CHECK_PROMPT_DEFAULT.format(last_message=last_message)
+        logger.info(f"[Searcher] 本地路由判定 need_knowledge: {need_knowledge}")
+
+    # 多轮会话：已有上下文足以覆盖新问题时直接复用，不再检索
+    context = state.get("knowledge_context", "")
+    passages = state.get("knowledge_passages", [])
+    reuse_context = bool(
+        need_knowledge
+        and not reflection
+        and passages
+        and context_coverage(last_message, passages) >= settings.memory_context_reuse_coverage
+    )
+    if reuse_context:
+        logger.info("[Searcher] 复用历史检索上下文")
+        passages = await reranker.rerank(last_message, passages)
+        context = render_context(passages, max_passages=reranker.max_passages)
 
-    response = await llm.ainvoke([HumanMessage(content=check_prompt)])
-    content = str(response.content)
-    need_knowledge = "YES" in content.upper()
+    if speculative_search and (not need_knowledge or reuse_context):
+        # 投机作废：检索已完成则结果丢弃，否则取消
+        speculation_stats["wasted"] += 1
+        if speculative_search.done():
+            speculation_stats["wasted_completed"] += 1
+        discard_task(speculative_search)
+        logger.info("[Searcher] 投机检索作废")
     
     # 2. 执行检索（如果需要）
-    context = state.get("knowledge_context", "")
-    if need_knowledge:
-        query = last_message
-        if reflection:
-            refine_prompt = REFINE_PROMPT.format(query=query, reflection=reflection)
-            response = await llm.ainvoke([HumanMessage(content=refine_prompt)])
-            query = str(response.content).strip()
-            logger.info(f"[Searcher] 优化查询: {query}")
-        
-        results = await knowledge_service.search(query)
+    new_sources = 0
+    if need_knowledge and not reuse_context:
+        if settings.multi_query_count > 1:
+            if speculative_search:
+                speculation_stats["used"] += 1
+            results = await multi_query_search(last_message, reflection, speculative_search)
+        elif speculative_search:
+            speculation_stats["used"] += 1
+            results = await speculative_search
+        else:
+            query = last_message
+            if reflection:
+                refine_prompt = REFINE_PROMPT.format(query=query, reflection=reflection)
+                response = await llm.ainvoke([HumanMessage(content=refine_prompt)], role="refine")
+                query = str(response.content).strip()
+                logger.info(f"[Searcher] 优化查询: {query}")
+
+            results = await knowledge_service.search(query)
         if results:
-            new_context = "\n\n".join(
-                [f"[来源: {r.get('source', '未知')}]\n{r.get('content', '')}" for r in results]
-            )
-            context = f"{context}\n\n--- 新检索结果 ---\n{new_context}" if context else new_context
+            known = len(passages)
+            passages = merge_passages(passages, results, state.get("iteration", 0))
+            new_sources = len(passages) - known
+            # 按原问题重排序，只把最相关的 top_k 条写入 writer prompt；会话内保留的 passage 有上限
+            passages = await reranker.rerank(last_message, passages)
+            passages = trim_passages(passages, settings.memory_max_passages, fresh=results)
+            context = render_context(passages, max_passages=reranker.max_passages)
 
     logger.info(f"[Searcher] 检索完成，need_knowledge: {need_knowledge}")
     return {
         "need_knowledge": need_knowledge, 
         "knowledge_context": context,
+        "knowledge_passages": passages,
+        "new_sources": new_sources,
         "next_agent": "writer"
     }
 
@@ -85,12 +252,17 @@ async def writer_agent(state: AgentState) -> dict[str, Any]:
     if reflection and iteration > 0:
         system_prompt += GENERATE_SYSTEM_PROMPT_REFLECTION.format(reflection=reflection)
 
+    summary = state.get("conversation_summary", "")
+    if summary:
+        system_prompt += GENERATE_SYSTEM_PROMPT_SUMMARY.format(summary=summary)
+
     all_messages = [SystemMessage(content=system_prompt)] + messages
     response = await llm.ainvoke(all_messages)
 
     logger.info(f"[Writer] 生成回答 (第 {iteration + 1} 轮)")
     return {
         "current_answer": str(response.content), 
+        "previous_answer": state.get("current_answer", ""),
         "iteration": iteration + 1,
         "next_agent": "reviewer"
     }
@@ -110,23 +282,52 @@ async def reviewer_agent(state: AgentState) -> dict[str, Any]:
         logger.info("[Reviewer] 达到最大迭代次数，满意结束")
         return {"is_satisfied": True, "reflection": "", "next_agent": "end"}
 
+    # 增量复审：没有新来源且回答几乎未变时，再评审结果可预期，直接结束
+    previous_answer = state.get("previous_answer", "")
+    if iteration > 1 and previous_answer and not state.get("new_sources", 0):
+        similarity = answer_similarity(previous_answer, answer)
+        if similarity >= settings.review_skip_similarity:
+            reason = f"回答与上一轮相似度 {similarity:.2f} 且无新增来源"
+            logger.info(f"[Reviewer] 提前结束: {reason}")
+            return {
+                "is_satisfied": True,
+                "reflection": "",
+                "early_stop_reason": reason,
+                "next_agent": "end",
+            }
+
     reflect_prompt = REFLECT_PROMPT.format(
         question=question,
         answer=answer,
         knowledge_context=knowledge_context[:1000] if knowledge_context else "无外部知识",
     )
 
-    response = await llm.ainvoke([HumanMessage(content=reflect_prompt)])
-    response_text = str(response.content).strip()
-
-    if "SATISFIED" in response_text.upper() and "NEEDS_IMPROVEMENT" not in response_text.upper():
-        logger.info("[Reviewer] 评估结果: 满意")
-        return {"is_satisfied": True, "reflection": "", "next_agent": "end"}
-    else:
-        reflection = response_text.replace("NEEDS_IMPROVEMENT", "").strip()
-        logger.info(f"[Reviewer] 评估结果: 不满意 - {reflection[:30]}...")
+    # JSON 模式让模型只输出结论对象，省去长篇评语
+    json_mode = {"response_format": {"type": "json_object"}} if settings.review_json_mode else {}
+    try:
+        response = await llm.ainvoke([HumanMessage(content=reflect_prompt)], role="review", **json_mode)
+    except DeadlineExceeded as e:
+        # 已有回答，截止时间不够再评审一轮时直接交付
+        logger.warning(f"[Reviewer] 提前结束: {e}")
         return {
-            "is_satisfied": False, 
-            "reflection": reflection, 
-            "next_agent": "searcher"
+            "is_satisfied": True,
+            "reflection": "",
+            "early_stop_reason": str(e),
+            "next_agent": "end",
         }
+    verdict = parse_review(str(response.content))
+
+    if verdict.satisfied:
+        logger.info(f"[Reviewer] 评估结果: 满意 (score={verdict.score:g})")
+        return {"is_satisfied": True, "reflection": "", "next_agent": "end"}
+
+    reflection = verdict.missing_info or "回答不够好，请改进"
+    logger.info(
+        f"[Reviewer] 评估结果: 不满意 (score={verdict.score:g}, needs_search={verdict.needs_search})"
+        f" - {reflection[:30]}..."
+    )
+    if not verdict.needs_search:
+        # 不需要新知识：跳过 Searcher 的判定与检索，带着反思意见直接重写
+        review_stats["skip_search"] += 1
+        return {"is_satisfied": False, "reflection": reflection, "new_sources": 0, "next_agent": "writer"}
+    return {"is_satisfied": False, "reflection": reflection, "next_agent": "searcher"}
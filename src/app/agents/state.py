@@ -10,17 +10,22 @@ class AgentState(TypedDict):
 
     # 对话历史
     messages: Annotated[list, add_messages]
+    conversation_summary: str  # 被压缩的早期对话摘要
 
     # 检索相关
     knowledge_context: str
+    knowledge_passages: list[dict]
     need_knowledge: bool
+    new_sources: int  # 本轮检索新增的来源数
 
     # 生成相关
     current_answer: str
+    previous_answer: str  # 上一轮回答，用于增量复审
 
     # 反思相关
     reflection: str
     is_satisfied: bool
+    early_stop_reason: str  # 增量复审提前结束的原因
 
     # 控制
     iteration: int
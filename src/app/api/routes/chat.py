@@ -1,95 +1,222 @@
 """聊天路由"""
 
 import json
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from starlette.background import BackgroundTask
 
 from src.app.agents.graph import agent
-from src.app.api.schemas import ChatRequest, ChatResponse
+from src.app.agents.memory import conversation_memory
+from src.app.api.schemas import (
+    AnswerCacheStats,
+    CacheStatsResponse,
+    ChatRequest,
+    ChatResponse,
+    SearchCacheStats,
+)
+from src.app.core.admission import admission_controller
+from src.app.core.config import settings
+from src.app.core.metrics import trace_request
+from src.app.services.answer_cache import answer_cache, normalize_message
+from src.app.services.embedding_service import embedding_service
+from src.app.services.knowledge import knowledge_service
+from src.app.services.llm import request_deadline
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# 逐 token 推送输出的节点（其余节点的 LLM 调用只是中间判断，不转发）
+TOKEN_STREAM_NODES = {"writer", "generate"}
+
 
 def get_initial_state(message: str) -> dict:
     """获取初始状态"""
     return {
         "messages": [HumanMessage(content=message)],
         "knowledge_context": "",
+        "knowledge_passages": [],
         "need_knowledge": False,
         "current_answer": "",
         "reflection": "",
         "is_satisfied": False,
+        "early_stop_reason": "",
         "iteration": 0,
     }
 
 
+def prepare_run(request: ChatRequest) -> tuple[Any, dict[str, Any], RunnableConfig | None]:
+    """选择本次运行的 Agent、输入与配置：带 conversation_id 且启用会话记忆时走持久化 Agent"""
+    if request.conversation_id and conversation_memory.enabled:
+        return (
+            conversation_memory.agent,
+            conversation_memory.turn_input(request.message),
+            conversation_memory.config(request.conversation_id),
+        )
+    return agent, get_initial_state(request.message), None
+
+
 @router.post("", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """聊天接口（非流式）"""
-    result = await agent.ainvoke(get_initial_state(request.message))
+    with trace_request() as spans:
+        response = await run_chat(request)
+    if request.debug or settings.debug:
+        response.timings = spans
+    return response
+
+
+async def run_chat(request: ChatRequest) -> ChatResponse:
+    """执行一次非流式对话（含回答缓存）"""
+    # 多轮会话的回答依赖历史，不走回答缓存
+    use_cache = (
+        settings.answer_cache_enabled and not request.bypass_cache and not request.conversation_id
+    )
+    vector = None
+    if use_cache:
+        # 语义匹配所需的向量在线程池中批量计算，不占用事件循环
+        if answer_cache.similarity_threshold < 1.0:
+            vector = await embedding_service.embed(normalize_message(request.message))
+        cached = answer_cache.get(request.message, vector)
+        if cached is not None:
+            return ChatResponse(**cached, cached=True)
+    elif settings.answer_cache_enabled:
+        answer_cache.stats.bypassed += 1
+
+    run_agent, run_input, config = prepare_run(request)
+    async with admission_controller.slot():
+        with request_deadline(settings.request_deadline_seconds):
+            result = await run_agent.ainvoke(run_input, config=config)
 
     messages = result.get("messages", [])
     reply = messages[-1].content if messages else "抱歉，我无法生成回复。"
 
-    return ChatResponse(
+    response = ChatResponse(
         reply=str(reply),
         used_knowledge=bool(result.get("knowledge_context")),
         iterations=result.get("iteration", 1),
+        early_stopped=bool(result.get("early_stop_reason")),
+        stop_reason=result.get("early_stop_reason") or None,
+    )
+    if settings.answer_cache_enabled and not request.conversation_id and messages:
+        answer_cache.set(
+            request.message, response.model_dump(exclude={"cached", "timings"}), vector
+        )
+    return response
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def cache_stats() -> CacheStatsResponse:
+    """回答缓存与检索缓存统计"""
+    return CacheStatsResponse(
+        answer=AnswerCacheStats(
+            size=len(answer_cache),
+            max_entries=answer_cache.max_entries,
+            **answer_cache.stats.as_dict(),
+        ),
+        search=SearchCacheStats(**knowledge_service.cache_stats()),
     )
 
 
+def build_step_info(node_name: str, node_output: dict) -> dict:
+    """将节点输出转换为 SSE 步骤事件"""
+    step_info: dict = {"step": node_name}
+
+    if node_name in ("check", "searcher"):
+        need_knowledge = node_output.get("need_knowledge", False)
+        step_info["detail"] = f"需要检索知识: {'是' if need_knowledge else '否'}"
+
+    if node_name in ("retrieve", "searcher"):
+        context = node_output.get("knowledge_context", "")
+        if context:
+            step_info["preview"] = context[:200] + "..." if len(context) > 200 else context
+        if node_name == "retrieve":
+            step_info["detail"] = f"检索到 {len(context)} 字符的知识"
+
+    elif node_name in ("generate", "writer"):
+        answer = node_output.get("current_answer", "")
+        iteration = node_output.get("iteration", 0)
+        step_info["detail"] = f"生成回答 (第 {iteration} 轮)"
+        step_info["answer"] = answer
+
+    elif node_name in ("reflect", "reviewer"):
+        is_satisfied = node_output.get("is_satisfied", False)
+        reflection = node_output.get("reflection", "")
+        step_info["detail"] = f"反思评估: {'满意' if is_satisfied else '需要改进'}"
+        if reflection:
+            step_info["reflection"] = reflection
+        if node_output.get("early_stop_reason"):
+            step_info["early_stop"] = node_output["early_stop_reason"]
+
+    elif node_name == "finalize":
+        step_info["detail"] = "完成"
+
+    return step_info
+
+
+def sse_event(data: dict) -> str:
+    """序列化为 SSE 数据帧"""
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/stream")
 async def chat_stream(request: ChatRequest) -> StreamingResponse:
-    """流式聊天接口"""
+    """流式聊天接口
+
+    默认同时订阅 ``updates`` 与 ``messages`` 两种流：节点完成时推送步骤事件，
+    writer 生成过程中逐 token 推送 ``delta`` 事件，首字节时间不再等于完整生成耗时。
+    ``stream_tokens=False`` 时退回仅推送步骤事件的旧行为。
+    """
+
+    # 在返回流之前完成准入，未获准入时直接 503
+    admission = await admission_controller.acquire()
+    try:
+        stream_mode = ["updates", "messages"] if request.stream_tokens else ["updates"]
+        run_agent, run_input, config = prepare_run(request)
+    except BaseException:
+        admission.release()
+        raise
 
     async def generate() -> AsyncGenerator[str, None]:
         try:
-            async for event in agent.astream(
-                get_initial_state(request.message), stream_mode="updates"
-            ):
-                for node_name, node_output in event.items():
-                    step_info = {"step": node_name}
-
-                    if node_name == "check":
-                        need_knowledge = node_output.get("need_knowledge", False)
-                        step_info["detail"] = f"需要检索知识: {'是' if need_knowledge else '否'}"
-
-                    elif node_name == "retrieve":
-                        context = node_output.get("knowledge_context", "")
-                        step_info["detail"] = f"检索到 {len(context)} 字符的知识"
-                        if context:
-                            step_info["preview"] = (
-                                context[:200] + "..." if len(context) > 200 else context
+            with trace_request() as spans, request_deadline(settings.request_deadline_seconds):
+                async for mode, chunk in run_agent.astream(
+                    run_input, config=config, stream_mode=stream_mode
+                ):
+                    if mode == "messages":
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") not in TOKEN_STREAM_NODES:
+                            continue
+                        content = message.content
+                        if isinstance(content, str) and content:
+                            yield sse_event(
+                                {
+                                    "step": "delta",
+                                    "node": metadata["langgraph_node"],
+                                    "content": content,
+                                }
                             )
+                        continue
 
-                    elif node_name == "generate":
-                        answer = node_output.get("current_answer", "")
-                        iteration = node_output.get("iteration", 0)
-                        step_info["detail"] = f"生成回答 (第 {iteration} 轮)"
-                        step_info["answer"] = answer
-
-                    elif node_name == "reflect":
-                        is_satisfied = node_output.get("is_satisfied", False)
-                        reflection = node_output.get("reflection", "")
-                        step_info["detail"] = f"反思评估: {'满意' if is_satisfied else '需要改进'}"
-                        if reflection:
-                            step_info["reflection"] = reflection
-
-                    elif node_name == "finalize":
-                        step_info["detail"] = "完成"
-
-                    yield f"data: {json.dumps(step_info, ensure_ascii=False)}\n\n"
+                    for node_name, node_output in chunk.items():
+                        yield sse_event(build_step_info(node_name, node_output or {}))
 
-            yield f"data: {json.dumps({'step': 'done'}, ensure_ascii=False)}\n\n"
+            done: dict = {"step": "done"}
+            if request.debug or settings.debug:
+                done["timings"] = spans
+            yield sse_event(done)
 
         except Exception as e:
-            yield f"data: {json.dumps({'step': 'error', 'detail': str(e)}, ensure_ascii=False)}\n\n"
+            yield sse_event({"step": "error", "detail": str(e)})
+        finally:
+            admission.release()
 
+    # 客户端在流开始前断开时生成器不会执行，由后台任务兜底归还名额（release 可重复调用）
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "Connection": "keep-alive"},
+        background=BackgroundTask(admission.release),
     )
@@ -0,0 +1,12 @@
+"""Prometheus 指标路由"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus 抓取端点"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -8,6 +8,9 @@ class ChatRequest(BaseModel):
 
     message: str = Field(..., description="用户消息", min_length=1)
     conversation_id: str | None = Field(None, description="会话 ID")
+    stream_tokens: bool = Field(True, description="流式接口是否逐 token 推送回答")
+    bypass_cache: bool = Field(False, description="跳过回答缓存，强制重新生成")
+    debug: bool = Field(False, description="在响应中附带各节点/外部调用耗时明细")
 
 
 class ChatResponse(BaseModel):
@@ -16,6 +19,10 @@ class ChatResponse(BaseModel):
     reply: str = Field(..., description="AI 回复")
     used_knowledge: bool = Field(..., description="是否使用了外部知识")
     iterations: int = Field(..., description="反思迭代次数")
+    cached: bool = Field(default=False, description="是否命中回答缓存")
+    early_stopped: bool = Field(False, description="是否因回答收敛提前结束反思")
+    stop_reason: str | None = Field(None, description="提前结束原因")
+    timings: list[dict] | None = Field(default=None, description="耗时明细 (debug 模式)")
 
 
 class HealthResponse(BaseModel):
@@ -23,3 +30,38 @@ class HealthResponse(BaseModel):
 
     status: str = "healthy"
     version: str = "0.1.0"
+
+
+class AnswerCacheStats(BaseModel):
+    """回答缓存统计"""
+
+    size: int = Field(..., description="当前条目数")
+    max_entries: int = Field(..., description="最大条目数")
+    exact_hits: int = Field(..., description="精确命中次数")
+    semantic_hits: int = Field(..., description="语义命中次数")
+    misses: int = Field(..., description="未命中次数")
+    bypassed: int = Field(..., description="跳过缓存次数")
+    evictions: int = Field(..., description="LRU 淘汰次数")
+    expirations: int = Field(..., description="TTL 过期次数")
+    hit_rate: float = Field(..., description="命中率")
+
+
+class SearchCacheStats(BaseModel):
+    """检索缓存统计"""
+
+    size: int = Field(..., description="当前条目数")
+    max_entries: int = Field(..., description="最大条目数")
+    hits: int = Field(..., description="缓存命中次数")
+    misses: int = Field(..., description="未命中次数")
+    coalesced: int = Field(..., description="合并到进行中请求的次数")
+    upstream_calls: int = Field(..., description="实际调用 Tavily 的次数")
+    evictions: int = Field(..., description="LRU 淘汰次数")
+    inflight: int = Field(..., description="进行中的上游请求数")
+    hit_rate: float = Field(..., description="命中率 (含合并)")
+
+
+class CacheStatsResponse(BaseModel):
+    """缓存统计响应"""
+
+    answer: AnswerCacheStats
+    search: SearchCacheStats
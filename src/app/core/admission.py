@@ -0,0 +1,213 @@
+"""准入控制与上游限流
+
+- ``AdmissionController``: 限制同时运行的 Agent 数，超出的请求进入有界 FIFO 队列等待；
+  队列已满或排队超时立即拒绝，由接口层转换为 503 + Retry-After
+- ``TokenBucket``: 令牌桶限流，实现 LangChain ``BaseRateLimiter`` 接口，
+  可直接传给 ``ChatOpenAI(rate_limiter=...)``，也可在检索前手动 ``aacquire()``
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from src.app.core.config import settings
+from src.app.core.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT,
+    RATE_LIMIT_WAIT,
+    register_stats,
+)
+
+
+class AdmissionRejected(Exception):
+    """请求未获准入"""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(f"服务繁忙 ({reason})，请 {retry_after} 秒后重试")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Admission:
+    """一次准入凭证，release() 可重复调用"""
+
+    def __init__(self, controller: "AdmissionController") -> None:
+        self._controller = controller
+        self._started_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started_at)
+
+
+class AdmissionController:
+    """并发上限 + 有界等待队列"""
+
+    def __init__(
+        self, max_in_flight: int = 16, max_queue: int = 64, queue_timeout_seconds: float = 10.0
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        # 单次运行耗时的指数滑动平均，用于估算 Retry-After
+        self._avg_run_seconds = 5.0
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Admission:
+        """获取运行名额，必要时排队；失败抛出 AdmissionRejected"""
+        if self.max_in_flight <= 0 or (self.in_flight < self.max_in_flight and not self._waiters):
+            return self._admit()
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._stats["queued"] += 1
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout_seconds)
+        except TimeoutError:
+            self._discard(future)
+            ADMISSION_WAIT.labels(outcome="timeout").observe(time.perf_counter() - start)
+            self._reject("timeout")
+        except asyncio.CancelledError:
+            self._discard(future)
+            # 名额已移交但调用方被取消时，归还名额
+            if future.done() and not future.cancelled():
+                self._release(0.0)
+            raise
+        ADMISSION_WAIT.labels(outcome="admitted").observe(time.perf_counter() - start)
+        # _release 移交名额时 in_flight 保持不变，这里只需计数
+        self._stats["admitted"] += 1
+        return Admission(self)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        admission = await self.acquire()
+        try:
+            yield
+        finally:
+            admission.release()
+
+    def retry_after(self) -> int:
+        """按平均运行耗时与排队长度估算需要等待的秒数"""
+        rounds = (len(self._waiters) + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(self._avg_run_seconds * rounds))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self._stats,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "avg_run_seconds": self._avg_run_seconds,
+        }
+
+    def _admit(self) -> Admission:
+        self.in_flight += 1
+        self._stats["admitted"] += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_WAIT.labels(outcome="admitted").observe(0.0)
+        return Admission(self)
+
+    def _reject(self, reason: str) -> None:
+        self._stats[f"rejected_{reason}"] += 1
+        ADMISSION_REJECTED.labels(reason=reason).inc()
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _discard(self, future: asyncio.Future[None]) -> None:
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    def _release(self, run_seconds: float) -> None:
+        if run_seconds > 0:
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+        # 名额直接移交给队首等待者，避免新来的请求插队
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+                return
+        ADMISSION_QUEUE_DEPTH.set(0)
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+
+class TokenBucket(BaseRateLimiter):
+    """令牌桶：以 rate 个/秒补充，最多积累 burst 个；rate <= 0 表示不限流"""
+
+    def __init__(self, name: str, rate: float, burst: int = 1) -> None:
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """尝试取一个令牌，成功返回 0，否则返回还需等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if self.rate <= 0:
+            return True
+        start = time.perf_counter()
+        while (wait := self._try_take()) > 0:
+            if not blocking:
+                return False
+            time.sleep(wait)
+        RATE_LIMIT_WAIT.labels(limiter=self.name).observe(time.perf_counter() - start)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if self.rate <= 0:
+            return True
+        start = time.perf_counter()
+        while (wait := self._try_take()) > 0:
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+        RATE_LIMIT_WAIT.labels(limiter=self.name).observe(time.perf_counter() - start)
+        return True
+
+
+# 单例
+admission_controller = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_queue=settings.admission_max_queue,
+    queue_timeout_seconds=settings.admission_queue_timeout_seconds,
+)
+register_stats("admission", admission_controller.stats)
+llm_rate_limiter = TokenBucket("llm", settings.llm_rate_limit_per_second, settings.llm_rate_limit_burst)
+search_rate_limiter = TokenBucket(
+    "search", settings.search_rate_limit_per_second, settings.search_rate_limit_burst
+)
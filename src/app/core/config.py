@@ -20,12 +20,122 @@ class Settings(BaseSettings):
     deepseek_api_key: str = ""
     deepseek_base_url: str = "https://api.deepseek.com/v1"
     deepseek_model: str = "deepseek-chat"
+    # 分角色模型：model / base_url / api_key 留空时沿用上面的 DeepSeek 配置，max_tokens 为 0 表示不限。
+    # check / refine / review 只需简短确定的输出，适合小模型 + 低温度 + 限制输出长度
+    check_model: str = ""
+    check_base_url: str = ""
+    check_api_key: str = ""
+    check_temperature: float = 0.0
+    check_max_tokens: int = 5
+    refine_model: str = ""
+    refine_base_url: str = ""
+    refine_api_key: str = ""
+    refine_temperature: float = 0.0
+    refine_max_tokens: int = 128
+    review_model: str = ""
+    review_base_url: str = ""
+    review_api_key: str = ""
+    review_temperature: float = 0.0
+    review_max_tokens: int = 256
+    review_json_mode: bool = True  # 评审以 response_format=json_object 调用，输出紧凑的 JSON 结论
+    generate_model: str = ""
+    generate_base_url: str = ""
+    generate_api_key: str = ""
+    generate_temperature: float = 0.7
+    generate_max_tokens: int = 0
+
+    # LLM 网关：单次调用超时、抖动指数退避重试、连接池上限
+    llm_timeout_seconds: float = 30.0
+    llm_max_retries: int = 2
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8.0
+    llm_max_connections: int = 50
+    # 单个请求的截止时间 (0 为不限)；剩余时间不足 llm_min_budget_seconds 时不再发起调用
+    request_deadline_seconds: float = 120.0
+    llm_min_budget_seconds: float = 1.0
+    # 对冲请求：调用超过该节点 p95 耗时仍未返回时再发一份，取先返回者
+    llm_hedge_enabled: bool = False
+    llm_hedge_min_samples: int = 20
+    llm_hedge_min_delay_seconds: float = 0.5
+    # 每千 token 单价，用于费用估算指标
+    llm_prompt_price_per_1k: float = 0.0
+    llm_completion_price_per_1k: float = 0.0
 
     # Tavily
     tavily_api_key: str = ""
+    tavily_base_url: str = "https://api.tavily.com"
+    search_cache_ttl_seconds: float = 600.0
+    search_cache_max_entries: int = 512
+
+    # 知识检索后端 (tavily / local)
+    knowledge_backend: str = "tavily"
+    local_kb_path: str = "data/kb"
+    local_kb_rrf_k: int = 60
+    # 向量检索方式 (exact / ivf)，nprobe 越大召回越高、延迟越高
+    local_kb_vector_index: str = "exact"
+    local_kb_nprobe: int = 8
+
+    # 准入控制：同时运行的 Agent 数上限 (0 为不限)、等待队列长度与排队超时
+    admission_max_in_flight: int = 16
+    admission_max_queue: int = 64
+    admission_queue_timeout_seconds: float = 10.0
+
+    # 上游令牌桶限流：每秒请求数 (0 为不限) 与突发容量
+    llm_rate_limit_per_second: float = 0.0
+    llm_rate_limit_burst: int = 10
+    search_rate_limit_per_second: float = 0.0
+    search_rate_limit_burst: int = 5
 
     # Agent
     max_iterations: int = 3
+    # 无新增来源且回答与上一轮相似度不低于该值时跳过复审 (设为 >1 关闭)
+    review_skip_similarity: float = 0.95
+
+    # 检索前置路由 (off / rules / model)
+    router_mode: str = "rules"
+    router_model_path: str = ""
+    router_decision_log_path: str = ""
+
+    # 会话记忆 (checkpointer: none / memory / sqlite)
+    checkpointer: str = "sqlite"
+    checkpoint_db_path: str = "data/checkpoints.sqlite"
+    memory_max_history_tokens: int = 3000
+    memory_keep_messages: int = 4
+    memory_context_reuse_coverage: float = 0.8
+    memory_max_passages: int = 40  # 会话内保留的检索 passage 上限
+
+    # 批量向量化：按批大小或等待时间凑批，在线程/进程池中计算 (executor: thread / process)
+    embedding_max_batch_size: int = 32
+    embedding_max_wait_ms: float = 2.0
+    embedding_cache_max_entries: int = 10000
+    embedding_executor: str = "thread"
+    embedding_workers: int = 1
+
+    # 检索上下文 token 预算
+    context_token_budget: int = 2000
+
+    # 重排序 (off / lexical / cross-encoder)：只把前 top_k 条写入 prompt，超出预算退回原排序
+    rerank_mode: str = "lexical"
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_top_k: int = 5
+    rerank_budget_ms: float = 50.0
+    rerank_workers: int = 1  # 打分专用线程数，全部占用时退回原排序
+
+    # 投机检索：判断是否需要检索的同时并发发起检索
+    speculative_search: bool = False
+
+    # 多查询检索：一次 LLM 调用拆出最多 N 个子查询并发检索 (N <= 1 关闭)
+    multi_query_count: int = 0
+    multi_query_concurrency: int = 3
+
+    # 回答缓存
+    answer_cache_enabled: bool = True
+    answer_cache_max_entries: int = 1024
+    answer_cache_ttl_seconds: float = 3600.0
+    # 语义匹配阈值，默认 1.0 只做精确匹配；内置 HashingEmbedder 是字面向量，
+    # "Raft/Paxos"、"CPU/内存" 这类只差一个词的不同问题相似度也会超过 0.9，
+    # 只有换成真正的语义向量模型时才应调低
+    answer_cache_similarity_threshold: float = 1.0
 
     # Huawei Cloud
     huawei_iam_endpoint: str = "https://iam.myhuaweicloud.com/v3/auth/tokens"
@@ -33,6 +143,7 @@ class Settings(BaseSettings):
     huawei_username: str = ""
     huawei_password: str = ""
     huawei_project_name: str = ""
+    huawei_token_refresh_margin_seconds: float = 3600.0
 
     class Config:
         env_file = ".env"
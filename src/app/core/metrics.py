@@ -0,0 +1,211 @@
+"""运行指标
+
+- Prometheus 指标：节点耗时、外部调用耗时、LLM token / 费用、重试、缓存命中、准入排队与限流
+- 请求级追踪：在 ``trace_request()`` 上下文内记录的耗时明细，可附加到响应中调试
+- 组件统计：各服务通过 ``register_stats`` 暴露的计数，在抓取时读取
+"""
+
+import functools
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from src.app.core.config import settings
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+NODE_DURATION = Histogram(
+    "rag_node_duration_seconds", "Graph 节点耗时", ["node"], buckets=_LATENCY_BUCKETS
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "rag_external_call_duration_seconds",
+    "外部调用耗时",
+    ["service", "operation", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter("rag_llm_tokens_total", "LLM token 用量", ["node", "kind"])
+LLM_COST = Counter("rag_llm_cost_total", "LLM 费用估算", ["node"])
+RETRIES = Counter("rag_retries_total", "外部调用重试次数", ["service"])
+CACHE_EVENTS = Counter("rag_cache_events_total", "缓存查询结果", ["cache", "result"])
+ADMISSION_IN_FLIGHT = Gauge("rag_admission_in_flight", "正在运行的 Agent 数")
+ADMISSION_QUEUE_DEPTH = Gauge("rag_admission_queue_depth", "等待准入的请求数")
+ADMISSION_WAIT = Histogram(
+    "rag_admission_wait_seconds", "准入排队耗时", ["outcome"], buckets=_LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter("rag_admission_rejected_total", "被拒绝的请求", ["reason"])
+RATE_LIMIT_WAIT = Histogram(
+    "rag_rate_limit_wait_seconds", "令牌桶限流等待耗时", ["limiter"], buckets=_LATENCY_BUCKETS
+)
+
+# ==================== 请求级追踪 ====================
+
+_current_trace: ContextVar[list[dict[str, Any]] | None] = ContextVar("rag_trace", default=None)
+
+
+@contextmanager
+def trace_request() -> Iterator[list[dict[str, Any]]]:
+    """开启请求级追踪，返回的列表在上下文内持续追加耗时记录"""
+    spans: list[dict[str, Any]] = []
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # 流式响应的生成器可能在其它上下文中被关闭
+            _current_trace.set(None)
+
+
+def record_span(kind: str, name: str, duration: float, **fields: Any) -> None:
+    """向当前请求追踪追加一条记录（未开启追踪时忽略）"""
+    spans = _current_trace.get()
+    if spans is not None:
+        spans.append({"kind": kind, "name": name, "duration_ms": round(duration * 1000, 2), **fields})
+
+
+# ==================== 记录工具 ====================
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def instrument_node(name: str) -> Callable[[F], F]:
+    """装饰异步节点函数，记录耗时"""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                NODE_DURATION.labels(node=name).observe(duration)
+                record_span("node", name, duration)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@contextmanager
+def observe_external(service: str, operation: str) -> Iterator[None]:
+    """记录一次外部调用的耗时与结果"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        duration = time.perf_counter() - start
+        EXTERNAL_CALL_DURATION.labels(service=service, operation=operation, outcome=outcome).observe(
+            duration
+        )
+        record_span("external", f"{service}.{operation}", duration, outcome=outcome)
+
+
+def record_retry(service: str) -> None:
+    RETRIES.labels(service=service).inc()
+
+
+def record_cache(cache: str, result: str) -> None:
+    CACHE_EVENTS.labels(cache=cache, result=result).inc()
+    spans = _current_trace.get()
+    if spans is not None:
+        spans.append({"kind": "cache", "name": cache, "result": result})
+
+
+class LLMMetricsHandler(AsyncCallbackHandler):
+    """LLM 回调：按 Graph 节点统计耗时、token 与费用"""
+
+    def __init__(self) -> None:
+        self._runs: dict[UUID, tuple[str, float]] = {}
+
+    async def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[Any]],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        self._runs[run_id] = (node, time.perf_counter())
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        node, start = self._runs.pop(run_id, ("unknown", time.perf_counter()))
+        duration = time.perf_counter() - start
+        prompt_tokens, completion_tokens = _token_usage(response)
+
+        EXTERNAL_CALL_DURATION.labels(service="llm", operation=node, outcome="ok").observe(duration)
+        LLM_TOKENS.labels(node=node, kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(node=node, kind="completion").inc(completion_tokens)
+        cost = (
+            prompt_tokens * settings.llm_prompt_price_per_1k
+            + completion_tokens * settings.llm_completion_price_per_1k
+        ) / 1000
+        LLM_COST.labels(node=node).inc(cost)
+        record_span(
+            "llm",
+            node,
+            duration,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        node, start = self._runs.pop(run_id, ("unknown", time.perf_counter()))
+        duration = time.perf_counter() - start
+        EXTERNAL_CALL_DURATION.labels(service="llm", operation=node, outcome="error").observe(
+            duration
+        )
+        record_span("llm", node, duration, outcome="error")
+
+
+def _token_usage(response: LLMResult) -> tuple[int, int]:
+    """优先读取消息上的 usage_metadata，其次读取 llm_output.token_usage"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return int(token_usage.get("prompt_tokens", 0)), int(token_usage.get("completion_tokens", 0))
+
+
+# ==================== 组件统计 ====================
+
+_stats_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register_stats(component: str, source: Callable[[], dict[str, Any]]) -> None:
+    """注册组件统计来源，抓取 /metrics 时以 rag_component_stat 暴露其中的数值项"""
+    _stats_sources[component] = source
+
+
+class _ComponentStatsCollector(Collector):
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        family = GaugeMetricFamily(
+            "rag_component_stat", "组件内部统计（缓存、路由、投机检索等）", labels=["component", "stat"]
+        )
+        for component, source in _stats_sources.items():
+            for stat, value in source().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    family.add_metric([component, stat], float(value))
+        yield family
+
+
+REGISTRY.register(_ComponentStatsCollector())
+
+# LLM 回调单例
+llm_metrics_handler = LLMMetricsHandler()
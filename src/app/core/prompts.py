@@ -24,6 +24,17 @@ REFINE_PROMPT = """原问题: {query}
 
 请生成一个更好的搜索查询来获取缺失的信息。只输出查询词，不要解释:"""
 
+# 多查询检索：一次调用把问题拆成多个可并发执行的子查询
+DECOMPOSE_PROMPT = """问题: {question}
+{reflection}
+请把问题拆分成最多 {count} 个相互独立的搜索查询，每个查询覆盖问题的一个方面，合起来覆盖回答所需的全部信息。
+简单问题可以只输出 1 个。每行一个查询，不要编号，不要解释:"""
+
+DECOMPOSE_REFLECTION = """
+之前的回答不够好，反思意见: {reflection}
+请优先针对反思中指出的缺失信息生成查询。
+"""
+
 # 生成节点 (Generate Node)
 GENERATE_SYSTEM_PROMPT_BASE = "你是一个有帮助的 AI 助手。请提供准确、完整、有深度的回答。"
 
@@ -40,6 +51,21 @@ GENERATE_SYSTEM_PROMPT_REFLECTION = """
 之前的回答有以下问题，请在这次回答中改进：
 {reflection}"""
 
+GENERATE_SYSTEM_PROMPT_SUMMARY = """
+
+以下是与用户此前对话的摘要：
+{summary}"""
+
+# 会话压缩节点 (Compact Node)
+SUMMARIZE_HISTORY_PROMPT = """请把以下对话压缩成一段简洁的摘要，保留用户的关键问题、已给出的结论和仍未解决的事项。
+
+已有摘要: {summary}
+
+新增对话:
+{history}
+
+只输出摘要内容:"""
+
 # 反思节点 (Reflect Node)
 REFLECT_PROMPT = """请评估以下问答的质量。
 
@@ -49,14 +75,8 @@ AI 回答: {answer}
 
 可用知识: {knowledge_context}
 
-请从以下几个方面评估：
-1. 准确性：回答是否准确？有没有事实错误？
-2. 完整性：回答是否完整？有没有遗漏重要信息？
-3. 相关性：回答是否切题？有没有跑题？
-4. 深度：回答是否有足够的深度和见解？
-
-如果回答质量足够好，请回复：SATISFIED
+从准确性、完整性、相关性、深度四个方面评估，只输出一个 JSON 对象，不要输出其它内容：
+{{"satisfied": true/false, "score": 0-10 的整数, "missing_info": "需要改进的地方，满意时为空", "needs_search": true/false}}
 
-如果回答需要改进，请回复：
-NEEDS_IMPROVEMENT
-[具体说明需要改进的地方，以及如何改进]"""
+needs_search 表示改进是否需要检索新的外部知识；仅需基于可用知识改写、补充论述或修正错误时为 false。
+missing_info 不超过 100 字。"""
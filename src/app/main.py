@@ -1,11 +1,49 @@
 """应用入口"""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from src.app.api.routes import chat, health
+from src.app.agents.graph import build_graph
+from src.app.agents.memory import conversation_memory, open_checkpointer
+from src.app.api.routes import chat, health, metrics
+from src.app.core.admission import AdmissionRejected
 from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.services.embedding_service import embedding_service
+from src.app.services.huawei_auth import huawei_auth_service
+from src.app.services.llm import llm
+from src.app.services.reranker import reranker
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """应用生命周期：启动时打开会话 checkpointer、加载重排序模型，关闭时释放连接与线程池"""
+    await reranker.warmup()
+    async with open_checkpointer(settings.checkpointer, settings.checkpoint_db_path) as saver:
+        if saver is not None:
+            conversation_memory.agent = build_graph(saver)
+            logger.info(f"会话记忆已启用: {settings.checkpointer}")
+        yield
+        conversation_memory.agent = None
+    await huawei_auth_service.aclose()
+    embedding_service.close()
+    reranker.close()
+    await llm.aclose()
+
+
+async def admission_rejected_handler(_: Request, exc: Exception) -> JSONResponse:
+    """准入被拒：503 + Retry-After"""
+    assert isinstance(exc, AdmissionRejected)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 def create_app() -> FastAPI:
@@ -16,6 +54,7 @@ def create_app() -> FastAPI:
         description="Agentic RAG with LangGraph + DeepSeek + Self-Reflection",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
     # CORS
@@ -27,9 +66,12 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    application.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+
     # 注册路由
     application.include_router(health.router)
     application.include_router(chat.router)
+    application.include_router(metrics.router)
 
     return application
 
@@ -0,0 +1,170 @@
+"""回答缓存：精确匹配 + 语义相似匹配"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import record_cache, register_stats
+from src.app.services.embedding import HashingEmbedder, embedder
+
+_TRAILING_PUNCT_RE = re.compile(r"[\s?？!！。.,，~～]+$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """归一化用户消息：小写、合并空白、去掉结尾标点"""
+    text = _WHITESPACE_RE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self) -> None:
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "slot")
+
+    def __init__(self, value: dict[str, Any], expires_at: float, slot: int) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.slot = slot
+
+
+class AnswerCache:
+    """Agent 回答缓存
+
+    - 精确命中：归一化消息的 sha256
+    - 语义命中 (可选)：向量矩阵上做内积，相似度超过阈值即视为近似重复问题。
+      默认阈值 1.0 关闭；字面哈希向量无法区分只差一个实体的不同问题，需配合语义向量模型使用
+    - 淘汰：TTL 过期 + 超出容量时按 LRU 淘汰
+
+    向量矩阵按容量预分配，条目与矩阵行 (slot) 一一对应，淘汰后 slot 复用。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 1.0,
+        text_embedder: HashingEmbedder | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embedder = text_embedder or embedder
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._vectors = np.zeros((self.max_entries, self.embedder.dim), dtype=np.float32)
+        self._slot_keys: list[str | None] = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(message: str) -> str:
+        return hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()
+
+    def get(self, message: str, vector: np.ndarray | None = None) -> dict[str, Any] | None:
+        """查询缓存，未命中返回 None；vector 为归一化消息的向量，缺省时同步计算"""
+        now = time.monotonic()
+        key = self.make_key(message)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats.exact_hits += 1
+                record_cache("answer", "exact_hit")
+                return entry.value
+            self._remove(key)
+            self.stats.expirations += 1
+
+        if self._entries and self.similarity_threshold < 1.0:
+            query = self._vector(message, vector)
+            scores = self._vectors @ query
+            slot = int(np.argmax(scores))
+            similar_key = self._slot_keys[slot]
+            if similar_key is not None and scores[slot] >= self.similarity_threshold:
+                entry = self._entries[similar_key]
+                if entry.expires_at > now:
+                    self._entries.move_to_end(similar_key)
+                    self.stats.semantic_hits += 1
+                    record_cache("answer", "semantic_hit")
+                    logger.info(f"语义缓存命中 (相似度 {scores[slot]:.3f})")
+                    return entry.value
+                self._remove(similar_key)
+                self.stats.expirations += 1
+
+        self.stats.misses += 1
+        record_cache("answer", "miss")
+        return None
+
+    def set(
+        self, message: str, value: dict[str, Any], vector: np.ndarray | None = None
+    ) -> None:
+        """写入缓存"""
+        key = self.make_key(message)
+        if key in self._entries:
+            self._remove(key)
+        while not self._free_slots:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats.evictions += 1
+
+        slot = self._free_slots.pop()
+        self._vectors[slot] = self._vector(message, vector)
+        self._slot_keys[slot] = key
+        self._entries[key] = _Entry(
+            value=value, expires_at=time.monotonic() + self.ttl_seconds, slot=slot
+        )
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._remove(key)
+
+    def _vector(self, message: str, vector: np.ndarray | None) -> np.ndarray:
+        if vector is not None:
+            return vector
+        return self.embedder.embed_one(normalize_message(message))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._vectors[entry.slot] = 0.0
+        self._slot_keys[entry.slot] = None
+        self._free_slots.append(entry.slot)
+
+
+# 缓存单例
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    similarity_threshold=settings.answer_cache_similarity_threshold,
+)
+register_stats("answer_cache", lambda: {"size": len(answer_cache), **answer_cache.stats.as_dict()})
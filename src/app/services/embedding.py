@@ -0,0 +1,44 @@
+"""本地文本向量化服务"""
+
+import re
+import zlib
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+
+
+class HashingEmbedder:
+    """特征哈希向量化
+
+    英文按单词、中文按单字切分，取 unigram + bigram 后哈希到固定维度，
+    结果做 L2 归一化，内积即余弦相似度。无需模型文件，跨进程结果稳定。
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+
+    def tokenize(self, text: str) -> list[str]:
+        """切分为 unigram + bigram"""
+        tokens = _TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a}{b}" for a, b in zip(tokens, tokens[1:], strict=False)]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """批量向量化，返回 (len(texts), dim) 的 float32 矩阵"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self.tokenize(text):
+                h = zlib.crc32(token.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """单条向量化"""
+        vector: np.ndarray = self.embed([text])[0]
+        return vector
+
+
+# 服务单例
+embedder = HashingEmbedder()
@@ -0,0 +1,193 @@
+"""批量向量化服务
+
+并发协程的向量化请求先进入队列，按 ``max_batch_size`` 或 ``max_wait_ms`` 先到者
+凑成微批次，在线程池/进程池中调用 ``HashingEmbedder.embed``，事件循环不做 CPU 计算。
+结果按文本哈希做 LRU 缓存，同一文本的并发请求共享一次计算。
+"""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from src.app.core.config import settings
+from src.app.core.metrics import record_cache, register_stats
+from src.app.services.embedding import HashingEmbedder, embedder
+
+_Pending = tuple[bytes, str, asyncio.Future[np.ndarray]]
+
+
+class EmbeddingService:
+    """微批次向量化服务"""
+
+    def __init__(
+        self,
+        text_embedder: HashingEmbedder | None = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        cache_max_entries: int = 10_000,
+        executor: str = "thread",
+        workers: int = 1,
+    ) -> None:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"未知的执行器类型: {executor}")
+        self.embedder = text_embedder or embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.cache_max_entries = cache_max_entries
+        self.executor_kind = executor
+        self.workers = max(1, workers)
+
+        self._cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._inflight: dict[bytes, asyncio.Future[np.ndarray]] = {}
+        self._executor: Executor | None = None
+        self._queue: asyncio.Queue[_Pending] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "batches": 0, "batched_texts": 0}
+
+    async def embed(self, text: str) -> np.ndarray:
+        """单条向量化"""
+        vector: np.ndarray = (await self.embed_many([text]))[0]
+        return vector
+
+    async def embed_many(self, texts: list[str]) -> np.ndarray:
+        """批量向量化，返回 (len(texts), dim) 的 float32 矩阵"""
+        if not texts:
+            return np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+        queue = self._ensure_worker()
+        futures: list[asyncio.Future[np.ndarray]] = []
+        for text in texts:
+            key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                record_cache("embedding", "hit")
+                future: asyncio.Future[np.ndarray] = asyncio.get_running_loop().create_future()
+                future.set_result(vector)
+            elif key in self._inflight:
+                self._stats["coalesced"] += 1
+                record_cache("embedding", "coalesced")
+                future = self._inflight[key]
+            else:
+                self._stats["misses"] += 1
+                record_cache("embedding", "miss")
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                queue.put_nowait((key, text, future))
+            futures.append(future)
+
+        # shield: 调用方取消不影响同批次其它等待者
+        return np.stack(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def stats(self) -> dict[str, Any]:
+        """缓存与批次统计"""
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "cache_size": len(self._cache),
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": self._stats["batched_texts"] / batches if batches else 0.0,
+        }
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def close(self) -> None:
+        """停止后台批处理并关闭执行器"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _ensure_worker(self) -> asyncio.Queue[_Pending]:
+        # 队列与后台任务绑定事件循环，循环变化时（如测试）重新创建
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._inflight.clear()
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="embedding"
+                )
+        return self._executor
+
+    async def _run(self, queue: asyncio.Queue[_Pending]) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            # 执行器忙时在此等待，期间新请求继续在队列中累积成更大的批次
+            await slots.acquire()
+            task = loop.create_task(self._compute(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _compute(self, batch: list[_Pending]) -> None:
+        self._stats["batches"] += 1
+        self._stats["batched_texts"] += len(batch)
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), self.embedder.embed, [text for _, text, _ in batch]
+            )
+        except Exception as e:
+            for key, _, future in batch:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (key, _, future), vector in zip(batch, vectors, strict=True):
+            vector.setflags(write=False)
+            self._inflight.pop(key, None)
+            self._cache_set(key, vector)
+            if not future.done():
+                future.set_result(vector)
+
+    def _cache_set(self, key: bytes, vector: np.ndarray) -> None:
+        if self.cache_max_entries <= 0:
+            return
+        self._cache[key] = vector
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+
+# 服务单例
+embedding_service = EmbeddingService(
+    max_batch_size=settings.embedding_max_batch_size,
+    max_wait_ms=settings.embedding_max_wait_ms,
+    cache_max_entries=settings.embedding_cache_max_entries,
+    executor=settings.embedding_executor,
+    workers=settings.embedding_workers,
+)
+register_stats("embedding", embedding_service.stats)
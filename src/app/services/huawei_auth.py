@@ -1,23 +1,67 @@
 """华为云认证服务"""
 
+import asyncio
 import logging
+import time
+from datetime import datetime
 
 import httpx
 
 from src.app.core.config import settings
+from src.app.core.metrics import observe_external
 
 logger = logging.getLogger(__name__)
 
+# IAM 未返回 expires_at 时的兜底有效期 (Token 实际有效期为 24 小时)
+DEFAULT_TOKEN_TTL_SECONDS = 24 * 3600
+
 
 class HuaweiAuthService:
-    """华为云 IAM 认证服务"""
+    """华为云 IAM 认证服务
+
+    - Token 连同 ``expires_at`` 缓存在内存中，有效期内直接复用
+    - 在到期前 ``refresh_margin_seconds`` 秒后台主动刷新，调用方无需等待
+    - 并发刷新合并为一次 IAM 请求 (single-flight)
+    - 使用长连接池 (keep-alive + HTTP/2) 的共享 ``httpx.AsyncClient``
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        refresh_margin_seconds: float | None = None,
+    ) -> None:
         self.auth_url = settings.huawei_iam_endpoint
         self.domain_name = settings.huawei_domain_name
         self.username = settings.huawei_username
         self.password = settings.huawei_password
         self.project_name = settings.huawei_project_name
+        self.refresh_margin_seconds = (
+            settings.huawei_token_refresh_margin_seconds
+            if refresh_margin_seconds is None
+            else refresh_margin_seconds
+        )
+
+        self._client = client
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._refresh_task: asyncio.Task[str | None] | None = None
+        self._scheduled_refresh: asyncio.Task[None] | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享连接池客户端（懒加载）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=10, keepalive_expiry=300),
+            )
+        return self._client
+
+    @property
+    def expires_at(self) -> float:
+        """当前 Token 过期时间 (Unix 时间戳)，无 Token 时为 0"""
+        return self._expires_at
 
     async def get_token(self) -> str | None:
         """获取华为云 IAM Token (X-Subject-Token)"""
@@ -25,7 +69,47 @@ class HuaweiAuthService:
             logger.error("Missing Huawei Cloud credentials in settings")
             return None
 
-        payload = {
+        now = time.time()
+        if self._token and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin_seconds:
+                # 已进入刷新窗口：旧 Token 仍可用，后台刷新即可
+                self._start_refresh()
+            return self._token
+
+        return await asyncio.shield(self._start_refresh())
+
+    async def aclose(self) -> None:
+        """取消后台刷新并关闭连接池"""
+        for task in (self._scheduled_refresh, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _start_refresh(self) -> "asyncio.Task[str | None]":
+        """发起刷新，已有刷新在进行时复用同一个任务"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch_token())
+        return self._refresh_task
+
+    def _schedule_refresh(self) -> None:
+        """在进入刷新窗口时自动刷新"""
+        if self._scheduled_refresh and not self._scheduled_refresh.done():
+            self._scheduled_refresh.cancel()
+
+        delay = self._expires_at - self.refresh_margin_seconds - time.time()
+        if delay <= 0:
+            return
+
+        async def refresh_later() -> None:
+            await asyncio.sleep(delay)
+            self._start_refresh()
+
+        self._scheduled_refresh = asyncio.create_task(refresh_later())
+
+    def _build_payload(self) -> dict:
+        return {
             "auth": {
                 "identity": {
                     "methods": ["password"],
@@ -43,27 +127,50 @@ class HuaweiAuthService:
             }
         }
 
+    @staticmethod
+    def _parse_expires_at(response: httpx.Response) -> float:
+        """从响应体 token.expires_at 解析过期时间，解析失败时按默认有效期计算"""
+        if "json" in response.headers.get("content-type", ""):
+            try:
+                expires_at = response.json()["token"]["expires_at"]
+                return datetime.fromisoformat(expires_at).timestamp()
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Failed to parse token expires_at: {e}")
+        return time.time() + DEFAULT_TOKEN_TTL_SECONDS
+
+    async def _fetch_token(self) -> str | None:
+        """向 IAM 请求新 Token"""
         headers = {"Content-Type": "application/json;charset=utf8"}
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.auth_url, json=payload, headers=headers, timeout=10.0
+            with observe_external("huawei_iam", "token"):
+                response = await self.client.post(
+                    self.auth_url, json=self._build_payload(), headers=headers
                 )
 
-                if response.status_code == 201:
-                    token = response.headers.get("X-Subject-Token")
-                    if token:
-                        logger.info("Successfully retrieved Huawei Cloud token")
-                        return str(token)
-                    else:
-                        logger.error("X-Subject-Token header not found in response")
+            if response.status_code == 201:
+                token = response.headers.get("X-Subject-Token")
+                if token:
+                    self._token = str(token)
+                    self._expires_at = self._parse_expires_at(response)
+                    self._schedule_refresh()
+                    logger.info("Successfully retrieved Huawei Cloud token")
+                    return self._token
                 else:
-                    logger.error(f"Failed to get token: {response.status_code} - {response.text}")
+                    logger.error("X-Subject-Token header not found in response")
+            else:
+                logger.error(f"Failed to get token: {response.status_code} - {response.text}")
 
         except httpx.RequestError as e:
             logger.error(f"Network error while fetching Huawei token: {e}")
         except Exception as e:
             logger.error(f"Unexpected error while fetching Huawei token: {e}")
 
+        # 刷新失败时，未过期的旧 Token 仍可继续使用
+        if self._token and time.time() < self._expires_at:
+            return self._token
         return None
+
+
+# 服务单例
+huawei_auth_service = HuaweiAuthService()
@@ -1,69 +1,217 @@
-"""Tavily 知识检索服务"""
+"""知识检索服务 (Tavily / 本地知识库)"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
 
 from tavily import AsyncTavilyClient
 
+from src.app.core.admission import search_rate_limiter
 from src.app.core.config import settings
 from src.app.core.logging import logger
+from src.app.core.metrics import observe_external, record_cache, register_stats
+from src.app.services.local_kb import LocalKnowledgeBase
 
+SearchKey = tuple[str, int, str]
 
-class KnowledgeService:
-    """知识检索服务"""
 
-    def __init__(self) -> None:
+def normalize_query(query: str) -> str:
+    """归一化查询词：小写并合并空白"""
+    return " ".join(query.lower().split())
+
+
+class KnowledgeService:
+    """知识检索服务
+
+    检索结果按 (归一化查询, max_results, search_depth) 缓存，带 TTL 与 LRU 容量上限；
+    相同 key 的并发请求合并为一次上游调用 (single-flight)。失败或空结果不缓存。
+    后端为 local 时检索本地混合索引，不再访问 Tavily。
+    """
+
+    def __init__(
+        self,
+        cache_ttl_seconds: float | None = None,
+        cache_max_entries: int | None = None,
+        backend: str | None = None,
+    ) -> None:
         self.api_key = settings.tavily_api_key
+        self.backend = settings.knowledge_backend if backend is None else backend
         self.client = None
+        self.local_kb: LocalKnowledgeBase | None = None
+
+        if self.backend == "local":
+            self.local_kb = self._open_local_kb(settings.local_kb_path)
+        elif self.backend != "tavily":
+            raise ValueError(f"未知的知识检索后端: {self.backend}")
+        elif self.api_key:
+            self.client = AsyncTavilyClient(
+                api_key=self.api_key, api_base_url=settings.tavily_base_url
+            )
 
-        if self.api_key:
-            self.client = AsyncTavilyClient(api_key=self.api_key)
-
-    async def search(self, query: str, max_results: int = 5) -> list[dict]:
+        self.cache_ttl_seconds = (
+            settings.search_cache_ttl_seconds if cache_ttl_seconds is None else cache_ttl_seconds
+        )
+        self.cache_max_entries = (
+            settings.search_cache_max_entries if cache_max_entries is None else cache_max_entries
+        )
+        self._cache: OrderedDict[SearchKey, tuple[float, list[dict]]] = OrderedDict()
+        self._inflight: dict[SearchKey, asyncio.Task[list[dict]]] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "evictions": 0}
+
+    async def search(
+        self, query: str, max_results: int = 5, search_depth: str = "basic"
+    ) -> list[dict]:
         """
         搜索知识
 
         Args:
             query: 搜索查询词
             max_results: 最大结果数
+            search_depth: Tavily 检索深度 (basic / advanced)
 
         Returns:
             检索结果列表
         """
-        if not self.client:
-            logger.warning("Tavily API Key 未配置")
+        if not self.client and not self.local_kb:
+            logger.warning("Tavily API Key 未配置" if self.backend == "tavily" else "本地知识库不可用")
             return []
 
+        key = (normalize_query(query), max_results, search_depth)
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._stats["hits"] += 1
+            record_cache("search", "hit")
+            return list(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            self._stats["misses"] += 1
+            record_cache("search", "miss")
+            task = asyncio.create_task(self._fetch(key, query, max_results, search_depth))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._stats["coalesced"] += 1
+            record_cache("search", "coalesced")
+
+        # shield: 单个调用方被取消不影响其它等待同一上游请求的调用方
+        return list(await asyncio.shield(task))
+
+    async def search_many(
+        self, queries: list[str], max_results: int = 5, concurrency: int = 3
+    ) -> list[list[dict]]:
+        """并发执行多个查询，最多 concurrency 个同时进行，结果与 queries 一一对应"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def limited(query: str) -> list[dict]:
+            async with semaphore:
+                return await self.search(query, max_results=max_results)
+
+        return list(await asyncio.gather(*(limited(q) for q in queries)))
+
+    def cache_stats(self) -> dict[str, Any]:
+        """缓存统计"""
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "size": len(self._cache),
+            "max_entries": self.cache_max_entries,
+            "inflight": len(self._inflight),
+            "hit_rate": (lookups - self._stats["misses"]) / lookups if lookups else 0.0,
+        }
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def _cache_get(self, key: SearchKey) -> list[dict] | None:
+        item = self._cache.get(key)
+        if item is None:
+            return None
+        expires_at, results = item
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return results
+
+    def _cache_set(self, key: SearchKey, results: list[dict]) -> None:
+        if self.cache_max_entries <= 0 or self.cache_ttl_seconds <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def _fetch(
+        self, key: SearchKey, query: str, max_results: int, search_depth: str
+    ) -> list[dict]:
+        self._stats["upstream_calls"] += 1
+        if self.client is not None:
+            await search_rate_limiter.aacquire()
         try:
-            response = await self.client.search(
-                query=query,
-                search_depth="basic",
-                max_results=max_results,
-                include_answer=True,
-            )
-
-            results = []
+            with observe_external(self.backend, "search"):
+                results = await self._search_upstream(query, max_results, search_depth)
+        except Exception as e:
+            logger.error(f"知识检索失败 ({self.backend}): {e}")
+            return []
 
-            # 添加 AI 摘要
-            if response.get("answer"):
-                results.append(
-                    {"content": response["answer"], "source": "Tavily AI Summary", "score": 1.0}
-                )
+        if results:
+            self._cache_set(key, results)
+        return results
 
-            # 添加搜索结果
-            for item in response.get("results", []):
-                results.append(
-                    {
-                        "content": item.get("content", ""),
-                        "source": item.get("url", ""),
-                        "score": item.get("score", 0.0),
-                    }
-                )
+    @staticmethod
+    def _open_local_kb(path: str) -> LocalKnowledgeBase | None:
+        try:
+            return LocalKnowledgeBase(
+                path,
+                rrf_k=settings.local_kb_rrf_k,
+                vector_index=settings.local_kb_vector_index,
+                nprobe=settings.local_kb_nprobe,
+            )
+        except FileNotFoundError:
+            logger.warning(f"本地知识库不存在: {path}，请先运行 scripts/ingest_knowledge.py")
+            return None
+
+    async def _search_upstream(
+        self, query: str, max_results: int, search_depth: str
+    ) -> list[dict]:
+        if self.local_kb is not None:
+            # 检索是 CPU 密集的同步计算，放到线程里避免阻塞事件循环
+            return await asyncio.to_thread(self.local_kb.search, query, max_results)
+
+        assert self.client is not None
+        response = await self.client.search(
+            query=query,
+            search_depth=search_depth,
+            max_results=max_results,
+            include_answer=True,
+        )
+
+        results = []
+
+        # 添加 AI 摘要
+        if response.get("answer"):
+            results.append(
+                {"content": response["answer"], "source": "Tavily AI Summary", "score": 1.0}
+            )
 
-            logger.info(f"检索到 {len(results)} 条结果")
-            return results
+        # 添加搜索结果
+        for item in response.get("results", []):
+            results.append(
+                {
+                    "content": item.get("content", ""),
+                    "source": item.get("url", ""),
+                    "score": item.get("score", 0.0),
+                }
+            )
 
-        except Exception as e:
-            logger.error(f"Tavily 搜索失败: {e}")
-            return []
+        logger.info(f"检索到 {len(results)} 条结果")
+        return results
 
 
 # 服务单例
 knowledge_service = KnowledgeService()
+register_stats("search_cache", knowledge_service.cache_stats)
@@ -1,20 +1,300 @@
-"""LLM 服务"""
+"""LLM 服务
 
+所有节点共用一个 ``LLMGateway``，它按调用角色（check / refine / review / generate）
+包装各自的 ``ChatOpenAI``（共享 httpx 连接池），负责：
+
+- 单次调用超时与抖动指数退避重试（底层客户端不再自行重试）；流式节点已推送过 token 后
+  不再重试，避免客户端收到重复内容
+- 请求截止时间：``request_deadline()`` 内每次调用的超时取单次上限与剩余时间的较小者，
+  剩余时间不足时抛出 ``DeadlineExceeded``
+- 对冲请求：调用超过该节点历史 p95 仍未返回时再发一份，取先返回者
+- 按 Graph 节点统计调用耗时分位数，通过 /metrics 暴露
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import httpx
+import openai
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables.config import ensure_config, merge_configs
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 
+from src.app.core.admission import llm_rate_limiter
 from src.app.core.config import settings
+from src.app.core.metrics import llm_metrics_handler, record_retry, register_stats
+
+# 调用角色：分类/改写/评审只需简短确定的输出，可配置更小更快的模型
+ROLES = ("check", "refine", "review", "generate")
+
+# 回答节点的 token 会流式推送给客户端：不对冲，已推送 token 后不重试，否则会产生重复 token
+_STREAMED_NODES = {"writer", "generate"}
+
+_RETRYABLE_ERRORS = (
+    TimeoutError,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+_deadline: ContextVar[float | None] = ContextVar("rag_request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求剩余时间不足以再发起 LLM 调用"""
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """为当前请求设置截止时间，seconds <= 0 表示不限"""
+    token = _deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # 流式响应的生成器可能在其它上下文中被关闭
+            _deadline.set(None)
+
+
+def remaining_budget() -> float | None:
+    """当前请求剩余秒数，未设置截止时间时返回 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class NodeLatency:
+    """单个节点最近若干次成功调用的耗时"""
+
+    def __init__(self, window: int = 256) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
 
+class _TokenTracker(AsyncCallbackHandler):
+    """记录本次调用是否已经流出 token"""
 
-def get_llm() -> ChatOpenAI:
-    """获取 LLM 实例"""
+    def __init__(self) -> None:
+        self.streamed = False
+
+    async def on_llm_new_token(self, token: str | list[str | dict[str, Any]], **_kwargs: Any) -> None:
+        if token:
+            self.streamed = True
+
+
+class LLMGateway:
+    """LLM 调用网关"""
+
+    def __init__(
+        self,
+        model: Any,
+        timeout_seconds: float = 30.0,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        min_budget_seconds: float = 1.0,
+        hedge_enabled: bool = False,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.5,
+        models: dict[str, Any] | None = None,
+    ) -> None:
+        # model 为默认模型，models 按角色覆盖
+        self.model = model
+        self.models = models or {}
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_budget_seconds = min_budget_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.nodes: dict[str, NodeLatency] = {}
+
+    async def ainvoke(
+        self, messages: list[BaseMessage], role: str = "generate", **kwargs: Any
+    ) -> BaseMessage:
+        """调用 LLM：按角色选择模型，超时、重试与对冲"""
+        config = ensure_config()
+        node = config.get("metadata", {}).get("langgraph_node", "unknown")
+        model = self.models.get(role, self.model)
+        stats = self.nodes.setdefault(node, NodeLatency())
+        stats.calls += 1
+        tracker = None
+        if node in _STREAMED_NODES:
+            tracker = _TokenTracker()
+            kwargs = {**kwargs, "config": merge_configs(config, {"callbacks": [tracker]})}
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout()
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._call(model, node, stats, messages, kwargs), timeout)
+            except _RETRYABLE_ERRORS:
+                stats.errors += 1
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                budget = remaining_budget()
+                if (
+                    attempt >= self.max_retries
+                    or (tracker is not None and tracker.streamed)
+                    or (budget is not None and budget - delay < self.min_budget_seconds)
+                ):
+                    raise
+                attempt += 1
+                stats.retries += 1
+                record_retry("llm")
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                stats.errors += 1
+                raise
+            stats.samples.append(time.perf_counter() - start)
+            return result
+
+    def stats(self) -> dict[str, Any]:
+        """按节点展开的统计项，如 writer.p95_ms"""
+        flat: dict[str, Any] = {}
+        for node, s in self.nodes.items():
+            flat.update(
+                {
+                    f"{node}.calls": s.calls,
+                    f"{node}.errors": s.errors,
+                    f"{node}.retries": s.retries,
+                    f"{node}.hedges": s.hedges,
+                    f"{node}.hedge_wins": s.hedge_wins,
+                    f"{node}.p50_ms": round(s.percentile(0.5) * 1000, 1),
+                    f"{node}.p95_ms": round(s.percentile(0.95) * 1000, 1),
+                }
+            )
+        return flat
+
+    async def aclose(self) -> None:
+        clients = {
+            id(client): client
+            for model in (self.model, *self.models.values())
+            if (client := getattr(model, "http_async_client", None)) is not None
+        }
+        for client in clients.values():
+            await client.aclose()
+
+    def _attempt_timeout(self) -> float:
+        budget = remaining_budget()
+        if budget is None:
+            return self.timeout_seconds
+        if budget < self.min_budget_seconds:
+            raise DeadlineExceeded(f"请求剩余 {max(budget, 0):.1f}s，不再调用 LLM")
+        return min(self.timeout_seconds, budget)
+
+    def _hedge_delay(self, node: str, stats: NodeLatency) -> float | None:
+        if (
+            not self.hedge_enabled
+            or node in _STREAMED_NODES
+            or len(stats.samples) < self.hedge_min_samples
+        ):
+            return None
+        return max(stats.percentile(0.95), self.hedge_min_delay)
+
+    async def _call(
+        self,
+        model: Any,
+        node: str,
+        stats: NodeLatency,
+        messages: list[BaseMessage],
+        kwargs: dict[str, Any],
+    ) -> BaseMessage:
+        delay = self._hedge_delay(node, stats)
+        if delay is None:
+            response: BaseMessage = await model.ainvoke(messages, **kwargs)
+            return response
+
+        primary = asyncio.create_task(model.ainvoke(messages, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            winner: BaseMessage = primary.result()
+            return winner
+
+        stats.hedges += 1
+        hedge = asyncio.create_task(model.ainvoke(messages, **kwargs))
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        stats.hedge_wins += task is hedge
+                        winner = task.result()
+                        return winner
+                if not pending:
+                    # 两份都失败，抛出后完成者的异常
+                    raise done.pop().exception()  # type: ignore[misc]
+        finally:
+            primary.cancel()
+            hedge.cancel()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """各角色模型共用的连接池"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_connections,
+            keepalive_expiry=60,
+        ),
+    )
+
+
+def get_llm(role: str = "generate", http_client: httpx.AsyncClient | None = None) -> ChatOpenAI:
+    """获取指定角色的 LLM 实例，未单独配置的项沿用 DeepSeek 配置"""
+    api_key = getattr(settings, f"{role}_api_key") or settings.deepseek_api_key
+    max_tokens = getattr(settings, f"{role}_max_tokens")
     return ChatOpenAI(
-        model=settings.deepseek_model,
-        api_key=SecretStr(settings.deepseek_api_key) if settings.deepseek_api_key else None,
-        base_url=settings.deepseek_base_url,
-        temperature=0.7,
+        model=getattr(settings, f"{role}_model") or settings.deepseek_model,
+        api_key=SecretStr(api_key) if api_key else None,
+        base_url=getattr(settings, f"{role}_base_url") or settings.deepseek_base_url,
+        temperature=getattr(settings, f"{role}_temperature"),
+        max_completion_tokens=max_tokens if max_tokens > 0 else None,
+        stream_usage=True,
+        callbacks=[llm_metrics_handler],
+        rate_limiter=llm_rate_limiter,
+        # 重试与超时由 LLMGateway 负责，底层只保留兜底超时
+        max_retries=0,
+        timeout=settings.llm_timeout_seconds,
+        http_async_client=http_client or create_http_client(),
     )
 
 
+_http_client = create_http_client()
+_models = {role: get_llm(role, _http_client) for role in ROLES}
+
 # LLM 单例
-llm = get_llm()
+llm = LLMGateway(
+    _models["generate"],
+    timeout_seconds=settings.llm_timeout_seconds,
+    max_retries=settings.llm_max_retries,
+    base_delay=settings.llm_retry_base_delay_seconds,
+    max_delay=settings.llm_retry_max_delay_seconds,
+    min_budget_seconds=settings.llm_min_budget_seconds,
+    hedge_enabled=settings.llm_hedge_enabled,
+    hedge_min_samples=settings.llm_hedge_min_samples,
+    hedge_min_delay=settings.llm_hedge_min_delay_seconds,
+    models=_models,
+)
+register_stats("llm_gateway", llm.stats)
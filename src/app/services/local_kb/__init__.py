@@ -0,0 +1,6 @@
+"""本地知识库：BM25 + 向量混合检索"""
+
+from src.app.services.local_kb.chunker import Chunk, chunk_text, load_documents
+from src.app.services.local_kb.index import LocalKnowledgeBase
+
+__all__ = ["Chunk", "LocalKnowledgeBase", "chunk_text", "load_documents"]
@@ -0,0 +1,207 @@
+"""IVF 近似最近邻索引
+
+粗量化器为球面 k-means 聚类中心，向量按所属簇连续存放 (倒排列表)，
+查询时只扫描与查询最接近的 ``nprobe`` 个簇，``nprobe`` 越大召回越高、延迟越高。
+
+磁盘格式（一个目录）：
+
+- ``meta.json``           元信息（维度、簇数）
+- ``centroids.npy``       (nlist, dim) 聚类中心
+- ``list_offsets.npy``    (nlist + 1,) 每个簇在下面两个数组中的区间
+- ``list_ids.npy``        (N,) 向量编号
+- ``list_vectors.npy``    (N, dim) 按簇排列的向量
+- ``deleted.npy``         已删除但尚未压实的编号
+
+增量写入先进入内存缓冲，已落盘向量的删除记为墓碑，``save()`` 时合并进倒排列表并原子替换文件。
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+_FILES = ("centroids", "list_offsets", "list_ids", "list_vectors", "deleted")
+
+
+def train_centroids(
+    vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """球面 k-means：向量已 L2 归一化，以内积为相似度"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), max(nlist * 64, 10_000))
+    sample = np.asarray(vectors[rng.choice(len(vectors), sample_size, replace=False)])
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # 空簇保留原中心
+        np.divide(sums, norms, out=centroids, where=norms > 0)
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """分批计算每个向量所属的簇"""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        block = np.asarray(vectors[start : start + batch_size])
+        assign[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """支持增量增删的 IVF-Flat 索引"""
+
+    def __init__(self, path: str | Path, nprobe: int = 8) -> None:
+        self.path = Path(path)
+        self.nprobe = nprobe
+        self._load()
+
+    def _load(self) -> None:
+        meta = json.loads((self.path / "meta.json").read_text())
+        self.dim = int(meta["dim"])
+        self.nlist = int(meta["nlist"])
+
+        self.centroids = np.load(self.path / "centroids.npy")
+        self.list_offsets = np.load(self.path / "list_offsets.npy")
+        self.list_ids = np.load(self.path / "list_ids.npy", mmap_mode="r")
+        self.list_vectors = np.load(self.path / "list_vectors.npy", mmap_mode="r")
+        self.deleted: set[int] = set(np.load(self.path / "deleted.npy").tolist())
+
+        self._pending_ids: list[int] = []
+        self._pending_assign = np.zeros(0, dtype=np.int32)
+        self._pending_matrix = np.zeros((0, self.dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        deleted = np.isin(self.list_ids, self._deleted_array()).sum() if self.deleted else 0
+        return len(self.list_ids) - int(deleted) + len(self._pending_ids)
+
+    # ==================== 构建与持久化 ====================
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        path: str | Path,
+        nlist: int | None = None,
+        ids: np.ndarray | None = None,
+        nprobe: int = 8,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """训练聚类中心并写入索引；nlist 默认取 sqrt(N)"""
+        count, dim = vectors.shape
+        nlist = nlist or max(1, int(np.sqrt(count)))
+        nlist = min(nlist, count) or 1
+        ids = np.arange(count, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+
+        centroids = (
+            train_centroids(vectors, nlist, seed=seed)
+            if count
+            else np.zeros((1, dim), dtype=np.float32)
+        )
+        assign = assign_lists(vectors, centroids)
+        cls._write(Path(path), centroids, ids, np.asarray(vectors, dtype=np.float32), assign, [])
+        return cls(path, nprobe=nprobe)
+
+    @staticmethod
+    def _write(
+        out: Path,
+        centroids: np.ndarray,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        assign: np.ndarray,
+        deleted: list[int],
+    ) -> None:
+        out.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=len(centroids))
+        arrays = {
+            "centroids": centroids,
+            "list_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            "list_ids": ids[order],
+            "list_vectors": vectors[order],
+            "deleted": np.asarray(sorted(deleted), dtype=np.int64),
+        }
+        # 先写临时文件再替换，已 mmap 的旧文件在读者关闭前仍然有效
+        for name in _FILES:
+            tmp = out / f"{name}.tmp.npy"
+            np.save(tmp, arrays[name])
+            os.replace(tmp, out / f"{name}.npy")
+        meta = {"dim": int(centroids.shape[1]), "nlist": len(centroids)}
+        (out / "meta.json").write_text(json.dumps(meta))
+
+    def save(self, compact: bool = False) -> None:
+        """落盘：只有删除时仅写墓碑；有新增或 compact=True 时合并重写倒排列表"""
+        if not self._pending_ids and not compact:
+            tmp = self.path / "deleted.tmp.npy"
+            np.save(tmp, np.asarray(sorted(self.deleted), dtype=np.int64))
+            os.replace(tmp, self.path / "deleted.npy")
+            return
+
+        ids = np.concatenate([np.asarray(self.list_ids), np.asarray(self._pending_ids, dtype=np.int64)])
+        vectors = np.concatenate([np.asarray(self.list_vectors), self._pending_matrix])
+        list_assign = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.list_offsets))
+        assign = np.concatenate([list_assign, self._pending_assign])
+        # 墓碑只作用于已落盘部分，缓冲区里的向量总是最新版本
+        keep = np.ones(len(ids), dtype=bool)
+        keep[: len(self.list_ids)] = ~np.isin(self.list_ids, self._deleted_array())
+        self._write(self.path, self.centroids, ids[keep], vectors[keep], assign[keep], [])
+        self._load()
+
+    def _deleted_array(self) -> np.ndarray:
+        return np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+
+    # ==================== 增删 ====================
+
+    def add(self, ids: np.ndarray | list[int], vectors: np.ndarray) -> None:
+        """增量写入；编号已存在时覆盖旧向量"""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        self.remove(ids)
+        self._pending_ids.extend(ids.tolist())
+        self._pending_matrix = np.concatenate([self._pending_matrix, vectors])
+        self._pending_assign = np.concatenate(
+            [self._pending_assign, assign_lists(vectors, self.centroids)]
+        )
+
+    def remove(self, ids: np.ndarray | list[int]) -> None:
+        """删除编号：缓冲区内直接移除，已落盘部分记墓碑，save() 时物理移除"""
+        ids = np.asarray(ids, dtype=np.int64)
+        # 墓碑只记已落盘的编号：不存在的编号无需删除，也不应在之后写入时被屏蔽
+        self.deleted.update(ids[np.isin(ids, self.list_ids)].tolist())
+        if self._pending_ids:
+            keep = ~np.isin(np.asarray(self._pending_ids, dtype=np.int64), ids)
+            self._pending_ids = [i for i, k in zip(self._pending_ids, keep, strict=True) if k]
+            self._pending_matrix = self._pending_matrix[keep]
+            self._pending_assign = self._pending_assign[keep]
+
+    # ==================== 查询 ====================
+
+    def search(
+        self, query: np.ndarray, k: int, nprobe: int | None = None
+    ) -> list[tuple[int, float]]:
+        """返回 [(id, 内积)]，按相似度降序"""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        ranges = [(int(self.list_offsets[p]), int(self.list_offsets[p + 1])) for p in probes]
+        ids_parts = [np.asarray(self.list_ids[a:b]) for a, b in ranges]
+        scores_parts = [self.list_vectors[a:b] @ query for a, b in ranges]
+        if self.deleted:
+            deleted = self._deleted_array()
+            masks = [~np.isin(part, deleted) for part in ids_parts]
+            ids_parts = [part[m] for part, m in zip(ids_parts, masks, strict=True)]
+            scores_parts = [part[m] for part, m in zip(scores_parts, masks, strict=True)]
+        if self._pending_ids:
+            mask = np.isin(self._pending_assign, probes)
+            ids_parts.append(np.asarray(self._pending_ids, dtype=np.int64)[mask])
+            scores_parts.append(self._pending_matrix[mask] @ query)
+
+        ids = np.concatenate(ids_parts) if ids_parts else np.zeros(0, dtype=np.int64)
+        scores = np.concatenate(scores_parts) if scores_parts else np.zeros(0, dtype=np.float32)
+        part = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        order = part[np.argsort(-scores[part])]
+        return [(int(ids[i]), float(scores[i])) for i in order]
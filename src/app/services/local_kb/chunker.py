@@ -0,0 +1,84 @@
+"""文档加载与切块"""
+
+import re
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+SUPPORTED_SUFFIXES = {".md", ".markdown", ".txt", ".pdf"}
+
+_HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+# 中文标点后直接断句；英文标点后须跟空白或结尾，避免切开 3.14、URL、config.yaml 等
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？；])\s*|(?<=[.!?;])(?:\s+|$)")
+
+
+class Chunk(NamedTuple):
+    """知识块"""
+
+    content: str
+    source: str
+
+
+def read_document(path: Path) -> str:
+    """读取单个文档为纯文本"""
+    if path.suffix.lower() == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise RuntimeError("解析 PDF 需要安装 pypdf: uv sync --extra kb") from e
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    return path.read_text(encoding="utf-8", errors="ignore")
+
+
+def load_documents(paths: list[Path]) -> Iterator[tuple[str, str]]:
+    """遍历文件/目录，产出 (source, text)"""
+    for root in paths:
+        files = sorted(root.rglob("*")) if root.is_dir() else [root]
+        for path in files:
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                yield str(path), read_document(path)
+
+
+def _split_sections(text: str) -> list[str]:
+    """先按 Markdown 标题，再按空行切成段落"""
+    sections: list[str] = []
+    starts = [m.start() for m in _HEADING_RE.finditer(text)]
+    bounds = [0, *starts, len(text)] if not starts or starts[0] != 0 else [*starts, len(text)]
+    for begin, end in zip(bounds, bounds[1:], strict=False):
+        for paragraph in re.split(r"\n\s*\n", text[begin:end]):
+            paragraph = paragraph.strip()
+            if paragraph:
+                sections.append(paragraph)
+    return sections
+
+
+def _split_long(paragraph: str, chunk_size: int) -> list[str]:
+    """超长段落按句子切分，单句仍超长时硬切"""
+    pieces: list[str] = []
+    for sentence in _SENTENCE_END_RE.split(paragraph):
+        while len(sentence) > chunk_size:
+            pieces.append(sentence[:chunk_size])
+            sentence = sentence[chunk_size:]
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def chunk_text(text: str, source: str, chunk_size: int = 500, overlap: int = 50) -> list[Chunk]:
+    """把文本切成不超过 chunk_size 字符的块，相邻块保留 overlap 字符重叠"""
+    pieces: list[str] = []
+    for paragraph in _split_sections(text):
+        pieces.extend([paragraph] if len(paragraph) <= chunk_size else _split_long(paragraph, chunk_size))
+
+    chunks: list[Chunk] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > chunk_size:
+            chunks.append(Chunk(current, source))
+            tail = current[-overlap:] if overlap else ""
+            current = f"{tail}\n{piece}" if tail and len(tail) + len(piece) + 1 <= chunk_size else piece
+        else:
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(Chunk(current, source))
+    return chunks
@@ -0,0 +1,217 @@
+"""本地混合检索索引
+
+磁盘格式（一个目录）：
+
+- ``meta.json``            元信息（块数、向量维度、BM25 参数）
+- ``embeddings.npy``       (N, dim) float32 向量矩阵，以 mmap 方式加载
+- ``texts.bin`` / ``text_offsets.npy``   块文本的 UTF-8 拼接与偏移
+- ``sources.json`` / ``source_ids.npy``  来源去重表与每块的来源编号
+- ``vocab.json``           词项 -> 词项编号
+- ``postings_offsets.npy`` / ``postings_docs.npy`` / ``postings_weights.npy``
+  CSR 格式倒排表，权重为预先算好的 BM25 分项，查询时只需聚合
+
+- ``ivf/``                 可选的 IVF 近似最近邻索引，见 :mod:`ann`
+
+所有 ``.npy`` 均以 ``mmap_mode="r"`` 打开，启动时不需要把索引读入内存。
+查询时 BM25 与向量两路各取候选，再用 RRF (reciprocal rank fusion) 融合；
+向量一路默认精确内积，``vector_index="ivf"`` 时改走 IVF 索引。
+"""
+
+import json
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.app.services.embedding import HashingEmbedder
+from src.app.services.local_kb.ann import IVFIndex
+from src.app.services.local_kb.chunker import Chunk
+
+INDEX_VERSION = 1
+
+
+class LocalKnowledgeBase:
+    """只读的本地混合检索索引"""
+
+    def __init__(
+        self,
+        path: str | Path,
+        rrf_k: int = 60,
+        vector_index: str = "exact",
+        nprobe: int = 8,
+    ) -> None:
+        self.path = Path(path)
+        self.rrf_k = rrf_k
+        self.meta: dict[str, Any] = json.loads((self.path / "meta.json").read_text())
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"不支持的索引版本: {self.meta.get('version')}")
+
+        self.embedder = HashingEmbedder(int(self.meta["dim"]))
+        self.embeddings = self._load("embeddings.npy")
+        self.text_offsets = self._load("text_offsets.npy")
+        self.texts = np.memmap(self.path / "texts.bin", dtype=np.uint8, mode="r")
+        self.source_ids = self._load("source_ids.npy")
+        self.sources: list[str] = json.loads((self.path / "sources.json").read_text())
+        self.vocab: dict[str, int] = json.loads((self.path / "vocab.json").read_text())
+        self.postings_offsets = self._load("postings_offsets.npy")
+        self.postings_docs = self._load("postings_docs.npy")
+        self.postings_weights = self._load("postings_weights.npy")
+
+        self.ann: IVFIndex | None = None
+        if vector_index == "ivf":
+            if not (self.path / "ivf" / "meta.json").exists():
+                raise FileNotFoundError(f"IVF 索引不存在: {self.path / 'ivf'}")
+            self.ann = IVFIndex(self.path / "ivf", nprobe=nprobe)
+        elif vector_index != "exact":
+            raise ValueError(f"未知的向量索引类型: {vector_index}")
+
+    def __len__(self) -> int:
+        return int(self.meta["count"])
+
+    def _load(self, name: str) -> np.ndarray:
+        array: np.ndarray = np.load(self.path / name, mmap_mode="r")
+        return array
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def build(
+        cls,
+        chunks: Iterable[Chunk],
+        path: str | Path,
+        dim: int = 256,
+        k1: float = 1.5,
+        b: float = 0.75,
+        batch_size: int = 4096,
+        ivf_nlist: int | None = 0,
+    ) -> "LocalKnowledgeBase":
+        """从知识块构建索引并写入目录；ivf_nlist 非 0 时同时构建 IVF 索引 (None 为自动)"""
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        embedder = HashingEmbedder(dim)
+
+        source_table: dict[str, int] = {}
+        source_ids: list[int] = []
+        text_offsets = [0]
+        doc_lengths: list[int] = []
+        vocab: dict[str, int] = {}
+        # 倒排三元组 (term_id, doc_id, tf)，最后按 term_id 排序得到 CSR
+        posting_terms: list[int] = []
+        posting_docs: list[int] = []
+        posting_tfs: list[int] = []
+        vectors: list[np.ndarray] = []
+        batch: list[str] = []
+
+        with open(out / "texts.bin", "wb") as texts_file:
+            for doc_id, chunk in enumerate(chunks):
+                encoded = chunk.content.encode("utf-8")
+                texts_file.write(encoded)
+                text_offsets.append(text_offsets[-1] + len(encoded))
+                source_ids.append(source_table.setdefault(chunk.source, len(source_table)))
+
+                tokens = embedder.tokenize(chunk.content)
+                doc_lengths.append(len(tokens))
+                for token, tf in Counter(tokens).items():
+                    posting_terms.append(vocab.setdefault(token, len(vocab)))
+                    posting_docs.append(doc_id)
+                    posting_tfs.append(tf)
+
+                batch.append(chunk.content)
+                if len(batch) >= batch_size:
+                    vectors.append(embedder.embed(batch))
+                    batch = []
+        if batch:
+            vectors.append(embedder.embed(batch))
+
+        count = len(doc_lengths)
+        embeddings = np.concatenate(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+        np.save(out / "embeddings.npy", embeddings.astype(np.float32))
+        np.save(out / "text_offsets.npy", np.asarray(text_offsets, dtype=np.int64))
+        np.save(out / "source_ids.npy", np.asarray(source_ids, dtype=np.int32))
+        (out / "sources.json").write_text(json.dumps(list(source_table), ensure_ascii=False))
+
+        terms = np.asarray(posting_terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        docs = np.asarray(posting_docs, dtype=np.int32)[order]
+        tfs = np.asarray(posting_tfs, dtype=np.float32)[order]
+        df = np.bincount(terms, minlength=len(vocab))
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+        # BM25 分项预计算：idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if count else 0.0
+        idf = np.log(1 + (count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths[docs] / max(avgdl, 1e-9))
+        weights = np.repeat(idf, df) * tfs * (k1 + 1) / (tfs + norm)
+
+        np.save(out / "postings_offsets.npy", offsets)
+        np.save(out / "postings_docs.npy", docs)
+        np.save(out / "postings_weights.npy", weights.astype(np.float32))
+        (out / "vocab.json").write_text(json.dumps(vocab, ensure_ascii=False))
+        (out / "meta.json").write_text(
+            json.dumps(
+                {"version": INDEX_VERSION, "count": count, "dim": dim, "k1": k1, "b": b, "avgdl": avgdl}
+            )
+        )
+        if ivf_nlist != 0:
+            IVFIndex.build(embeddings, out / "ivf", nlist=ivf_nlist)
+            return cls(out, vector_index="ivf")
+        return cls(out)
+
+    # ==================== 查询 ====================
+
+    def text(self, doc_id: int) -> str:
+        start, end = int(self.text_offsets[doc_id]), int(self.text_offsets[doc_id + 1])
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def search_bm25(self, query: str, k: int) -> list[tuple[int, float]]:
+        """BM25 检索，返回 [(doc_id, score)]"""
+        term_ids = {self.vocab[t] for t in self.embedder.tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return []
+        slices = [
+            (int(self.postings_offsets[t]), int(self.postings_offsets[t + 1])) for t in term_ids
+        ]
+        docs = np.concatenate([self.postings_docs[a:b] for a, b in slices])
+        weights = np.concatenate([self.postings_weights[a:b] for a, b in slices])
+        if len(docs) * 8 < len(self):
+            # 倒排表短时排序去重更省；高频词命中大量文档时直接稠密累加
+            unique_docs, inverse = np.unique(docs, return_inverse=True)
+            return self._top_k(unique_docs, np.bincount(inverse, weights=weights), k)
+        scores = np.bincount(docs, weights=weights, minlength=len(self))
+        return self._top_k(np.arange(len(scores)), scores, k)
+
+    def search_vector(self, query: str, k: int) -> list[tuple[int, float]]:
+        """向量检索，返回 [(doc_id, score)]"""
+        if len(self) == 0:
+            return []
+        if self.ann is not None:
+            return [hit for hit in self.ann.search(self.embedder.embed_one(query), k) if hit[1] > 0]
+        scores = self.embeddings @ self.embedder.embed_one(query)
+        return self._top_k(np.arange(len(scores)), scores, k)
+
+    def search(self, query: str, max_results: int = 5, candidates: int = 50) -> list[dict]:
+        """混合检索：两路候选按 RRF 融合，score 归一化到 0-1"""
+        fused: dict[int, float] = defaultdict(float)
+        for ranking in (self.search_bm25(query, candidates), self.search_vector(query, candidates)):
+            for rank, (doc_id, _) in enumerate(ranking):
+                fused[doc_id] += 1.0 / (self.rrf_k + rank + 1)
+
+        best = 2.0 / (self.rrf_k + 1)
+        top = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:max_results]
+        return [
+            {
+                "content": self.text(doc_id),
+                "source": self.sources[int(self.source_ids[doc_id])],
+                "score": round(score / best, 4),
+            }
+            for doc_id, score in top
+        ]
+
+    @staticmethod
+    def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> list[tuple[int, float]]:
+        part = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        order = part[np.argsort(-scores[part])]
+        return [(int(ids[i]), float(scores[i])) for i in order if scores[i] > 0]
@@ -0,0 +1,210 @@
+"""检索结果重排序
+
+在检索与 writer 之间按与问题的相关度给 passage 重新打分，只把前 top_k 条写入 prompt：
+
+- ``lexical``: BM25 词项匹配 + 哈希向量余弦，纯 numpy，无需模型
+- ``cross-encoder``: sentence-transformers 交叉编码器，需 ``uv sync --extra rerank``
+
+打分在专用的有界线程池中批量执行，超过延迟预算、线程池占满或出错时退回原有排序
+(检索分数 + 轮次)。交叉编码器模型在启动时 (``warmup``) 加载，不占用请求的延迟预算。
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Protocol
+
+import numpy as np
+
+from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import record_span, register_stats
+from src.app.services.embedding import HashingEmbedder, embedder
+
+
+class PassageScorer(Protocol):
+    """给一批 passage 打相关度分，分数越高越相关"""
+
+    def score(self, question: str, passages: list[str]) -> np.ndarray: ...
+
+
+class LexicalScorer:
+    """BM25 (以候选集为语料) 与哈希向量余弦的加权和"""
+
+    def __init__(
+        self,
+        text_embedder: HashingEmbedder | None = None,
+        semantic_weight: float = 0.3,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self.embedder = text_embedder or embedder
+        self.semantic_weight = semantic_weight
+        self.k1 = k1
+        self.b = b
+
+    def score(self, question: str, passages: list[str]) -> np.ndarray:
+        if not passages:
+            return np.zeros(0, dtype=np.float32)
+        query_terms = set(self.embedder.tokenize(question))
+        docs = [Counter(self.embedder.tokenize(p)) for p in passages]
+        lengths = np.array([sum(d.values()) for d in docs], dtype=np.float32)
+        avgdl = max(float(lengths.mean()), 1.0)
+
+        bm25 = np.zeros(len(passages), dtype=np.float32)
+        for term in query_terms:
+            tf = np.array([d.get(term, 0) for d in docs], dtype=np.float32)
+            df = int((tf > 0).sum())
+            if df == 0:
+                continue
+            idf = math.log(1 + (len(passages) - df + 0.5) / (df + 0.5))
+            bm25 += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / avgdl))
+        if bm25.max() > 0:
+            bm25 /= bm25.max()
+
+        vectors = self.embedder.embed([question, *passages])
+        cosine: np.ndarray = np.clip(vectors[1:] @ vectors[0], 0.0, 1.0)
+        return (1 - self.semantic_weight) * bm25 + self.semantic_weight * cosine
+
+
+class CrossEncoderScorer:
+    """sentence-transformers 交叉编码器，模型由 ``load`` 加载 (线程安全，只加载一次)"""
+
+    def __init__(self, model_name: str, batch_size: int = 32) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise RuntimeError("交叉编码器需要安装 sentence-transformers: uv sync --extra rerank") from e
+            self._model = CrossEncoder(self.model_name)
+
+    def score(self, question: str, passages: list[str]) -> np.ndarray:
+        self.load()
+        pairs = [(question, p) for p in passages]
+        return np.asarray(self._model.predict(pairs, batch_size=self.batch_size), dtype=np.float32)
+
+
+class _Busy(Exception):
+    """重排序线程池已满"""
+
+
+class Reranker:
+    """带延迟预算的重排序阶段"""
+
+    def __init__(
+        self, scorer: PassageScorer | None, top_k: int = 5, budget_ms: float = 50.0, workers: int = 1
+    ) -> None:
+        self.scorer = scorer
+        self.top_k = top_k
+        self.budget_ms = budget_ms
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        # 超时只是不再等待，线程内的计算仍占着线程；占满时直接退回原排序，不排队
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stats = {"calls": 0, "reranked": 0, "timeouts": 0, "busy": 0, "errors": 0, "total_ms": 0.0}
+
+    async def warmup(self) -> None:
+        """启动时加载打分模型 (如交叉编码器)，失败只记录日志，打分时退回原有排序"""
+        load = getattr(self.scorer, "load", None)
+        if load is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._get_executor(), load)
+        except Exception as e:
+            logger.error(f"重排序模型加载失败: {e}")
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rerank")
+        return self._executor
+
+    async def rerank(self, question: str, passages: list[dict]) -> list[dict]:
+        """为 passage 写入 rerank_score；超时或出错时移除该字段，按原有排序处理"""
+        if self.scorer is None or not passages:
+            return passages
+        self._stats["calls"] += 1
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            contents = [p["content"] for p in passages]
+            if not self._slots.acquire(blocking=False):
+                raise _Busy
+            # 提交成功后由完成回调归还名额，提交失败 (如线程池已关闭) 时在这里归还
+            try:
+                future = self._get_executor().submit(self.scorer.score, question, contents)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            scores = await asyncio.wait_for(asyncio.wrap_future(future), self.budget_ms / 1000)
+        except _Busy:
+            outcome = "busy"
+            self._stats["busy"] += 1
+            logger.warning("重排序线程池已满，使用原有排序")
+        except TimeoutError:
+            outcome = "timeout"
+            self._stats["timeouts"] += 1
+            logger.warning(f"重排序超过 {self.budget_ms}ms 预算，使用原有排序")
+        except Exception as e:
+            outcome = "error"
+            self._stats["errors"] += 1
+            logger.error(f"重排序失败，使用原有排序: {e}")
+
+        duration = time.perf_counter() - start
+        self._stats["total_ms"] += duration * 1000
+        record_span("rerank", "reranker", duration, outcome=outcome, candidates=len(passages))
+        if outcome != "ok":
+            return [{k: v for k, v in p.items() if k != "rerank_score"} for p in passages]
+
+        self._stats["reranked"] += 1
+        return [
+            {**p, "rerank_score": round(float(s), 6)} for p, s in zip(passages, scores, strict=True)
+        ]
+
+    @property
+    def max_passages(self) -> int | None:
+        """写入 prompt 的 passage 条数上限，未启用时不限制"""
+        return self.top_k if self.scorer is not None else None
+
+    def stats(self) -> dict[str, Any]:
+        calls = self._stats["calls"]
+        return {**self._stats, "avg_ms": self._stats["total_ms"] / calls if calls else 0.0}
+
+
+def build_scorer(mode: str, model_name: str = "") -> PassageScorer | None:
+    """按配置创建打分器 (off / lexical / cross-encoder)"""
+    if mode == "off":
+        return None
+    if mode == "lexical":
+        return LexicalScorer()
+    if mode == "cross-encoder":
+        return CrossEncoderScorer(model_name)
+    raise ValueError(f"未知的重排序模式: {mode}")
+
+
+# 服务单例
+reranker = Reranker(
+    build_scorer(settings.rerank_mode, settings.rerank_model),
+    top_k=settings.rerank_top_k,
+    budget_ms=settings.rerank_budget_ms,
+    workers=settings.rerank_workers,
+)
+register_stats("reranker", reranker.stats)
@@ -0,0 +1,311 @@
+"""告警指纹与风暴关联
+
+告警在创建事件 (``create_initial_state``) 之前先经过 ``AlertCorrelator``：
+
+1. 指纹：规范化告警名 (数字替换为占位符)、标签 (键值小写、去掉 pod/instance 等易变标签)
+   与资源名 (去掉 Deployment/StatefulSet 生成的后缀) 后取哈希，同一问题重复触发的
+   告警指纹相同。
+2. 关联：时间窗口内，指纹相同的告警视为重复；指纹不同但关联键相同的告警视为同一根因
+   的不同表现。两者都挂到已有的未关闭事件上，不再启动新的 Graph。关联键默认为
+   cluster / namespace / service 标签，须全部存在；缺少任一标签时再加上规范化的资源名
+   (无资源名时用告警名)，避免只有 cluster 相同的告警被合并。
+3. 窗口：事件最后一条告警超过 ``window_seconds`` 后自动关闭，之后的告警开新事件；
+   持续告警的事件在创建 ``max_lifetime_seconds`` 后同样关闭，不会无限期保持打开。
+
+指纹与关联键各有一个字典索引；事件的最后活跃时间与创建时间各放入一个最小堆 (惰性删除)，
+乱序到达的告警不影响淘汰顺序，单条告警的处理为 O(log n)。
+"""
+
+import hashlib
+import heapq
+import re
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any, NamedTuple
+
+from src.sre.agents.shared.state import Severity, SREState
+from src.sre.agents.shared.state_utils import create_initial_state
+
+# 每次触发都会变化、不代表问题本身的标签
+VOLATILE_LABELS = frozenset(
+    {
+        "pod",
+        "pod_name",
+        "pod_ip",
+        "instance",
+        "container_id",
+        "replica",
+        "endpoint",
+        "value",
+        "timestamp",
+    }
+)
+
+DEFAULT_GROUP_BY = ("cluster", "namespace", "service")
+
+_SEVERITY_RANK = {
+    Severity.INFO: 0,
+    Severity.LOW: 1,
+    Severity.MEDIUM: 2,
+    Severity.HIGH: 3,
+    Severity.CRITICAL: 4,
+}
+
+# Deployment pod: name-<replicaset hash>-<5 位随机>；StatefulSet pod: name-<序号>
+_POD_SUFFIX_RE = re.compile(r"-(?:[a-z0-9]{6,10}-[a-z0-9]{5}|\d+)$")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def normalize_resource(resource: str) -> str:
+    return _POD_SUFFIX_RE.sub("", resource.strip().lower())
+
+
+def normalize_labels(
+    labels: Mapping[str, Any], ignore: frozenset[str] = VOLATILE_LABELS
+) -> tuple[tuple[str, str], ...]:
+    """键值小写、去易变标签，按键排序"""
+    items = []
+    for key, value in labels.items():
+        key = key.strip().lower()
+        if key in ignore:
+            continue
+        items.append((key, str(value).strip().lower()))
+    return tuple(sorted(items))
+
+
+def parse_severity(value: Any) -> Severity:
+    """去空白、小写后转换为 Severity；Alertmanager 的 warning 等未知级别按 MEDIUM 处理"""
+    if isinstance(value, Severity):
+        return value
+    try:
+        return Severity(str(value).strip().lower())
+    except ValueError:
+        return Severity.MEDIUM
+
+
+def normalize_alertname(alert: Mapping[str, Any]) -> str:
+    """告警名 (缺失时用标题)，小写并把数字替换为占位符"""
+    name = (alert.get("labels") or {}).get("alertname") or alert.get("title", "")
+    return _NUMBER_RE.sub("<NUM>", str(name).strip().lower())
+
+
+def fingerprint(alert: Mapping[str, Any], ignore: frozenset[str] = VOLATILE_LABELS) -> str:
+    """告警指纹：规范化后的标签、资源与告警名的哈希"""
+    labels = alert.get("labels") or {}
+    parts = [
+        normalize_alertname(alert),
+        normalize_resource(str(alert.get("resource", ""))),
+        *(f"{k}={v}" for k, v in normalize_labels(labels, ignore)),
+    ]
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=12).hexdigest()
+
+
+class IncidentGroup:
+    """一个未关闭事件关联到的告警"""
+
+    __slots__ = (
+        "incident_id",
+        "correlation_key",
+        "fingerprints",
+        "resources",
+        "severity",
+        "alert_count",
+        "duplicate_count",
+        "first_seen",
+        "last_seen",
+    )
+
+    def __init__(
+        self, incident_id: str, correlation_key: tuple, severity: Severity, timestamp: float
+    ) -> None:
+        self.incident_id = incident_id
+        self.correlation_key = correlation_key
+        self.fingerprints: set[str] = set()
+        self.resources: set[str] = set()
+        self.severity = severity
+        self.alert_count = 0
+        self.duplicate_count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "incident_id": self.incident_id,
+            "severity": self.severity,
+            "alerts": self.alert_count,
+            "duplicates": self.duplicate_count,
+            "fingerprints": len(self.fingerprints),
+            "resources": sorted(self.resources),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class Correlation(NamedTuple):
+    """单条告警的关联结果
+
+    ``state`` 仅在新建事件时非空；挂到已有事件时 ``update`` 为交给该事件 Graph 的增量。
+    """
+
+    incident_id: str
+    fingerprint: str
+    is_new: bool
+    duplicate: bool
+    escalated: bool
+    state: SREState | None
+    update: dict[str, Any]
+
+
+class AlertCorrelator:
+    """告警关联引擎
+
+    Args:
+        window_seconds: 事件最后一条告警之后保持打开、可继续关联的时长
+        max_lifetime_seconds: 事件自创建起最长保持打开的时长，0 为不限
+        group_by: 关联键使用的标签，缺少任一标签时加上规范化的资源名
+        ignore_labels: 计算指纹时忽略的标签
+        max_iterations: 新建事件的最大迭代次数
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        max_lifetime_seconds: float = 3600.0,
+        group_by: Iterable[str] = DEFAULT_GROUP_BY,
+        ignore_labels: Iterable[str] = VOLATILE_LABELS,
+        max_iterations: int = 5,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.group_by = tuple(group_by)
+        self.ignore_labels = frozenset(ignore_labels)
+        self.max_iterations = max_iterations
+        # incident_id -> 未关闭事件
+        self.groups: dict[str, IncidentGroup] = {}
+        # (last_seen, incident_id) 与 (first_seen, incident_id) 最小堆，过期条目在弹出时跳过
+        self._idle: list[tuple[float, str]] = []
+        self._born: list[tuple[float, str]] = []
+        self._by_fingerprint: dict[str, IncidentGroup] = {}
+        self._by_key: dict[tuple, IncidentGroup] = {}
+        self.stats = {"alerts": 0, "incidents": 0, "duplicates": 0, "correlated": 0, "expired": 0}
+
+    def ingest(self, alert: Mapping[str, Any]) -> Correlation:
+        """处理一条告警：重复/关联则挂到已有事件，否则新建事件
+
+        告警字段: title、severity、source、description、resource、labels、timestamp (秒)。
+        """
+        timestamp = float(alert.get("timestamp") or time.time())
+        self.expire(timestamp)
+        self.stats["alerts"] += 1
+
+        fp = fingerprint(alert, self.ignore_labels)
+        severity = parse_severity(alert.get("severity"))
+        group = self._by_fingerprint.get(fp)
+        duplicate = group is not None
+        if group is None:
+            group = self._by_key.get(self._correlation_key(alert))
+
+        if group is None:
+            return self._open(alert, fp, severity, timestamp)
+
+        self.stats["duplicates" if duplicate else "correlated"] += 1
+        escalated = _SEVERITY_RANK[severity] > _SEVERITY_RANK[group.severity]
+        self._touch(group, alert, fp, timestamp, duplicate)
+        update: dict[str, Any] = {"correlated_alerts": [dict(alert)]}
+        if escalated:
+            group.severity = severity
+            update["severity"] = severity
+        return Correlation(group.incident_id, fp, False, duplicate, escalated, None, update)
+
+    def resolve(self, incident_id: str) -> IncidentGroup | None:
+        """关闭事件，之后的告警不再关联到它"""
+        group = self.groups.get(incident_id)
+        if group is not None:
+            self._close(group)
+        return group
+
+    def expire(self, now: float | None = None) -> int:
+        """关闭超过窗口未再收到告警、或超过最长存活时间的事件，返回关闭数"""
+        now = time.time() if now is None else now
+        closed = self._sweep(self._idle, now - self.window_seconds, "last_seen")
+        if self.max_lifetime_seconds > 0:
+            closed += self._sweep(self._born, now - self.max_lifetime_seconds, "first_seen")
+        self.stats["expired"] += closed
+        return closed
+
+    def _sweep(self, heap: list[tuple[float, str]], before: float, field: str) -> int:
+        """弹出堆中早于 before 的条目并关闭对应事件；事件已关闭或时间已更新的条目直接丢弃"""
+        closed = 0
+        while heap and heap[0][0] < before:
+            seen, incident_id = heapq.heappop(heap)
+            group = self.groups.get(incident_id)
+            if group is not None and getattr(group, field) == seen:
+                self._close(group)
+                closed += 1
+        return closed
+
+    def _open(
+        self, alert: Mapping[str, Any], fp: str, severity: Severity, timestamp: float
+    ) -> Correlation:
+        state = create_initial_state(
+            alert_source=str(alert.get("source", "unknown")),
+            severity=severity,
+            title=str(alert.get("title", "")),
+            description=str(alert.get("description", "")),
+            max_iterations=self.max_iterations,
+        )
+        state["correlated_alerts"] = [dict(alert)]
+        state["resource_info"] = {
+            "resource": alert.get("resource", ""),
+            "labels": dict(alert.get("labels") or {}),
+        }
+
+        group = IncidentGroup(
+            state["incident_id"], self._correlation_key(alert), severity, timestamp
+        )
+        self.groups[group.incident_id] = group
+        heapq.heappush(self._idle, (timestamp, group.incident_id))
+        heapq.heappush(self._born, (timestamp, group.incident_id))
+        self._by_key[group.correlation_key] = group
+        self._touch(group, alert, fp, timestamp, duplicate=False)
+        self.stats["incidents"] += 1
+        return Correlation(group.incident_id, fp, True, False, False, state, {})
+
+    def _touch(
+        self,
+        group: IncidentGroup,
+        alert: Mapping[str, Any],
+        fp: str,
+        timestamp: float,
+        duplicate: bool,
+    ) -> None:
+        group.alert_count += 1
+        group.duplicate_count += duplicate
+        group.fingerprints.add(fp)
+        self._by_fingerprint[fp] = group
+        resource = normalize_resource(str(alert.get("resource", "")))
+        if resource:
+            group.resources.add(resource)
+        # 迟到的告警不推迟淘汰：只有最后活跃时间真正前移才登记新的堆条目
+        if timestamp > group.last_seen:
+            group.last_seen = timestamp
+            heapq.heappush(self._idle, (timestamp, group.incident_id))
+
+    def _close(self, group: IncidentGroup) -> None:
+        del self.groups[group.incident_id]
+        for fp in group.fingerprints:
+            if self._by_fingerprint.get(fp) is group:
+                del self._by_fingerprint[fp]
+        if self._by_key.get(group.correlation_key) is group:
+            del self._by_key[group.correlation_key]
+
+    def _correlation_key(self, alert: Mapping[str, Any]) -> tuple:
+        labels = {k.lower(): v for k, v in (alert.get("labels") or {}).items()}
+        values = tuple(str(labels.get(name, "")).strip().lower() for name in self.group_by)
+        if all(values):
+            return ("labels", *values)
+        # 标签不全时只凭部分标签 (如仅 cluster) 关联过宽，须同一资源或同一告警名
+        resource = normalize_resource(str(alert.get("resource", "")))
+        if resource:
+            return ("resource", *values, resource)
+        return ("alertname", *values, normalize_alertname(alert))
@@ -0,0 +1,274 @@
+"""操作计划的并发执行
+
+``action_plan`` 按 ``ActionItem.depends_on`` 构成有向无环图：前置操作全部成功后，
+操作即可开始，互不依赖的 QUERY/DIAGNOSTIC 操作用 asyncio 并发执行，诊断总耗时从
+各操作耗时之和降为关键路径长度。
+
+- 并发：全局上限 ``max_parallel``，另可按工具限制并发数 (如日志查询接口有限流)
+- 超时：按工具设置，超时记为 failed
+- 审批：不满足 ``is_action_auto_approvable`` 的操作 (REMEDIATION/DESTRUCTIVE，或标记了
+  ``requires_approval``) 不执行，放入 ``pending_approval``，审批通过后带 ``approved`` 再次执行；
+  依赖它的操作同样等待
+- 失败：前置操作失败时，依赖它的操作记为 cancelled
+- 结果：``stream`` 按完成顺序逐条产出 ``ActionResult``，可直接经 ``record_action_result``
+  追加到 ``executed_actions``；``stream_updates`` 每完成一个操作产出一次状态增量
+  (含 ``running_actions`` 与已知的 ``pending_approval``)，``execute`` 为其汇总
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Collection, Iterable, Mapping
+from datetime import datetime
+from typing import Any
+
+from src.sre.agents.shared.state import ActionItem, ActionResult, ExecutorState, SREState
+from src.sre.agents.shared.state_utils import is_action_auto_approvable
+
+Tool = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+def plan_order(plan: Iterable[ActionItem], completed: Collection[str] = ()) -> list[list[str]]:
+    """校验依赖并按层返回操作 ID：同一层的操作互不依赖
+
+    Raises:
+        ValueError: 操作 ID 重复、依赖不存在或存在环
+    """
+    actions = {}
+    for action in plan:
+        if action["id"] in actions:
+            raise ValueError(f"操作 ID 重复: {action['id']}")
+        actions[action["id"]] = action
+
+    waiting: dict[str, set[str]] = {}
+    for action_id, action in actions.items():
+        deps = set(action.get("depends_on", [])) - set(completed)
+        unknown = deps - actions.keys()
+        if unknown:
+            raise ValueError(f"操作 {action_id} 依赖不存在的操作: {sorted(unknown)}")
+        waiting[action_id] = deps
+
+    layers = []
+    while waiting:
+        ready = [action_id for action_id, deps in waiting.items() if not deps]
+        if not ready:
+            raise ValueError(f"操作依赖存在环: {sorted(waiting)}")
+        layers.append(ready)
+        for action_id in ready:
+            del waiting[action_id]
+        for deps in waiting.values():
+            deps.difference_update(ready)
+    return layers
+
+
+class ActionExecutor:
+    """按依赖图并发执行操作计划
+
+    Args:
+        tools: 工具名 -> 异步函数，参数为 ``ActionItem.parameters``，返回值转为字符串作为输出
+        concurrency: 工具名 -> 最大并发数，未配置的工具使用 default_concurrency
+        timeouts: 工具名 -> 超时秒数，未配置的工具使用 default_timeout
+        max_parallel: 全局最大并发数
+    """
+
+    def __init__(
+        self,
+        tools: Mapping[str, Tool],
+        concurrency: Mapping[str, int] | None = None,
+        timeouts: Mapping[str, float] | None = None,
+        default_concurrency: int = 4,
+        default_timeout: float = 30.0,
+        max_parallel: int = 16,
+        executed_by: str = "agent",
+    ) -> None:
+        self.tools = dict(tools)
+        self.concurrency = dict(concurrency or {})
+        self.timeouts = dict(timeouts or {})
+        self.default_concurrency = default_concurrency
+        self.default_timeout = default_timeout
+        self.max_parallel = max_parallel
+        self.executed_by = executed_by
+
+    async def stream(
+        self,
+        plan: Iterable[ActionItem],
+        approved: Collection[str] = (),
+        completed: Collection[str] = (),
+        gated: list[ActionItem] | None = None,
+        active: set[str] | None = None,
+    ) -> AsyncIterator[ActionResult]:
+        """执行计划，按完成顺序产出结果
+
+        Args:
+            plan: 待执行的操作
+            approved: 已人工批准的操作 ID，不受自动审批策略限制
+            completed: 计划外已成功的操作 ID，视为已满足的依赖
+            gated: 传入列表时，被审批拦下的操作追加到其中
+            active: 传入集合时，随执行进度维护正在执行的操作 ID
+        """
+        plan = list(plan)
+        plan_order(plan, completed)
+        actions = {action["id"]: action for action in plan}
+        waiting = {
+            action_id: set(action.get("depends_on", [])) - set(completed)
+            for action_id, action in actions.items()
+        }
+        dependents: dict[str, list[str]] = {action_id: [] for action_id in actions}
+        for action_id, deps in waiting.items():
+            for dep in deps:
+                dependents[dep].append(action_id)
+
+        limits = {
+            name: asyncio.Semaphore(self.concurrency.get(name, self.default_concurrency))
+            for name in {action["tool_name"] for action in plan}
+        }
+        parallel = asyncio.Semaphore(self.max_parallel)
+        running: set[asyncio.Task] = set()
+
+        def schedule(action_id: str) -> None:
+            action = actions[action_id]
+            if action_id in approved or is_action_auto_approvable(action):
+                running.add(
+                    asyncio.create_task(self._run(action, limits[action["tool_name"]], parallel))
+                )
+                if active is not None:
+                    active.add(action_id)
+            else:
+                # 等待审批：不执行，依赖它的操作也停在原处
+                if gated is not None:
+                    gated.append(action)
+
+        def cancel_dependents(action_id: str, reason: str) -> list[ActionResult]:
+            cancelled = []
+            stack = list(dependents[action_id])
+            while stack:
+                dependent = stack.pop()
+                if dependent not in waiting:
+                    continue
+                del waiting[dependent]
+                cancelled.append(self._result(dependent, "cancelled", "", reason))
+                stack.extend(dependents[dependent])
+            return cancelled
+
+        for action_id in [a for a, deps in waiting.items() if not deps]:
+            del waiting[action_id]
+            schedule(action_id)
+
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.discard(task)
+                    result = task.result()
+                    action_id = result["action_id"]
+                    if active is not None:
+                        active.discard(action_id)
+                    # 先调度后续操作再产出结果，调用方看到的 active 已包含新启动的操作
+                    cancelled: list[ActionResult] = []
+                    if result["status"] != "success":
+                        cancelled = cancel_dependents(action_id, f"前置操作 {action_id} 未成功")
+                    else:
+                        for dependent in dependents[action_id]:
+                            remaining = waiting.get(dependent)
+                            if remaining is None:
+                                continue
+                            remaining.discard(action_id)
+                            if not remaining:
+                                del waiting[dependent]
+                                schedule(dependent)
+                    yield result
+                    for item in cancelled:
+                        yield item
+        finally:
+            # 调用方提前结束迭代时取消仍在执行的操作
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            if active is not None:
+                active.clear()
+
+    async def stream_updates(
+        self, state: SREState | ExecutorState, approved: Collection[str] = ()
+    ) -> AsyncIterator[dict[str, Any]]:
+        """执行 state 中尚未执行的计划操作，每产生结果即产出一次增量
+
+        已有结果的操作跳过，成功的操作作为已满足的依赖。``executed_actions`` 为本次新增的结果
+        (由 reducer 追加)；``running_actions`` 与 ``pending_approval`` 为当前完整列表 (覆盖)。
+        """
+        done = {
+            result["action_id"]: result["status"] for result in state.get("executed_actions", [])
+        }
+        actions = {
+            action["id"]: action
+            for action in state.get("action_plan", [])
+            if action["id"] not in done
+        }
+        completed = [action_id for action_id, status in done.items() if status == "success"]
+
+        # 依赖之前未成功的操作直接取消
+        unsuccessful = done.keys() - set(completed)
+        results: list[ActionResult] = []
+        for layer in plan_order(actions.values(), done.keys()):
+            for action_id in layer:
+                failed_deps = unsuccessful & set(actions[action_id].get("depends_on", []))
+                if failed_deps:
+                    unsuccessful.add(action_id)
+                    del actions[action_id]
+                    reason = f"前置操作 {min(failed_deps)} 未成功"
+                    results.append(self._result(action_id, "cancelled", "", reason))
+
+        gated: list[ActionItem] = []
+        active: set[str] = set()
+
+        def update(new: list[ActionResult]) -> dict[str, Any]:
+            return {
+                "executed_actions": new,
+                "running_actions": sorted(active),
+                "pending_approval": list(gated),
+                "updated_at": datetime.now(),
+            }
+
+        if results:
+            yield update(results)
+        async for result in self.stream(actions.values(), approved, completed, gated, active):
+            yield update([result])
+        yield update([])
+
+    async def execute(
+        self, state: SREState | ExecutorState, approved: Collection[str] = ()
+    ) -> dict[str, Any]:
+        """执行 state 中尚未执行的计划操作，全部结束后返回汇总的增量"""
+        merged: dict[str, Any] = {"executed_actions": []}
+        async for update in self.stream_updates(state, approved):
+            merged = {
+                **update,
+                "executed_actions": merged["executed_actions"] + update["executed_actions"],
+            }
+        return merged
+
+    async def _run(
+        self, action: ActionItem, limit: asyncio.Semaphore, parallel: asyncio.Semaphore
+    ) -> ActionResult:
+        name = action["tool_name"]
+        tool = self.tools.get(name)
+        if tool is None:
+            return self._result(action["id"], "failed", "", f"未知工具: {name}")
+
+        timeout = self.timeouts.get(name, self.default_timeout)
+        async with limit, parallel:
+            try:
+                output = await asyncio.wait_for(tool(action.get("parameters", {})), timeout)
+            except TimeoutError:
+                return self._result(action["id"], "failed", "", f"执行超时 ({timeout}s)")
+            except Exception as e:
+                return self._result(action["id"], "failed", "", f"{type(e).__name__}: {e}")
+        return self._result(action["id"], "success", "" if output is None else str(output), None)
+
+    def _result(self, action_id: str, status: str, output: str, error: str | None) -> ActionResult:
+        return ActionResult(
+            action_id=action_id,
+            status=status,
+            output=output,
+            error=error,
+            executed_at=datetime.now(),
+            executed_by=self.executed_by,
+        )
@@ -1,9 +1,13 @@
 """SRE Agent 全局状态定义
 
 支持 Multi-Agent 协作和事件状态机管理
+
+只追加的列表字段声明了 reducer，节点只需返回本次新增的条目，由 LangGraph 合并；
+其余字段为覆盖语义，节点同样只返回变化的字段，避免每次转移复制整个状态。
 """
 
-from typing import Annotated, Any, TypedDict, Literal
+import operator
+from typing import Annotated, Any, NotRequired, TypedDict, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -53,6 +57,7 @@ class ActionItem(TypedDict):
     requires_approval: bool            # 是否需要审批
     estimated_impact: str              # 预估影响
     created_at: datetime               # 创建时间
+    depends_on: NotRequired[list[str]]  # 前置操作 ID，全部成功后才执行 (缺省为无依赖)
 
 
 class ActionResult(TypedDict):
@@ -80,14 +85,15 @@ class SREState(TypedDict):
     description: str                   # 事件描述
     created_at: datetime               # 创建时间
     updated_at: datetime               # 最后更新时间
+    correlated_alerts: Annotated[list[dict], operator.add]  # 关联到本事件的原始告警 (追加，见 AlertCorrelator)
     
     # ==================== 对话历史 ====================
     messages: Annotated[list, add_messages]  # 对话历史 (Human/AI)
     
     # ==================== 监控数据 ====================
     # Monitor Agent 收集的数据
-    metrics_data: dict[str, Any]       # 指标数据 {metric_name: value}
-    log_entries: list[dict]            # 相关日志条目
+    metrics_data: dict[str, Any]       # 异常指标摘要 {metric_name: {value, score, baseline, ...}}
+    log_entries: list[dict]            # 相关日志条目 (compress_log_entries 可聚类为模板记录)
     resource_info: dict[str, Any]      # 受影响的资源信息
     time_context: dict[str, Any]       # 时间上下文 (部署时间、变更记录等)
     
@@ -102,9 +108,9 @@ class SREState(TypedDict):
     
     # ==================== 执行计划 ====================
     # Executor Agent 管理
-    action_plan: list[ActionItem]      # 生成的操作计划
+    action_plan: Annotated[list[ActionItem], operator.add]  # 生成的操作计划 (追加)
     pending_approval: list[ActionItem] # 待审批的操作
-    executed_actions: list[ActionResult]  # 已执行的操作结果
+    executed_actions: Annotated[list[ActionResult], operator.add]  # 已执行的操作结果 (追加)
     rejected_actions: list[ActionItem] # 被拒绝的操作
     
     # ==================== 状态机 ====================
@@ -117,8 +123,8 @@ class SREState(TypedDict):
     
     # ==================== 人工介入 ====================
     assigned_to: str | None            # 分配给的处理人
-    human_notes: list[dict]            # 人工备注
-    approval_decisions: list[dict]     # 审批决策记录
+    human_notes: Annotated[list[dict], operator.add]         # 人工备注 (追加)
+    approval_decisions: Annotated[list[dict], operator.add]  # 审批决策记录 (追加)
     
     # ==================== 结果输出 ====================
     final_report: str | None           # 最终报告
@@ -135,7 +141,7 @@ class MonitorState(TypedDict):
     metrics_data: dict[str, Any]
     log_entries: list[dict]
     time_context: dict[str, Any]
-    max_age_minutes: int               # 数据最大时间范围
+    max_age_minutes: int               # 数据最大时间范围 (MetricStore 窗口)
 
 
 class DiagnoserState(TypedDict):
@@ -160,7 +166,7 @@ class ExecutorState(TypedDict):
     pending_approval: list[ActionItem]
     executed_actions: list[ActionResult]
     requires_human_approval: bool       # 是否需要人工审批
-    current_action: ActionItem | None   # 当前执行的操作
+    running_actions: list[str]          # 正在并发执行的操作 ID (由 ActionExecutor.stream_updates 维护)
 
 
 class SupervisorState(TypedDict):
@@ -1,6 +1,11 @@
-"""状态管理工具函数"""
+"""状态管理工具函数
+
+``update_status`` 等更新函数只返回变化的字段 (partial update)，作为节点返回值交给
+LangGraph 合并；列表字段由 ``SREState`` 上的 reducer 追加，不复制已有条目。
+"""
 
 from datetime import datetime
+from typing import Any
 from uuid import uuid4
 
 from src.sre.agents.shared.state import (
@@ -10,6 +15,8 @@ from src.sre.agents.shared.state import (
     SREState,
     Severity,
 )
+from src.sre.analysis.log_templates import reduce_log_entries
+from src.sre.analysis.metric_store import MetricStore
 
 
 def create_initial_state(
@@ -32,6 +39,7 @@ def create_initial_state(
         description=description,
         created_at=now,
         updated_at=now,
+        correlated_alerts=[],
         messages=[],
         metrics_data={},
         log_entries=[],
@@ -58,35 +66,57 @@ def create_initial_state(
     )
 
 
-def update_status(state: SREState, new_status: IncidentStatus, reason: str = "") -> SREState:
-    """更新事件状态"""
+def update_status(state: SREState, new_status: IncidentStatus) -> dict[str, Any]:
+    """更新事件状态 (返回增量)"""
     
     return {
-        **state,
         "previous_status": state["status"],
         "status": new_status,
         "updated_at": datetime.now(),
     }
 
 
-def add_action_to_plan(state: SREState, action: ActionItem) -> SREState:
-    """添加操作到计划"""
+def add_action_to_plan(action: ActionItem) -> dict[str, Any]:
+    """添加操作到计划 (返回增量，由 action_plan 的 reducer 追加)"""
     
-    current_plan = state.get("action_plan", [])
     return {
-        **state,
-        "action_plan": [*current_plan, action],
+        "action_plan": [action],
         "updated_at": datetime.now(),
     }
 
 
-def record_action_result(state: SREState, result: ActionResult) -> SREState:
-    """记录操作执行结果"""
+def record_action_result(result: ActionResult) -> dict[str, Any]:
+    """记录操作执行结果 (返回增量，由 executed_actions 的 reducer 追加)"""
     
-    executed = state.get("executed_actions", [])
     return {
-        **state,
-        "executed_actions": [*executed, result],
+        "executed_actions": [result],
+        "updated_at": datetime.now(),
+    }
+
+
+def compress_log_entries(state: SREState, limit: int = 200, **parser_options: Any) -> dict[str, Any]:
+    """把原始日志聚类为模板记录后替换 log_entries (返回增量)
+
+    每条记录含 template / count / first_seen / last_seen / exemplars，按次数降序。
+    """
+
+    records = reduce_log_entries(state.get("log_entries", []), limit=limit, **parser_options)
+    return {
+        "log_entries": records,
+        "updated_at": datetime.now(),
+    }
+
+
+def summarize_metrics(
+    store: MetricStore,
+    threshold: float = 3.0,
+    method: str = "zscore",
+    limit: int = 50,
+) -> dict[str, Any]:
+    """只把异常序列的摘要写入 metrics_data (返回增量)"""
+
+    return {
+        "metrics_data": store.anomalies(threshold=threshold, method=method, limit=limit),
         "updated_at": datetime.now(),
     }
 
@@ -105,13 +135,11 @@ def get_current_hypothesis(state: SREState) -> dict | None:
 def is_auto_approvable(state: SREState) -> bool:
     """检查当前操作是否可自动批准 (基于策略)"""
     
-    pending = state.get("pending_approval", [])
-    if not pending:
-        return True
-    
-    # 策略：只有 QUERY/DIAGNOSTIC 类型可自动执行
-    for action in pending:
-        if action["type"] not in ["query", "diagnostic"]:
-            return False
+    return all(is_action_auto_approvable(action) for action in state.get("pending_approval", []))
+
+
+def is_action_auto_approvable(action: ActionItem) -> bool:
+    """检查单个操作是否可自动执行"""
     
-    return True
+    # 策略：只有 QUERY/DIAGNOSTIC 类型、且未标记需要审批的操作可自动执行
+    return not action.get("requires_approval", False) and action["type"] in ["query", "diagnostic"]
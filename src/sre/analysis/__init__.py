@@ -0,0 +1,13 @@
+from src.sre.analysis.log_templates import (
+    DrainParser,
+    LogTemplate,
+    reduce_log_entries,
+)
+from src.sre.analysis.metric_store import MetricStore
+
+__all__ = [
+    "DrainParser",
+    "LogTemplate",
+    "MetricStore",
+    "reduce_log_entries",
+]
@@ -0,0 +1,244 @@
+"""日志模板挖掘 (Drain)
+
+把原始日志行在线聚类为带参数槽位的模板，例如::
+
+    Connection to 10.0.3.17:5432 timed out after 3000 ms
+    Connection to 10.0.9.2:5432 timed out after 1500 ms
+    -> Connection to <IP> timed out after <NUM> ms
+
+每个模板记录出现次数、首/末次时间戳和少量样例，10 万行日志通常收敛为几百条结构化记录，
+可直接放进 ``SREState.log_entries`` 交给诊断 LLM。
+
+算法为 Drain (He et al., ICWS 2017)：先按空白切分，只对含数字的 token 用正则把 IP、
+数字等变量替换成类型占位符（掩码不跨 token），再按 "token 数 -> 前若干个 token"
+的固定深度前缀树找到候选簇，与簇模板逐位比较相似度，超过阈值则合并
+（不同的位置泛化为 ``<*>``），否则新建簇。
+另对 "掩码后 token 序列 -> 簇" 做缓存，重复日志行跳过树搜索。
+
+已压缩的模板记录 (含 ``template`` 与 ``count``) 可以与原始日志混合输入：记录按原样恢复为簇，
+不再重新聚类，因此对压缩结果再压缩一次不会改变它。
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+WILDCARD = "<*>"
+
+# 按顺序匹配：先长模式后短模式，避免 IP/UUID 被拆成多个数字
+DEFAULT_MASKS: list[tuple[str, str]] = [
+    ("UUID", r"\b[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}\b"),
+    ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"),
+    ("HEX", r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b"),
+    ("NUM", r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?:ms|s|m|h|kb|mb|gb|%)?(?![\w.])"),
+]
+
+_LEAF = None
+
+_has_digit = re.compile(r"\d").search
+
+
+class LogTemplate:
+    """一个日志模板（簇）"""
+
+    __slots__ = ("template_id", "tokens", "count", "first_seen", "last_seen", "exemplars")
+
+    def __init__(self, template_id: int, tokens: list[str]) -> None:
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen: Any = None
+        self.last_seen: Any = None
+        self.exemplars: list[str] = []
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "template_id": self.template_id,
+            "template": self.template,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "exemplars": list(self.exemplars),
+        }
+
+
+class DrainParser:
+    """在线日志模板挖掘器
+
+    Args:
+        depth: 前缀树深度（含根和长度层），即按前 depth-2 个 token 分组
+        similarity_threshold: 与模板相同 token 的比例达到该值才合并
+        max_children: 单个树节点的最大子节点数，超出后归入 ``<*>`` 分支
+        max_exemplars: 每个模板保留的样例行数
+        masks: (占位符名, 正则) 列表，作用于含数字的单个 token，匹配部分替换为 ``<名>``
+        cache_size: 掩码后 token 序列 -> 模板的缓存条数，0 为关闭
+    """
+
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity_threshold: float = 0.4,
+        max_children: int = 100,
+        max_exemplars: int = 3,
+        masks: list[tuple[str, str]] | None = None,
+        cache_size: int = 100_000,
+    ) -> None:
+        if depth < 3:
+            raise ValueError("depth 至少为 3")
+        self.prefix_depth = depth - 2
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_exemplars = max_exemplars
+        self.cache_size = cache_size
+        patterns = DEFAULT_MASKS if masks is None else masks
+        self._mask_re = (
+            re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns))
+            if patterns
+            else None
+        )
+        # 纯数字 token 最常见，跳过正则直接替换
+        self._plain_number = "<NUM>" if any(name == "NUM" for name, _ in patterns) else None
+        self._root: dict[int, dict] = {}
+        self._cache: dict[tuple[str, ...], LogTemplate] = {}
+        self.templates: dict[int, LogTemplate] = {}
+        self.lines = 0
+        self._next_id = 1
+
+    def tokenize(self, line: str) -> tuple[str, ...]:
+        """切分并掩码变量"""
+        mask_re = self._mask_re
+        if mask_re is None:
+            return tuple(line.split())
+
+        def mask(token: str) -> str:
+            if self._plain_number and token.isdigit():
+                return self._plain_number
+            return mask_re.sub(lambda m: f"<{m.lastgroup}>", token)
+
+        return tuple(mask(token) if _has_digit(token) else token for token in line.split())
+
+    def add(self, line: str, timestamp: Any = None) -> LogTemplate:
+        """处理一行日志，返回其所属模板"""
+        tokens = self.tokenize(line)
+        template = self._cache.get(tokens)
+        if template is None:
+            template = self._match(tokens)
+            if self.cache_size:
+                if len(self._cache) >= self.cache_size:
+                    self._cache.clear()
+                self._cache[tokens] = template
+
+        self.lines += 1
+        template.count += 1
+        if len(template.exemplars) < self.max_exemplars:
+            template.exemplars.append(line)
+        if timestamp is not None:
+            if template.first_seen is None or timestamp < template.first_seen:
+                template.first_seen = timestamp
+            if template.last_seen is None or timestamp > template.last_seen:
+                template.last_seen = timestamp
+        return template
+
+    def add_record(self, record: dict[str, Any]) -> LogTemplate:
+        """恢复一条已压缩的模板记录，之后的日志行可以继续合并进来"""
+        tokens = tuple(str(record["template"]).split())
+        template_id = record.get("template_id")
+        if not isinstance(template_id, int) or template_id in self.templates:
+            template_id = self._next_id
+        template = self._new_template(template_id, tokens)
+        self.lines += int(record["count"])
+        template.count = int(record["count"])
+        template.first_seen = record.get("first_seen")
+        template.last_seen = record.get("last_seen")
+        template.exemplars = list(record.get("exemplars", []))[: self.max_exemplars]
+        return template
+
+    def parse(
+        self,
+        entries: Iterable[dict | str],
+        message_key: str = "message",
+        time_key: str = "timestamp",
+    ) -> Iterator[tuple[LogTemplate, dict | str]]:
+        """流式处理日志，逐条产出 (模板, 原始条目)
+
+        条目可以是字符串，或包含 ``message_key`` / ``time_key`` 的字典（如 ``SREState.log_entries``），
+        也可以是已压缩的模板记录。
+        """
+        for entry in entries:
+            if isinstance(entry, dict) and "template" in entry and "count" in entry:
+                yield self.add_record(entry), entry
+                continue
+            if isinstance(entry, dict):
+                line = str(entry.get(message_key, ""))
+                timestamp = entry.get(time_key)
+            else:
+                line, timestamp = entry, None
+            yield self.add(line, timestamp), entry
+
+    def records(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """按出现次数降序返回模板记录"""
+        ordered = sorted(self.templates.values(), key=lambda t: t.count, reverse=True)
+        return [t.to_record() for t in ordered[:limit]]
+
+    def _leaf(self, tokens: tuple[str, ...]) -> list[LogTemplate]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[: self.prefix_depth]:
+            # 含数字的 token 多半是未被掩码的变量，节点已满时同样归入通配分支
+            if token not in node and (_has_digit(token) or len(node) >= self.max_children):
+                token = WILDCARD
+            node = node.setdefault(token, {})
+        leaf: list[LogTemplate] = node.setdefault(_LEAF, [])
+        return leaf
+
+    def _match(self, tokens: tuple[str, ...]) -> LogTemplate:
+        leaf = self._leaf(tokens)
+        best: LogTemplate | None = None
+        best_similarity, best_params = -1.0, -1
+        for candidate in leaf:
+            same = params = 0
+            for expected, token in zip(candidate.tokens, tokens, strict=True):
+                if expected == WILDCARD:
+                    params += 1
+                elif expected == token:
+                    same += 1
+            similarity = same / len(tokens) if tokens else 1.0
+            if similarity > best_similarity or (
+                similarity == best_similarity and params > best_params
+            ):
+                best, best_similarity, best_params = candidate, similarity, params
+
+        if best is not None and best_similarity >= self.similarity_threshold:
+            best.tokens = [
+                expected if expected == token else WILDCARD
+                for expected, token in zip(best.tokens, tokens, strict=True)
+            ]
+            return best
+
+        return self._new_template(self._next_id, tokens, leaf)
+
+    def _new_template(
+        self, template_id: int, tokens: tuple[str, ...], leaf: list[LogTemplate] | None = None
+    ) -> LogTemplate:
+        template = LogTemplate(template_id, list(tokens))
+        self.templates[template_id] = template
+        self._next_id = max(self._next_id, template_id + 1)
+        (self._leaf(tokens) if leaf is None else leaf).append(template)
+        return template
+
+
+def reduce_log_entries(
+    entries: Iterable[dict | str],
+    limit: int | None = None,
+    message_key: str = "message",
+    time_key: str = "timestamp",
+    **parser_options: Any,
+) -> list[dict[str, Any]]:
+    """把原始日志压缩为模板记录（按次数降序，最多 limit 条），已压缩的记录原样保留"""
+    parser = DrainParser(**parser_options)
+    for _ in parser.parse(entries, message_key=message_key, time_key=time_key):
+        pass
+    return parser.records(limit)
@@ -0,0 +1,299 @@
+"""进程内时序指标存储与异常检测
+
+每条时间序列占二维数组中的一行，时间戳与取值分别存放在 ``(序列数, capacity)`` 的
+NumPy 环形缓冲区里，写入只改一个槽位；超过 ``max_age_minutes`` 的点在查询和打分时被忽略。
+
+打分对所有序列一次性向量化计算：取每条序列的最新点，与窗口内的历史点比较，
+支持三种基线：
+
+- ``zscore``: (最新值 - 均值) / 标准差
+- ``ewma``: 按时间差指数衰减加权的均值与方差，越新的点权重越大，对趋势变化更敏感
+- ``mad``: (最新值 - 中位数) / (1.4826 * MAD)，对历史中的离群点稳健
+
+zscore 与 ewma 的统计量在写入时增量维护（窗口内点的和/平方和、指数加权均值/方差），
+打分只是 O(序列数) 的向量运算；过期点在打分前从窗口尾部批量剔除。ewma 的旧点
+权重已按半衰期衰减，不再单独剔除。mad 需要对窗口排序，为 O(序列数 x capacity)。
+
+Monitor 只把超过阈值的序列摘要写入 ``SREState.metrics_data``，状态保持很小。
+"""
+
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+
+METHODS = ("zscore", "ewma", "mad")
+
+# MAD 换算为正态分布标准差的系数
+_MAD_SCALE = 1.4826
+_EPSILON = 1e-12
+
+
+class MetricStore:
+    """按序列分行的环形缓冲区
+
+    同一序列的点须按时间顺序写入。
+
+    Args:
+        capacity: 每条序列最多保留的点数
+        max_age_minutes: 超过该时长的点不参与查询和打分 (与 ``MonitorState.max_age_minutes`` 对应)
+        halflife_seconds: ewma 的半衰期，历史点权重按时间差指数衰减
+        initial_series: 预分配的序列行数，不足时按倍数扩容
+    """
+
+    def __init__(
+        self,
+        capacity: int = 360,
+        max_age_minutes: float = 60,
+        halflife_seconds: float = 300.0,
+        initial_series: int = 1024,
+    ) -> None:
+        if capacity < 2:
+            raise ValueError("capacity 至少为 2")
+        self.capacity = capacity
+        self.max_age_seconds = max_age_minutes * 60
+        self.halflife_seconds = halflife_seconds
+        self.names: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._writes = 0
+        # 以下数组每条序列一行，由 _allocate 扩容
+        self._timestamps: np.ndarray = np.empty((0, capacity))
+        self._values: np.ndarray = np.empty((0, capacity))
+        self._heads: np.ndarray = np.empty(0, dtype=np.int64)
+        self._counts: np.ndarray = np.empty(0, dtype=np.int64)
+        # 窗口内 (未过期且未被覆盖) 的点数，及其以 _ref 为中心的和、平方和
+        self._live: np.ndarray = np.empty(0, dtype=np.int64)
+        self._ref: np.ndarray = np.empty(0)
+        self._sum: np.ndarray = np.empty(0)
+        self._sumsq: np.ndarray = np.empty(0)
+        # 不含最新点的指数加权均值/方差，及最后并入点的时间
+        self._ewm_mean: np.ndarray = np.empty(0)
+        self._ewm_var: np.ndarray = np.empty(0)
+        self._ewm_ts: np.ndarray = np.empty(0)
+        self._allocate(max(initial_series, 1))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, name: str, value: float, timestamp: float | None = None) -> None:
+        """写入单个点"""
+        self._write(np.array([self._row(name)]), np.array([value], dtype=np.float64), timestamp)
+
+    def record(self, samples: Mapping[str, float], timestamp: float | None = None) -> None:
+        """写入一次采集的多条序列 (同一时间戳)"""
+        if not samples:
+            return
+        rows = np.fromiter(
+            (self._row(name) for name in samples), dtype=np.int64, count=len(samples)
+        )
+        values = np.fromiter(samples.values(), dtype=np.float64, count=len(samples))
+        self._write(rows, values, timestamp)
+
+    def window(self, name: str, now: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """返回一条序列在窗口内的 (时间戳, 取值)，按时间升序"""
+        row = self._rows.get(name)
+        if row is None:
+            return np.empty(0), np.empty(0)
+        count = int(self._counts[row])
+        order = (self._heads[row] - count + np.arange(count)) % self.capacity
+        timestamps, values = self._timestamps[row, order], self._values[row, order]
+        fresh = timestamps >= self._cutoff(now)
+        return timestamps[fresh], values[fresh]
+
+    def score(
+        self, method: str = "zscore", now: float | None = None, min_points: int = 5
+    ) -> dict[str, np.ndarray]:
+        """对所有序列的最新点打分
+
+        Returns:
+            与 ``names`` 对齐的数组：score (历史点不足 min_points 或最新点已过期时为 NaN)、
+            value (最新值)、baseline (基线)、spread (离散度)、points (窗口内历史点数)、timestamp
+        """
+        if method not in METHODS:
+            raise ValueError(f"未知的打分方法: {method}")
+        n = len(self.names)
+        cutoff = self._cutoff(now)
+        self._expire(cutoff)
+        rows = np.arange(n)
+        latest_pos = (self._heads[:n] - 1) % self.capacity
+        latest = self._values[rows, latest_pos]
+        latest_ts = self._timestamps[rows, latest_pos]
+        points = np.maximum(self._live[:n] - 1, 0)
+
+        with np.errstate(all="ignore"):
+            if method == "zscore":
+                # 窗口和/平方和以 _ref 为中心，减去最新点即为历史
+                centered = latest - self._ref[:n]
+                mean = (self._sum[:n] - centered) / points
+                var = (self._sumsq[:n] - centered * centered) / points - mean * mean
+                baseline = self._ref[:n] + mean
+                spread = np.sqrt(np.maximum(var, 0))
+            elif method == "ewma":
+                baseline = self._ewm_mean[:n].copy()
+                spread = np.sqrt(self._ewm_var[:n])
+            else:
+                history = self._timestamps[:n] >= cutoff
+                history[rows, latest_pos] = False
+                baseline = _masked_median(self._values[:n], history, points)
+                deviations = np.abs(self._values[:n] - baseline[:, None])
+                spread = _MAD_SCALE * _masked_median(deviations, history, points)
+
+            deviation = latest - baseline
+            scores = np.where(
+                np.abs(deviation) <= _EPSILON, 0.0, deviation / np.maximum(spread, _EPSILON)
+            )
+        valid = (points >= min_points) & (latest_ts >= cutoff)
+        return {
+            "score": np.where(valid, scores, np.nan),
+            "value": latest,
+            "baseline": baseline,
+            "spread": spread,
+            "points": points,
+            "timestamp": latest_ts,
+        }
+
+    def anomalies(
+        self,
+        threshold: float = 3.0,
+        method: str = "zscore",
+        now: float | None = None,
+        min_points: int = 5,
+        limit: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """|score| 超过阈值的序列摘要，按 |score| 降序，可直接放入 ``metrics_data``"""
+        result = self.score(method, now=now, min_points=min_points)
+        scores = result["score"]
+        with np.errstate(invalid="ignore"):
+            hits = np.flatnonzero(np.abs(scores) >= threshold)
+        hits = hits[np.argsort(-np.abs(scores[hits]), kind="stable")][:limit]
+        return {
+            self.names[i]: {
+                "value": float(result["value"][i]),
+                "score": round(float(scores[i]), 2),
+                "method": method,
+                "baseline": float(result["baseline"][i]),
+                "spread": float(result["spread"][i]),
+                "points": int(result["points"][i]),
+                "timestamp": float(result["timestamp"][i]),
+            }
+            for i in hits
+        }
+
+    def _write(self, rows: np.ndarray, values: np.ndarray, timestamp: float | None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        heads = self._heads[rows]
+        counts = self._counts[rows]
+
+        # 上一个最新点并入指数加权统计，使 ewma 基线始终不含最新点
+        seen = counts > 0
+        if seen.any():
+            self._fold_ewm(rows[seen], heads[seen])
+
+        # 首次写入的序列以首个值为中心，减小平方和的抵消误差
+        self._ref[rows[~seen]] = values[~seen]
+
+        # 窗口已满时最旧的点即将被覆盖，先从和/平方和中减去
+        full = self._live[rows] == self.capacity
+        if full.any():
+            evicted_rows = rows[full]
+            evicted = self._values[evicted_rows, heads[full]] - self._ref[evicted_rows]
+            self._sum[evicted_rows] -= evicted
+            self._sumsq[evicted_rows] -= evicted * evicted
+            self._live[evicted_rows] -= 1
+
+        self._timestamps[rows, heads] = timestamp
+        self._values[rows, heads] = values
+        self._heads[rows] = (heads + 1) % self.capacity
+        self._counts[rows] = np.minimum(counts + 1, self.capacity)
+        centered = values - self._ref[rows]
+        self._sum[rows] += centered
+        self._sumsq[rows] += centered * centered
+        self._live[rows] += 1
+
+        # 增量和会累积舍入误差，平均每条序列写满一轮缓冲区后按原始数据重算
+        self._writes += len(rows)
+        if self._writes >= len(self.names) * self.capacity:
+            self._resync()
+
+    def _fold_ewm(self, rows: np.ndarray, heads: np.ndarray) -> None:
+        previous = (heads - 1) % self.capacity
+        x = self._values[rows, previous]
+        t = self._timestamps[rows, previous]
+        last = self._ewm_ts[rows]
+        started = last > -np.inf
+        with np.errstate(invalid="ignore"):
+            alpha = np.where(started, 1 - np.exp2(-(t - last) / self.halflife_seconds), 1.0)
+        diff = x - self._ewm_mean[rows]
+        self._ewm_mean[rows] += alpha * diff
+        self._ewm_var[rows] = np.where(
+            started, (1 - alpha) * (self._ewm_var[rows] + alpha * diff * diff), 0.0
+        )
+        self._ewm_ts[rows] = t
+
+    def _expire(self, cutoff: float) -> None:
+        """从窗口尾部剔除早于 cutoff 的点；点按时间顺序写入，每轮只需检查上一轮有剔除的序列"""
+        rows = np.arange(len(self.names))
+        while len(rows):
+            tails = (self._heads[rows] - self._live[rows]) % self.capacity
+            expired = (self._live[rows] > 0) & (self._timestamps[rows, tails] < cutoff)
+            rows, tails = rows[expired], tails[expired]
+            values = self._values[rows, tails] - self._ref[rows]
+            self._sum[rows] -= values
+            self._sumsq[rows] -= values * values
+            self._live[rows] -= 1
+
+    def _resync(self) -> None:
+        n = len(self.names)
+        rank = (self._heads[:n, None] - 1 - np.arange(self.capacity)) % self.capacity
+        live = rank < self._live[:n, None]
+        centered = np.where(live, self._values[:n] - self._ref[:n, None], 0.0)
+        self._sum[:n] = centered.sum(axis=1)
+        self._sumsq[:n] = (centered * centered).sum(axis=1)
+        self._writes = 0
+
+    def _cutoff(self, now: float | None) -> float:
+        if self.max_age_seconds <= 0:
+            return -np.inf
+        return (time.time() if now is None else now) - self.max_age_seconds
+
+    def _row(self, name: str) -> int:
+        row = self._rows.get(name)
+        if row is not None:
+            return row
+        row = len(self.names)
+        if row >= len(self._heads):
+            self._allocate(len(self._heads) * 2)
+        self._rows[name] = row
+        self.names.append(name)
+        return row
+
+    def _allocate(self, rows: int) -> None:
+        """分配 (或扩容到) rows 行，保留已有数据"""
+        used = len(self.names)
+
+        def grow(old: np.ndarray, fill: float) -> np.ndarray:
+            array = np.full((rows, *old.shape[1:]), fill, dtype=old.dtype)
+            array[:used] = old[:used]
+            return array
+
+        self._timestamps = grow(self._timestamps, -np.inf)
+        self._values = grow(self._values, 0.0)
+        self._heads = grow(self._heads, 0)
+        self._counts = grow(self._counts, 0)
+        self._live = grow(self._live, 0)
+        self._ref = grow(self._ref, 0.0)
+        self._sum = grow(self._sum, 0.0)
+        self._sumsq = grow(self._sumsq, 0.0)
+        self._ewm_mean = grow(self._ewm_mean, 0.0)
+        self._ewm_var = grow(self._ewm_var, 0.0)
+        self._ewm_ts = grow(self._ewm_ts, -np.inf)
+
+
+def _masked_median(values: np.ndarray, mask: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """按行求 mask 内元素的中位数：无效元素置为 +inf 排到末尾，再按有效个数取中间位置"""
+    ordered = np.sort(np.where(mask, values, np.inf), axis=1)
+    last = np.maximum(points - 1, 0)
+    low = np.take_along_axis(ordered, (last // 2)[:, None], axis=1)[:, 0]
+    high = np.take_along_axis(ordered, ((last + 1) // 2)[:, None], axis=1)[:, 0]
+    return np.where(points > 0, (low + high) / 2, np.nan)
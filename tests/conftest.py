@@ -21,3 +21,13 @@ def mock_knowledge_service():
             return_value=[{"content": "测试内容", "source": "https://example.com", "score": 0.9}]
         )
         yield mock
+
+
+@pytest.fixture(autouse=True)
+def clear_answer_cache():
+    """每个用例前后清空回答缓存，避免用例间相互命中"""
+    from src.app.services.answer_cache import answer_cache
+
+    answer_cache.clear()
+    yield
+    answer_cache.clear()
@@ -0,0 +1,184 @@
+"""测试告警指纹与风暴关联"""
+
+from src.sre.agents.shared.correlation import AlertCorrelator, fingerprint, normalize_resource
+from src.sre.agents.shared.state import Severity
+
+T0 = 1_700_000_000.0
+
+
+def make_alert(pod: str = "checkout-7d9f8b6c5d-x2k4p", timestamp: float = T0, **overrides) -> dict:
+    alert = {
+        "source": "prometheus",
+        "severity": Severity.HIGH,
+        "title": "HighErrorRate",
+        "description": "5xx 比例 12%",
+        "resource": pod,
+        "labels": {
+            "alertname": "HighErrorRate",
+            "namespace": "shop",
+            "service": "checkout",
+            "pod": pod,
+        },
+        "timestamp": timestamp,
+    }
+    alert.update(overrides)
+    return alert
+
+
+class TestFingerprint:
+    """测试指纹规范化"""
+
+    def test_pod_suffix_and_volatile_labels_are_ignored(self):
+        """测试同一 Deployment 不同 Pod 的告警指纹相同"""
+        a = make_alert("checkout-7d9f8b6c5d-x2k4p")
+        b = make_alert("checkout-7d9f8b6c5d-q9z7m")
+        b["labels"] = {k.upper(): v for k, v in b["labels"].items()}
+
+        assert normalize_resource("checkout-7d9f8b6c5d-x2k4p") == "checkout"
+        assert normalize_resource("kafka-2") == "kafka"
+        assert fingerprint(a) == fingerprint(b)
+
+    def test_different_alertname_changes_fingerprint(self):
+        """测试告警名不同则指纹不同"""
+        a = make_alert()
+        b = make_alert(labels={**a["labels"], "alertname": "HighLatency"})
+
+        assert fingerprint(a) != fingerprint(b)
+
+
+class TestAlertCorrelator:
+    """测试关联引擎"""
+
+    def test_first_alert_creates_incident(self):
+        """测试首条告警新建事件并携带原始告警"""
+        correlator = AlertCorrelator()
+        result = correlator.ingest(make_alert())
+
+        assert result.is_new
+        assert result.state["incident_id"] == result.incident_id
+        assert result.state["severity"] == Severity.HIGH
+        assert len(result.state["correlated_alerts"]) == 1
+        assert result.state["resource_info"]["resource"] == "checkout-7d9f8b6c5d-x2k4p"
+
+    def test_duplicates_attach_to_open_incident(self):
+        """测试窗口内重复告警挂到已有事件，不新建"""
+        correlator = AlertCorrelator(window_seconds=300)
+        first = correlator.ingest(make_alert())
+        second = correlator.ingest(make_alert("checkout-7d9f8b6c5d-q9z7m", timestamp=T0 + 10))
+
+        assert not second.is_new
+        assert second.duplicate
+        assert second.incident_id == first.incident_id
+        assert second.state is None
+        assert len(second.update["correlated_alerts"]) == 1
+        assert correlator.stats["incidents"] == 1
+        assert correlator.groups[first.incident_id].alert_count == 2
+
+    def test_related_alert_correlates_and_escalates(self):
+        """测试同一服务的不同告警关联到同一事件，更高级别触发升级"""
+        correlator = AlertCorrelator()
+        first = correlator.ingest(make_alert())
+        alert = make_alert(timestamp=T0 + 5, severity=Severity.CRITICAL, title="PodCrashLooping")
+        alert["labels"] = {**alert["labels"], "alertname": "PodCrashLooping"}
+        related = correlator.ingest(alert)
+
+        assert related.incident_id == first.incident_id
+        assert not related.duplicate
+        assert related.escalated
+        assert related.update["severity"] == Severity.CRITICAL
+
+    def test_other_service_opens_new_incident(self):
+        """测试不同服务的告警新建事件"""
+        correlator = AlertCorrelator()
+        first = correlator.ingest(make_alert())
+        alert = make_alert("payment-5f6d7c8b9a-abcde")
+        alert["labels"] = {**alert["labels"], "service": "payment", "pod": alert["resource"]}
+        other = correlator.ingest(alert)
+
+        assert other.is_new
+        assert other.incident_id != first.incident_id
+
+    def test_window_expiry_and_resolve(self):
+        """测试超出窗口或手动关闭后开新事件"""
+        correlator = AlertCorrelator(window_seconds=60)
+        first = correlator.ingest(make_alert())
+        later = correlator.ingest(make_alert(timestamp=T0 + 61))
+
+        assert later.is_new and later.incident_id != first.incident_id
+        assert correlator.stats["expired"] == 1
+
+        correlator.resolve(later.incident_id)
+        again = correlator.ingest(make_alert(timestamp=T0 + 62))
+        assert again.is_new
+
+    def test_activity_keeps_incident_open(self):
+        """测试持续收到告警的事件不会过期"""
+        correlator = AlertCorrelator(window_seconds=60)
+        first = correlator.ingest(make_alert())
+        for step in range(1, 5):
+            result = correlator.ingest(make_alert(timestamp=T0 + step * 50))
+            assert result.incident_id == first.incident_id
+
+    def test_partial_labels_do_not_merge_unrelated_alerts(self):
+        """测试只有 cluster 相同、资源不同的告警不合并，同一资源仍关联"""
+        correlator = AlertCorrelator()
+        disk = correlator.ingest(
+            make_alert(
+                "node-1", title="DiskFull", labels={"alertname": "DiskFull", "cluster": "prod"}
+            )
+        )
+        queue = correlator.ingest(
+            make_alert(
+                "kafka-0",
+                title="QueueBacklog",
+                labels={"alertname": "QueueBacklog", "cluster": "prod"},
+            )
+        )
+        broker = correlator.ingest(
+            make_alert(
+                "kafka-1", title="BrokerDown", labels={"alertname": "BrokerDown", "cluster": "prod"}
+            )
+        )
+
+        assert queue.is_new and queue.incident_id != disk.incident_id
+        assert broker.incident_id == queue.incident_id
+
+    def test_lifetime_cap_closes_busy_incident(self):
+        """测试持续告警的事件超过最长存活时间后关闭，之后开新事件"""
+        correlator = AlertCorrelator(window_seconds=60, max_lifetime_seconds=120)
+        first = correlator.ingest(make_alert())
+        for step in range(1, 3):
+            assert (
+                correlator.ingest(make_alert(timestamp=T0 + step * 50)).incident_id
+                == first.incident_id
+            )
+
+        later = correlator.ingest(make_alert(timestamp=T0 + 150))
+
+        assert later.is_new and later.incident_id != first.incident_id
+        assert first.incident_id not in correlator.groups
+        assert correlator.stats["expired"] == 1
+
+    def test_late_alert_does_not_block_expiry(self):
+        """测试迟到的告警不会让已过期事件躲过淘汰"""
+        correlator = AlertCorrelator(window_seconds=200)
+        old = correlator.ingest(make_alert())
+        recent = make_alert("payment-0", timestamp=T0 + 100)
+        recent["labels"] = {**recent["labels"], "service": "payment"}
+        newer = correlator.ingest(recent)
+        late = correlator.ingest(make_alert(timestamp=T0 - 5))
+
+        assert late.incident_id == old.incident_id
+        assert correlator.expire(T0 + 250) == 1
+        assert old.incident_id not in correlator.groups
+        assert newer.incident_id in correlator.groups
+
+    def test_unknown_severity_falls_back_to_medium(self):
+        """测试 warning、大小写与空白等非标准级别不会中断告警处理"""
+        correlator = AlertCorrelator()
+        first = correlator.ingest(make_alert(severity="warning"))
+        second = correlator.ingest(make_alert(timestamp=T0 + 1, severity="Critical "))
+
+        assert first.state["severity"] == Severity.MEDIUM
+        assert second.escalated
+        assert second.update["severity"] == Severity.CRITICAL
@@ -0,0 +1,217 @@
+"""测试操作计划的并发执行"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.sre.agents.shared.executor import ActionExecutor, plan_order
+from src.sre.agents.shared.state import ActionType, Severity
+from src.sre.agents.shared.state_utils import add_action_to_plan, create_initial_state
+
+
+def make_action(
+    action_id: str, tool: str = "sleep", depends_on: list[str] | None = None, **overrides
+) -> dict:
+    action = {
+        "id": action_id,
+        "type": ActionType.QUERY,
+        "tool_name": tool,
+        "parameters": {"id": action_id, "delay": 0.05},
+        "description": "",
+        "requires_approval": False,
+        "estimated_impact": "none",
+        "created_at": None,
+        "depends_on": depends_on or [],
+    }
+    action.update(overrides)
+    return action
+
+
+class Recorder:
+    """记录调用顺序与并发峰值的假工具"""
+
+    def __init__(self):
+        self.started: list[str] = []
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, parameters: dict) -> str:
+        self.started.append(parameters["id"])
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(parameters.get("delay", 0))
+        finally:
+            self.active -= 1
+        if parameters.get("fail"):
+            raise RuntimeError("boom")
+        return f"ok {parameters['id']}"
+
+
+class TestPlanOrder:
+    """测试依赖校验"""
+
+    def test_layers(self):
+        """测试按层分组"""
+        plan = [make_action("a"), make_action("b"), make_action("c", depends_on=["a", "b"])]
+
+        assert plan_order(plan) == [["a", "b"], ["c"]]
+        assert plan_order(plan[2:], completed=["a", "b"]) == [["c"]]
+
+    @pytest.mark.parametrize(
+        "plan",
+        [
+            [make_action("a", depends_on=["b"]), make_action("b", depends_on=["a"])],
+            [make_action("a", depends_on=["missing"])],
+            [make_action("a"), make_action("a")],
+        ],
+    )
+    def test_invalid_plan_raises(self, plan):
+        """测试环、缺失依赖、重复 ID"""
+        with pytest.raises(ValueError):
+            plan_order(plan)
+
+
+class TestActionExecutor:
+    """测试并发执行"""
+
+    async def test_independent_actions_run_concurrently(self):
+        """测试互不依赖的操作并发执行，总耗时接近关键路径"""
+        tool = Recorder()
+        executor = ActionExecutor({"sleep": tool})
+        plan = [make_action(str(i)) for i in range(4)] + [
+            make_action("final", depends_on=["0", "1", "2", "3"])
+        ]
+
+        start = time.perf_counter()
+        results = [r async for r in executor.stream(plan)]
+        elapsed = time.perf_counter() - start
+
+        assert [r["status"] for r in results] == ["success"] * 5
+        assert results[-1]["action_id"] == "final"
+        assert results[-1]["output"] == "ok final"
+        assert tool.peak == 4
+        assert elapsed < 0.2
+
+    async def test_per_tool_concurrency_limit(self):
+        """测试按工具限制并发"""
+        tool = Recorder()
+        executor = ActionExecutor({"sleep": tool}, concurrency={"sleep": 2})
+        results = [r async for r in executor.stream([make_action(str(i)) for i in range(6)])]
+
+        assert len(results) == 6
+        assert tool.peak == 2
+
+    async def test_timeout_and_failure_cancel_dependents(self):
+        """测试超时/异常记为 failed，依赖它的操作记为 cancelled"""
+        tool = Recorder()
+        executor = ActionExecutor({"sleep": tool}, timeouts={"sleep": 0.1})
+        plan = [
+            make_action("slow", parameters={"id": "slow", "delay": 1}),
+            make_action("bad", parameters={"id": "bad", "fail": True}),
+            make_action("after_slow", depends_on=["slow"]),
+            make_action("after_bad", depends_on=["bad"]),
+            make_action("chained", depends_on=["after_bad"]),
+        ]
+        results = {r["action_id"]: r async for r in executor.stream(plan)}
+
+        assert results["slow"]["status"] == "failed"
+        assert "超时" in results["slow"]["error"]
+        assert results["bad"]["error"] == "RuntimeError: boom"
+        assert {results[a]["status"] for a in ("after_slow", "after_bad", "chained")} == {
+            "cancelled"
+        }
+        assert "after_bad" not in tool.started
+
+    async def test_remediation_is_gated(self):
+        """测试修复类操作等待审批，依赖它的操作不执行；批准后可继续"""
+        tool = Recorder()
+        executor = ActionExecutor({"sleep": tool})
+        state = create_initial_state(alert_source="test", severity=Severity.HIGH, title="Test")
+        plan = [
+            make_action("query"),
+            make_action("restart", type=ActionType.REMEDIATION, depends_on=["query"]),
+            make_action("verify", depends_on=["restart"]),
+        ]
+        state["action_plan"] = plan
+
+        update = await executor.execute(state)
+
+        assert [r["action_id"] for r in update["executed_actions"]] == ["query"]
+        assert [a["id"] for a in update["pending_approval"]] == ["restart"]
+
+        state["executed_actions"] = update["executed_actions"]
+        update = await executor.execute(state, approved={"restart"})
+
+        assert [r["action_id"] for r in update["executed_actions"]] == ["restart", "verify"]
+        assert update["pending_approval"] == []
+
+    async def test_requires_approval_flag_is_gated(self):
+        """测试标记 requires_approval 的查询类操作同样等待审批"""
+        tool = Recorder()
+        executor = ActionExecutor({"sleep": tool})
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["action_plan"] = [make_action("export", requires_approval=True)]
+
+        update = await executor.execute(state)
+
+        assert update["executed_actions"] == []
+        assert [a["id"] for a in update["pending_approval"]] == ["export"]
+        assert tool.started == []
+
+    async def test_stream_updates_reports_progress(self):
+        """测试每完成一个操作产出增量，running_actions 与 pending_approval 随进度更新"""
+        gates = {action_id: asyncio.Event() for action_id in ("a", "b", "c")}
+
+        async def gated_tool(parameters: dict) -> str:
+            await gates[parameters["id"]].wait()
+            return parameters["id"]
+
+        executor = ActionExecutor({"sleep": gated_tool})
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["action_plan"] = [
+            make_action("a"),
+            make_action("b"),
+            make_action("c", depends_on=["a"]),
+            make_action("fix", type=ActionType.REMEDIATION),
+        ]
+        updates = executor.stream_updates(state)
+
+        gates["a"].set()
+        first = await anext(updates)
+        assert [r["action_id"] for r in first["executed_actions"]] == ["a"]
+        assert first["running_actions"] == ["b", "c"]
+        assert [a["id"] for a in first["pending_approval"]] == ["fix"]
+
+        gates["c"].set()
+        second = await anext(updates)
+        assert [r["action_id"] for r in second["executed_actions"]] == ["c"]
+        assert second["running_actions"] == ["b"]
+
+        gates["b"].set()
+        rest = [update async for update in updates]
+        assert [[r["action_id"] for r in u["executed_actions"]] for u in rest] == [["b"], []]
+        assert rest[-1]["running_actions"] == []
+
+    async def test_execute_cancels_actions_depending_on_earlier_failures(self):
+        """测试再次执行时，依赖之前失败操作的操作直接取消"""
+        executor = ActionExecutor({"sleep": Recorder()})
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["action_plan"] = [make_action("a"), make_action("b", depends_on=["a"])]
+        state["executed_actions"] = [{"action_id": "a", "status": "failed"}]
+
+        update = await executor.execute(state)
+
+        assert [(r["action_id"], r["status"]) for r in update["executed_actions"]] == [
+            ("b", "cancelled")
+        ]
+
+    async def test_unknown_tool_fails(self):
+        """测试未注册的工具记为 failed"""
+        executor = ActionExecutor({})
+        update = add_action_to_plan(make_action("x"))
+        results = [r async for r in executor.stream(update["action_plan"])]
+
+        assert results[0]["status"] == "failed"
+        assert "未知工具" in results[0]["error"]
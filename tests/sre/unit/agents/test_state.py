@@ -1,21 +1,20 @@
 """测试 SREState 定义和工具函数"""
 
-import pytest
 from datetime import datetime
 
 from src.sre.agents.shared.state import (
-    SREState,
-    IncidentStatus,
-    Severity,
-    ActionType,
     ActionItem,
     ActionResult,
+    ActionType,
+    IncidentStatus,
+    Severity,
+    SREState,
 )
 from src.sre.agents.shared.state_utils import (
-    create_initial_state,
-    update_status,
     add_action_to_plan,
+    create_initial_state,
     record_action_result,
+    update_status,
 )
 
 
@@ -46,7 +45,7 @@ class TestSREState:
             title="Test",
         )
         
-        new_state = update_status(state, IncidentStatus.DIAGNOSING, "开始诊断")
+        new_state = update_status(state, IncidentStatus.DIAGNOSING)
         
         assert new_state["status"] == IncidentStatus.DIAGNOSING
         assert new_state["previous_status"] == IncidentStatus.MONITORING
@@ -54,12 +53,6 @@ class TestSREState:
     
     def test_add_action_to_plan(self):
         """测试添加操作"""
-        state = create_initial_state(
-            alert_source="test",
-            severity=Severity.LOW,
-            title="Test",
-        )
-        
         action: ActionItem = {
             "id": "act-001",
             "type": ActionType.QUERY,
@@ -71,7 +64,50 @@ class TestSREState:
             "created_at": datetime.now(),
         }
         
-        new_state = add_action_to_plan(state, action)
+        new_state = add_action_to_plan(action)
         
         assert len(new_state["action_plan"]) == 1
         assert new_state["action_plan"][0]["id"] == "act-001"
+
+    def test_updates_are_partial(self):
+        """测试更新函数只返回变化的字段"""
+        state = create_initial_state(
+            alert_source="test",
+            severity=Severity.LOW,
+            title="Test",
+        )
+        result: ActionResult = {
+            "action_id": "act-001",
+            "status": "success",
+            "output": "ok",
+            "error": None,
+            "executed_at": datetime.now(),
+            "executed_by": "agent",
+        }
+
+        assert set(update_status(state, IncidentStatus.DIAGNOSING)) == {"previous_status", "status", "updated_at"}
+        assert record_action_result(result)["executed_actions"] == [result]
+
+    def test_graph_merges_partial_updates(self):
+        """测试 LangGraph 通过 reducer 追加列表字段，其余字段保持不变"""
+        from langgraph.graph import END, START, StateGraph
+
+        def plan(state: SREState) -> dict:
+            action = {"id": f"act-{len(state['action_plan'])}", "type": ActionType.QUERY}
+            return {**add_action_to_plan(action), **update_status(state, IncidentStatus.DIAGNOSING)}
+
+        graph = StateGraph(SREState)
+        graph.add_node("plan_1", plan)
+        graph.add_node("plan_2", plan)
+        graph.add_edge(START, "plan_1")
+        graph.add_edge("plan_1", "plan_2")
+        graph.add_edge("plan_2", END)
+
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["log_entries"] = [{"line": i} for i in range(100)]
+        final = graph.compile().invoke(state)
+
+        assert [a["id"] for a in final["action_plan"]] == ["act-0", "act-1"]
+        assert final["status"] == IncidentStatus.DIAGNOSING
+        assert final["previous_status"] == IncidentStatus.DIAGNOSING
+        assert len(final["log_entries"]) == 100
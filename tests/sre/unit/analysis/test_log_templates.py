@@ -0,0 +1,115 @@
+"""测试日志模板挖掘"""
+
+from datetime import datetime, timedelta
+
+from src.sre.agents.shared.state import Severity
+from src.sre.agents.shared.state_utils import compress_log_entries, create_initial_state
+from src.sre.analysis.log_templates import DrainParser, reduce_log_entries
+
+
+class TestDrainParser:
+    """测试 Drain 解析器"""
+
+    def test_masks_variables_and_merges_lines(self):
+        """测试变量掩码与相似行合并"""
+        parser = DrainParser()
+        first = parser.add("Connection to 10.0.3.17:5432 timed out after 3000 ms")
+        second = parser.add("Connection to 10.0.9.2:5432 timed out after 1500 ms")
+
+        assert first is second
+        assert first.template == "Connection to <IP> timed out after <NUM> ms"
+        assert first.count == 2
+
+    def test_generalizes_differing_tokens(self):
+        """测试不同位置泛化为通配符"""
+        parser = DrainParser()
+        parser.add("Started worker pool alpha")
+        template = parser.add("Started worker pool beta")
+
+        assert template.template == "Started worker pool <*>"
+        assert len(parser.templates) == 1
+
+    def test_keeps_distinct_messages_apart(self):
+        """测试不相似的日志归入不同模板"""
+        parser = DrainParser()
+        a = parser.add("Disk usage above threshold on /dev/sda1")
+        b = parser.add("Failed to pull image nginx latest from registry")
+
+        assert a is not b
+
+    def test_parse_stream_tracks_counts_timestamps_and_exemplars(self):
+        """测试流式处理记录次数、首末时间与样例"""
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        entries = [
+            {
+                "timestamp": start + timedelta(seconds=i),
+                "message": f"GET /api/users/{i} returned 500",
+            }
+            for i in range(10)
+        ]
+        parser = DrainParser(max_exemplars=2)
+        stream = parser.parse(entries)
+
+        template, entry = next(stream)
+        assert entry is entries[0]
+        assert template.count == 1
+
+        list(stream)
+        record = parser.records()[0]
+        assert record["count"] == 10
+        assert record["first_seen"] == start
+        assert record["last_seen"] == start + timedelta(seconds=9)
+        assert record["exemplars"] == [
+            "GET /api/users/0 returned 500",
+            "GET /api/users/1 returned 500",
+        ]
+
+    def test_reduce_log_entries_orders_by_count(self):
+        """测试压缩结果按次数降序并截断"""
+        lines = (
+            ["cache miss for key user:1"] * 3 + ["worker 3 crashed"] + ["shutdown requested"] * 2
+        )
+
+        records = reduce_log_entries(lines, limit=2)
+
+        assert [r["count"] for r in records] == [3, 2]
+
+    def test_compress_log_entries_returns_partial_update(self):
+        """测试 SREState 日志压缩"""
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["log_entries"] = [
+            {"message": f"request {i} failed with status 503"} for i in range(50)
+        ]
+
+        update = compress_log_entries(state)
+
+        assert set(update) == {"log_entries", "updated_at"}
+        assert len(update["log_entries"]) == 1
+        assert update["log_entries"][0]["count"] == 50
+
+    def test_compress_log_entries_is_idempotent(self):
+        """测试对压缩结果再次压缩不改变记录，新日志可继续合并进已有模板"""
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        state = create_initial_state(alert_source="test", severity=Severity.LOW, title="Test")
+        state["log_entries"] = [
+            {
+                "timestamp": start + timedelta(seconds=i),
+                "message": f"request {i} failed with status 503",
+            }
+            for i in range(5)
+        ] + [{"message": "worker pool alpha started"}] * 2
+
+        once = compress_log_entries(state)["log_entries"]
+        state["log_entries"] = once
+        twice = compress_log_entries(state)["log_entries"]
+
+        assert twice == once
+
+        state["log_entries"] = [
+            *once,
+            {"timestamp": start, "message": "request 99 failed with status 503"},
+        ]
+        merged = compress_log_entries(state)["log_entries"]
+
+        assert [r["count"] for r in merged] == [6, 2]
+        assert merged[0]["template"] == once[0]["template"]
@@ -0,0 +1,93 @@
+"""测试指标存储与异常打分"""
+
+import numpy as np
+import pytest
+
+from src.sre.agents.shared.state_utils import summarize_metrics
+from src.sre.analysis.metric_store import MetricStore
+
+T0 = 1_700_000_000.0
+
+
+def fill(
+    store: MetricStore, points: int, series: int = 3, step: float = 10.0, seed: int = 0
+) -> float:
+    rng = np.random.default_rng(seed)
+    for k in range(points):
+        store.record({f"s{i}": 100 + rng.normal(0, 1) for i in range(series)}, T0 + k * step)
+    return T0 + (points - 1) * step
+
+
+class TestMetricStore:
+    """测试环形缓冲区与打分"""
+
+    def test_ring_buffer_keeps_latest_points_in_order(self):
+        """测试环形缓冲区只保留最近 capacity 个点且按时间升序返回"""
+        store = MetricStore(capacity=4, max_age_minutes=0)
+        for k in range(6):
+            store.append("cpu", float(k), T0 + k)
+
+        timestamps, values = store.window("cpu")
+
+        assert values.tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert timestamps.tolist() == [T0 + 2, T0 + 3, T0 + 4, T0 + 5]
+
+    def test_points_older_than_max_age_are_ignored(self):
+        """测试超过 max_age_minutes 的点不参与打分"""
+        store = MetricStore(capacity=100, max_age_minutes=1)
+        now = fill(store, 30, step=10.0)
+
+        result = store.score(now=now)
+
+        # 60 秒窗口内含 7 个点，去掉最新点剩 6 个历史点
+        assert result["points"].tolist() == [6, 6, 6]
+        _, values = store.window("s0", now=now)
+        assert result["baseline"][0] == pytest.approx(values[:-1].mean())
+        assert result["spread"][0] == pytest.approx(values[:-1].std())
+
+    @pytest.mark.parametrize("method", ["zscore", "ewma", "mad"])
+    def test_detects_spike(self, method):
+        """测试三种方法都能发现突增且不误报平稳序列"""
+        store = MetricStore(capacity=60, max_age_minutes=30)
+        now = fill(store, 60, series=20)
+        store.record({"s3": 150.0}, now + 10)
+        for i in range(20):
+            if i != 3:
+                store.append(f"s{i}", 100.0, now + 10)
+
+        anomalies = store.anomalies(threshold=5, method=method, now=now + 10)
+
+        assert list(anomalies) == ["s3"]
+        assert anomalies["s3"]["value"] == 150.0
+        assert anomalies["s3"]["score"] > 5
+
+    def test_incremental_stats_match_full_recompute(self):
+        """测试增量维护的均值/标准差与按窗口重算一致 (含覆盖与过期)"""
+        store = MetricStore(capacity=16, max_age_minutes=2, initial_series=1)
+        now = fill(store, 50, series=5, step=7.0, seed=1)
+
+        result = store.score(now=now, min_points=1)
+
+        for i, name in enumerate(store.names):
+            _, values = store.window(name, now=now)
+            assert result["baseline"][i] == pytest.approx(values[:-1].mean())
+            assert result["spread"][i] == pytest.approx(values[:-1].std())
+
+    def test_insufficient_history_scores_nan(self):
+        """测试历史点不足时不打分"""
+        store = MetricStore()
+        store.append("new", 1.0, T0)
+        store.append("new", 1000.0, T0 + 1)
+
+        assert np.isnan(store.score(now=T0 + 1)["score"][0])
+        assert store.anomalies(now=T0 + 1) == {}
+
+    def test_summarize_metrics_puts_only_anomalies_into_state(self):
+        """测试只把异常序列写入 metrics_data"""
+        store = MetricStore(capacity=60, max_age_minutes=0)
+        now = fill(store, 30, series=50)
+        store.record({"s7": 500.0}, now + 10)
+
+        update = summarize_metrics(store)
+
+        assert list(update["metrics_data"]) == ["s7"]
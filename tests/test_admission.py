@@ -0,0 +1,111 @@
+"""准入控制与限流测试"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.core.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+async def test_queue_is_fifo_and_bounded():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_seconds=1)
+    first = await controller.acquire()
+
+    waiting = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+
+    first.release()
+    second = await waiting
+    assert controller.in_flight == 1
+    second.release()
+    second.release()
+    assert controller.in_flight == 0
+
+
+async def test_queue_timeout_rejects():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_seconds=0.02)
+    held = await controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+
+    assert rejected.value.reason == "timeout"
+    assert controller.queue_depth == 0
+    held.release()
+    assert controller.in_flight == 0
+
+
+async def test_cancelled_waiter_does_not_leak_slot():
+    controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_seconds=1)
+    held = await controller.acquire()
+    waiting = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    held.release()
+
+    assert controller.in_flight == 0
+    assert controller.queue_depth == 0
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket("test", rate=50, burst=2)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        assert await bucket.aacquire()
+    elapsed = time.perf_counter() - start
+
+    # 突发 2 个，其余 3 个按 50/s 补充
+    assert elapsed >= 0.05
+    assert await bucket.aacquire(blocking=False) is False
+    assert TokenBucket("off", rate=0).acquire() is True
+
+
+def test_chat_returns_503_with_retry_after_when_saturated():
+    from src.app.main import app
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout_seconds=1)
+    controller.in_flight = 1
+
+    with patch("src.app.api.routes.chat.admission_controller", controller):
+        client = TestClient(app)
+        response = client.post("/chat", json={"message": "准入测试"})
+        stream_response = client.post("/chat/stream", json={"message": "你好"})
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["reason"] == "queue_full"
+    assert stream_response.status_code == 503
+
+
+async def test_stream_releases_slot_when_body_never_consumed():
+    from src.app.api.routes import chat as chat_route
+    from src.app.api.schemas import ChatRequest
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout_seconds=1)
+    with patch.object(chat_route, "admission_controller", controller):
+        response = await chat_route.chat_stream(ChatRequest(message="你好"))
+    assert controller.in_flight == 1
+
+    async def receive() -> dict:
+        return {"type": "http.disconnect"}
+
+    async def stalled_send(_message: dict) -> None:
+        # 客户端在响应头发出前就断开，生成器始终不会开始执行
+        await asyncio.Event().wait()
+
+    await response({"type": "http"}, receive, stalled_send)
+
+    assert controller.in_flight == 0
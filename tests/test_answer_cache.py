@@ -0,0 +1,117 @@
+"""回答缓存测试"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.services.answer_cache import AnswerCache, normalize_message
+
+
+def test_normalize_message():
+    """归一化去除空白、大小写与结尾标点"""
+    assert normalize_message("  What is   LangGraph？ ") == "what is langgraph"
+
+
+def test_exact_hit():
+    """归一化后相同的问题精确命中"""
+    cache = AnswerCache(max_entries=4)
+    cache.set("什么是 LangGraph?", {"reply": "a"})
+
+    assert cache.get("什么是 langgraph") == {"reply": "a"}
+    assert cache.stats.exact_hits == 1
+
+
+def test_semantic_hit_and_miss():
+    """开启语义匹配后，近似重复问题语义命中，无关问题未命中"""
+    cache = AnswerCache(max_entries=4, similarity_threshold=0.8)
+    cache.set("2024年诺贝尔物理学奖是谁获得的", {"reply": "a"})
+
+    assert cache.get("2024年诺贝尔物理学奖是谁获得的呢") == {"reply": "a"}
+    assert cache.stats.semantic_hits == 1
+    assert cache.get("今天天气怎么样") is None
+    assert cache.stats.misses == 1
+
+
+NEAR_DUPLICATES = [
+    (
+        "请详细介绍一下分布式一致性算法 Raft 的选主流程和日志复制机制",
+        "请详细介绍一下分布式一致性算法 Paxos 的选主流程和日志复制机制",
+    ),
+    (
+        "线上 Kubernetes 集群中某个 Pod 的 CPU 使用率持续过高应该如何排查",
+        "线上 Kubernetes 集群中某个 Pod 的内存使用率持续过高应该如何排查",
+    ),
+    ("2024年诺贝尔物理学奖是谁获得的", "2023年诺贝尔物理学奖是谁获得的"),
+]
+
+
+@pytest.mark.parametrize(("cached", "asked"), NEAR_DUPLICATES)
+def test_default_does_not_match_different_questions(cached, asked):
+    """默认只做精确匹配：只差一个实体的不同问题不命中"""
+    cache = AnswerCache(max_entries=4)
+    cache.set(cached, {"reply": "a"})
+
+    assert cache.get(asked) is None
+    assert cache.stats.semantic_hits == 0
+
+
+def test_hashing_embedder_cannot_tell_near_duplicates_apart():
+    """字面向量下不同问题的相似度超过旧阈值 0.92，因此默认关闭语义匹配"""
+    cache = AnswerCache(max_entries=4, similarity_threshold=0.92)
+    cache.set(NEAR_DUPLICATES[0][0], {"reply": "raft"})
+
+    assert cache.get(NEAR_DUPLICATES[0][1]) == {"reply": "raft"}
+
+
+def test_ttl_expiration():
+    """过期条目不再命中"""
+    cache = AnswerCache(max_entries=4, ttl_seconds=10)
+    with patch("src.app.services.answer_cache.time.monotonic", return_value=0.0):
+        cache.set("你好", {"reply": "a"})
+    with patch("src.app.services.answer_cache.time.monotonic", return_value=11.0):
+        assert cache.get("你好") is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    """超出容量时淘汰最久未使用的条目"""
+    cache = AnswerCache(max_entries=2, similarity_threshold=1.0)
+    cache.set("问题一", {"reply": "1"})
+    cache.set("问题二", {"reply": "2"})
+    cache.get("问题一")
+    cache.set("问题三", {"reply": "3"})
+
+    assert cache.get("问题二") is None
+    assert cache.get("问题一") == {"reply": "1"}
+    assert cache.get("问题三") == {"reply": "3"}
+    assert cache.stats.evictions == 1
+
+
+def test_chat_endpoint_uses_cache():
+    """第二次相同请求直接命中缓存，bypass_cache 时重新调用 Agent"""
+    from src.app.main import app
+
+    with patch("src.app.api.routes.chat.agent") as mock_agent:
+        mock_agent.ainvoke = AsyncMock(
+            return_value={
+                "messages": [type("Msg", (), {"content": "测试回复"})()],
+                "knowledge_context": "",
+                "iteration": 1,
+            }
+        )
+        client = TestClient(app)
+
+        first = client.post("/chat", json={"message": "你好"}).json()
+        second = client.post("/chat", json={"message": "你好！"}).json()
+        client.post("/chat", json={"message": "你好", "bypass_cache": True})
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["reply"] == "测试回复"
+        assert mock_agent.ainvoke.await_count == 2
+
+        stats = client.get("/chat/cache/stats").json()
+        assert stats["answer"]["exact_hits"] == 1
+        assert stats["answer"]["bypassed"] == 1
@@ -65,3 +65,56 @@ class TestChatEndpoint:
             assert "reply" in data
             assert "used_knowledge" in data
             assert "iterations" in data
+
+
+class TestChatStreamEndpoint:
+    """流式聊天端点测试"""
+
+    def test_stream_forwards_writer_tokens(self):
+        """writer 的 token 以 delta 事件推送，其它节点 token 被过滤"""
+        import json
+
+        from langchain_core.messages import AIMessageChunk
+
+        from src.app.main import app
+
+        async def fake_astream(*_args, **kwargs):
+            assert kwargs["stream_mode"] == ["updates", "messages"]
+            yield "messages", (AIMessageChunk(content="YES"), {"langgraph_node": "searcher"})
+            yield "updates", {"searcher": {"need_knowledge": False, "knowledge_context": ""}}
+            yield "messages", (AIMessageChunk(content="你"), {"langgraph_node": "writer"})
+            yield "messages", (AIMessageChunk(content="好"), {"langgraph_node": "writer"})
+            yield "updates", {"writer": {"current_answer": "你好", "iteration": 1}}
+            yield "updates", {"finalize": {}}
+
+        with patch("src.app.api.routes.chat.agent") as mock_agent:
+            mock_agent.astream = fake_astream
+
+            client = TestClient(app)
+            response = client.post("/chat/stream", json={"message": "你好"})
+
+        events = [
+            json.loads(line.removeprefix("data: "))
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        steps = [e["step"] for e in events]
+        assert steps == ["searcher", "delta", "delta", "writer", "finalize", "done"]
+        assert "".join(e["content"] for e in events if e["step"] == "delta") == "你好"
+
+    def test_stream_without_tokens(self):
+        """关闭 stream_tokens 时只订阅 updates"""
+        from src.app.main import app
+
+        async def fake_astream(*_args, **kwargs):
+            assert kwargs["stream_mode"] == ["updates"]
+            yield "updates", {"finalize": {}}
+
+        with patch("src.app.api.routes.chat.agent") as mock_agent:
+            mock_agent.astream = fake_astream
+
+            client = TestClient(app)
+            response = client.post("/chat/stream", json={"message": "你好", "stream_tokens": False})
+
+        assert '"step": "delta"' not in response.text
+        assert '"step": "done"' in response.text
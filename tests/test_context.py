@@ -0,0 +1,103 @@
+"""检索上下文组装测试"""
+
+from src.app.agents.context import (
+    count_tokens,
+    fuse_results,
+    merge_passages,
+    rank_passages,
+    render_context,
+    trim_passages,
+)
+
+
+def test_count_tokens():
+    assert count_tokens("你好世界") == 4
+    assert count_tokens("hello, world") == 5
+
+
+def test_dedupe_by_url_and_content():
+    """同一 URL 或相同内容只保留一条，保留较高分数与较新轮次"""
+    passages = merge_passages(
+        [],
+        [
+            {"content": "A 内容", "source": "https://a.com", "score": 0.5},
+            {"content": "B 内容", "source": "https://b.com", "score": 0.6},
+        ],
+        round_=0,
+    )
+    passages = merge_passages(
+        passages,
+        [
+            {"content": "A 更新内容", "source": "https://a.com", "score": 0.9},
+            {"content": "B  内容", "source": "https://b-mirror.com", "score": 0.1},
+            {"content": "C 内容", "source": "Tavily AI Summary", "score": 1.0},
+        ],
+        round_=1,
+    )
+
+    assert len(passages) == 3
+    by_source = {p["source"]: p for p in passages}
+    assert by_source["https://a.com"]["content"] == "A 更新内容"
+    assert by_source["https://a.com"]["round"] == 1
+    assert by_source["https://b.com"]["score"] == 0.6
+
+
+def test_rank_prefers_score_then_recency():
+    passages = [
+        {"content": "旧", "source": "s1", "score": 0.8, "round": 0, "hash": "1"},
+        {"content": "新", "source": "s2", "score": 0.8, "round": 2, "hash": "2"},
+        {"content": "高分", "source": "s3", "score": 0.99, "round": 0, "hash": "3"},
+    ]
+    assert [p["content"] for p in rank_passages(passages)] == ["新", "高分", "旧"]
+
+
+def test_context_stays_within_budget_across_iterations():
+    """多轮检索后渲染的上下文不超过 token 预算"""
+    passages: list[dict] = []
+    for round_ in range(5):
+        results = [
+            {
+                "content": f"第{round_}轮第{i}条资料" * 20,
+                "source": f"https://x.com/{round_}/{i}",
+                "score": 0.5,
+            }
+            for i in range(5)
+        ]
+        passages = merge_passages(passages, results, round_)
+        context = render_context(passages, token_budget=500)
+        assert count_tokens(context) <= 500
+
+    assert len(passages) == 25
+    # 最新一轮排在最前
+    assert context.startswith("[来源: https://x.com/4/")
+
+
+def test_trim_passages_keeps_fresh_results_first():
+    """超出上限时优先保留本次检索结果，其余按排序补足"""
+    old = merge_passages(
+        [],
+        [{"content": f"旧资料{i}", "source": f"https://old/{i}", "score": 0.9} for i in range(4)],
+        round_=0,
+    )
+    fresh = [
+        {"content": f"新资料{i}", "source": f"https://new/{i}", "score": 0.2} for i in range(2)
+    ]
+    passages = merge_passages(old, fresh, round_=0)
+
+    trimmed = trim_passages(passages, 3, fresh=fresh)
+
+    assert len(trimmed) == 3
+    assert {"新资料0", "新资料1"} <= {p["content"] for p in trimmed}
+    assert trim_passages(passages, 10) is passages
+
+
+def test_fuse_results_rrf_dedupes_across_queries():
+    shared = {"content": "共同结果", "source": "https://a.com", "score": 0.2}
+    first = [shared, {"content": "只在第一路", "source": "https://b.com", "score": 0.9}]
+    second = [{"content": "共同结果 ", "source": "https://a.com", "score": 0.3}]
+
+    fused = fuse_results([first, second])
+
+    assert [r["content"] for r in fused] == ["共同结果", "只在第一路"]
+    assert fused[0]["score"] == 1.0
+    assert 0 < fused[1]["score"] < fused[0]["score"]
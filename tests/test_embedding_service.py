@@ -0,0 +1,59 @@
+"""批量向量化服务测试"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.app.services.embedding import HashingEmbedder
+from src.app.services.embedding_service import EmbeddingService
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self) -> None:
+        super().__init__(dim=32)
+        self.batches: list[int] = []
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(len(texts))
+        return super().embed(texts)
+
+
+async def test_concurrent_requests_are_micro_batched():
+    text_embedder = CountingEmbedder()
+    service = EmbeddingService(text_embedder, max_batch_size=8, max_wait_ms=20)
+
+    vectors = await asyncio.gather(*[service.embed(f"text {i}") for i in range(20)])
+
+    assert text_embedder.batches == [8, 8, 4]
+    np.testing.assert_allclose(vectors[3], text_embedder.embed_one("text 3"))
+    assert service.stats()["avg_batch_size"] > 1
+    service.close()
+
+
+async def test_results_memoized_and_coalesced():
+    text_embedder = CountingEmbedder()
+    service = EmbeddingService(text_embedder, max_batch_size=8, max_wait_ms=5)
+
+    await asyncio.gather(*[service.embed("same") for _ in range(5)])
+    again = await service.embed_many(["same", "other"])
+
+    assert sum(text_embedder.batches) == 2
+    assert again.shape == (2, 32)
+    stats = service.stats()
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+    service.close()
+
+
+async def test_embedding_error_propagates_and_is_not_cached():
+    class FailingEmbedder(HashingEmbedder):
+        def embed(self, _texts: list[str]) -> np.ndarray:
+            raise RuntimeError("boom")
+
+    service = EmbeddingService(FailingEmbedder(dim=8), max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await service.embed("x")
+    assert service.stats()["cache_size"] == 0
+    service.close()
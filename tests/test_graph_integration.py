@@ -13,7 +13,7 @@ async def test_full_graph_simple_flow(mock_llm):
     # 模拟三个阶段的 LLM 返回
     # 注意：mock_llm.ainvoke 会按顺序被调用
     mock_llm.ainvoke.side_effect = [
-        AIMessage(content="NO"),         # Searcher: need_knowledge
+        # Searcher: 问候语由本地路由直接判定为 NO，不调用 LLM
         AIMessage(content="你好！我是助手"), # Writer: current_answer
         AIMessage(content="SATISFIED")   # Reviewer: is_satisfied
     ]
@@ -24,3 +24,21 @@ async def test_full_graph_simple_flow(mock_llm):
     assert len(result["messages"]) > 1
     assert "助手" in result["messages"][-1].content
     assert result["iteration"] == 1
+
+
+@pytest.mark.asyncio
+async def test_graph_rewrites_without_search_when_reviewer_says_so(mock_llm):
+    """Reviewer 判定无需新知识时，Graph 跳过 Searcher 直接重写"""
+    # 若重新进入 Searcher，带反思的检索判定会多消耗一次 LLM 调用，回复顺序随之错位
+    mock_llm.ainvoke.side_effect = [
+        AIMessage(content="你好！"),  # Writer 第 1 轮
+        AIMessage(content='{"satisfied": false, "score": 4, "missing_info": "更热情一些", "needs_search": false}'),
+        AIMessage(content="你好呀！很高兴见到你，有什么可以帮你？"),  # Writer 第 2 轮
+        AIMessage(content='{"satisfied": true, "score": 9, "missing_info": "", "needs_search": false}'),
+    ]
+
+    result = await agent.ainvoke({"messages": [HumanMessage(content="你好")]})
+
+    assert result["iteration"] == 2
+    assert "很高兴" in result["messages"][-1].content
+    assert mock_llm.ainvoke.await_count == 4
@@ -1,8 +1,11 @@
 """华为云认证服务测试"""
 
+import asyncio
 import os
+import time
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 
 from src.app.services.huawei_auth import HuaweiAuthService
@@ -44,3 +47,90 @@ async def test_get_huawei_token_mock():
         token = await service.get_token()
 
         assert token == "mock_token_12345"
+
+
+def make_fake_iam(ttl_seconds: float = 24 * 3600, latency: float = 0.05):
+    """本地假 IAM 服务：每次签发新 Token 并记录请求次数"""
+    from datetime import UTC, datetime, timedelta
+
+    from fastapi import FastAPI, Response
+
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/v3/auth/tokens", status_code=201)
+    async def issue_token(response: Response) -> dict:
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        expires_at = datetime.now(UTC) + timedelta(seconds=ttl_seconds)
+        response.headers["X-Subject-Token"] = f"token-{app.state.requests}"
+        return {"token": {"expires_at": expires_at.isoformat().replace("+00:00", "Z")}}
+
+    return app
+
+
+def make_service(iam_app, refresh_margin_seconds: float = 60) -> HuaweiAuthService:
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=iam_app), base_url="http://iam.local"
+    )
+    service = HuaweiAuthService(client=client, refresh_margin_seconds=refresh_margin_seconds)
+    service.auth_url = "http://iam.local/v3/auth/tokens"
+    service.domain_name = "test_domain"
+    service.username = "test_user"
+    service.password = "test_pass"
+    return service
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_iam_request():
+    """N 个并发调用只触发一次 IAM 请求，之后的调用复用缓存"""
+    iam = make_fake_iam()
+    service = make_service(iam)
+
+    tokens = await asyncio.gather(*[service.get_token() for _ in range(20)])
+    again = await service.get_token()
+
+    assert set(tokens) == {"token-1"}
+    assert again == "token-1"
+    assert iam.state.requests == 1
+    assert service.expires_at > time.time() + 23 * 3600
+
+    await service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_refreshed_in_background_before_expiry():
+    """进入刷新窗口时后台刷新：定时器按 expires_at - margin 设置，触发后换成新 Token"""
+    iam = make_fake_iam(ttl_seconds=3600, latency=0)
+    service = make_service(iam, refresh_margin_seconds=3540)
+    real_sleep = asyncio.sleep
+    timers: list[tuple[float, asyncio.Future]] = []
+
+    async def fake_sleep(delay: float) -> None:
+        # 不真正等待：记录定时器，由测试决定何时触发
+        future = asyncio.get_running_loop().create_future()
+        timers.append((delay, future))
+        await future
+
+    with patch("src.app.services.huawei_auth.asyncio.sleep", fake_sleep):
+        assert await service.get_token() == "token-1"
+        await real_sleep(0)
+
+        # 到期前 3540 秒进入刷新窗口，即约 60 秒后
+        assert len(timers) == 1
+        assert 50 < timers[0][0] <= 60
+        assert iam.state.requests == 1
+
+        scheduled = service._scheduled_refresh
+        timers[0][1].set_result(None)
+        await scheduled
+        await service._refresh_task
+
+        assert iam.state.requests == 2
+        assert await service.get_token() == "token-2"
+        # 新 Token 重新设置了下一次刷新
+        await real_sleep(0)
+        assert len(timers) == 2
+
+        await service.aclose()
@@ -0,0 +1,93 @@
+"""知识检索服务测试"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from src.app.services.knowledge import KnowledgeService, normalize_query
+
+TAVILY_RESPONSE = {
+    "answer": "摘要",
+    "results": [{"content": "内容", "url": "https://example.com", "score": 0.8}],
+}
+
+
+def make_service(**kwargs) -> KnowledgeService:
+    service = KnowledgeService(**kwargs)
+    service.client = AsyncMock()
+    return service
+
+
+def test_normalize_query():
+    assert normalize_query("  LangGraph   Tutorial ") == "langgraph tutorial"
+
+
+async def test_search_result_cached():
+    """相同查询第二次命中缓存"""
+    service = make_service(cache_ttl_seconds=60, cache_max_entries=8)
+    service.client.search = AsyncMock(return_value=TAVILY_RESPONSE)
+
+    first = await service.search("LangGraph")
+    second = await service.search("  langgraph ")
+
+    assert first == second
+    assert len(first) == 2
+    service.client.search.assert_awaited_once()
+    assert service.cache_stats()["hits"] == 1
+
+
+async def test_cache_key_includes_params():
+    """max_results / search_depth 不同视为不同 key"""
+    service = make_service(cache_ttl_seconds=60, cache_max_entries=8)
+    service.client.search = AsyncMock(return_value=TAVILY_RESPONSE)
+
+    await service.search("q", max_results=5)
+    await service.search("q", max_results=3)
+    await service.search("q", max_results=5, search_depth="advanced")
+
+    assert service.client.search.await_count == 3
+
+
+async def test_concurrent_searches_coalesced():
+    """并发相同查询只触发一次上游调用"""
+    service = make_service(cache_ttl_seconds=60, cache_max_entries=8)
+
+    async def slow_search(**_kwargs):
+        await asyncio.sleep(0.05)
+        return TAVILY_RESPONSE
+
+    service.client.search = AsyncMock(side_effect=slow_search)
+
+    results = await asyncio.gather(*[service.search("LangGraph") for _ in range(10)])
+
+    assert all(r == results[0] for r in results)
+    service.client.search.assert_awaited_once()
+    stats = service.cache_stats()
+    assert stats["coalesced"] == 9
+    assert stats["upstream_calls"] == 1
+    assert stats["inflight"] == 0
+
+
+async def test_failures_not_cached():
+    """上游失败返回空结果且不缓存"""
+    service = make_service(cache_ttl_seconds=60, cache_max_entries=8)
+    service.client.search = AsyncMock(side_effect=[RuntimeError("boom"), TAVILY_RESPONSE])
+
+    assert await service.search("q") == []
+    assert len(await service.search("q")) == 2
+
+
+async def test_ttl_and_lru_bounds():
+    """过期后重新请求，超出容量按 LRU 淘汰"""
+    service = make_service(cache_ttl_seconds=10, cache_max_entries=2)
+    service.client.search = AsyncMock(return_value=TAVILY_RESPONSE)
+
+    with patch("src.app.services.knowledge.time.monotonic", return_value=0.0):
+        await service.search("a")
+        await service.search("b")
+        await service.search("c")
+    assert service.cache_stats()["size"] == 2
+    assert service.cache_stats()["evictions"] == 1
+
+    with patch("src.app.services.knowledge.time.monotonic", return_value=20.0):
+        await service.search("c")
+    assert service.client.search.await_count == 4
@@ -0,0 +1,207 @@
+"""LLM 网关测试"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from src.app.services.llm import DeadlineExceeded, LLMGateway, NodeLatency, request_deadline
+
+
+class ScriptedModel:
+    """按顺序执行脚本：数字为延迟秒数后返回，异常实例则直接抛出"""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+
+    async def ainvoke(self, _messages, **_kwargs):
+        step = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return AIMessage(content=f"reply {self.calls}")
+
+
+class FlakyStreamingModel(BaseChatModel):
+    """流式输出若干 token 后按脚本中断，非流式调用直接返回完整回复"""
+
+    failures: list[int] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "flaky-streaming"
+
+    def _generate(self, *_args, **_kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="a b c"))])
+
+    async def _astream(self, *_args, run_manager=None, **_kwargs):
+        fail_after = self.failures[self.calls] if self.calls < len(self.failures) else None
+        self.calls += 1
+        for i, token in enumerate(["a", " b", " c"]):
+            if i == fail_after:
+                raise TimeoutError("stream interrupted")
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+async def stream_writer(gateway: LLMGateway) -> tuple[list[str], Exception | None]:
+    """在 writer 节点中调用网关，收集推送给客户端的 token"""
+
+    async def writer(_state: MessagesState) -> dict:
+        return {"messages": [await gateway.ainvoke(MESSAGES)]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("writer", writer)
+    builder.add_edge(START, "writer")
+    builder.add_edge("writer", END)
+    tokens: list[str] = []
+    try:
+        async for message, _ in builder.compile().astream({"messages": []}, stream_mode="messages"):
+            tokens.append(message.content)
+    except TimeoutError as e:
+        return tokens, e
+    return tokens, None
+
+
+def make_gateway(model, **kwargs) -> LLMGateway:
+    options = {"timeout_seconds": 1.0, "max_retries": 2, "base_delay": 0.001, "max_delay": 0.002}
+    return LLMGateway(model, **{**options, **kwargs})
+
+
+MESSAGES = [HumanMessage(content="hi")]
+
+
+async def test_retries_transient_errors():
+    model = ScriptedModel(TimeoutError(), TimeoutError(), 0)
+    gateway = make_gateway(model)
+
+    result = await gateway.ainvoke(MESSAGES)
+
+    assert result.content == "reply 3"
+    assert gateway.stats()["unknown.retries"] == 2
+
+
+async def test_gives_up_after_max_retries_and_skips_non_retryable():
+    gateway = make_gateway(ScriptedModel(TimeoutError()), max_retries=1)
+    with pytest.raises(TimeoutError):
+        await gateway.ainvoke(MESSAGES)
+    assert gateway.model.calls == 2
+
+    gateway = make_gateway(ScriptedModel(ValueError("bad request")))
+    with pytest.raises(ValueError):
+        await gateway.ainvoke(MESSAGES)
+    assert gateway.model.calls == 1
+
+
+async def test_streamed_node_retries_before_first_token():
+    """流式节点尚未推送 token 时仍可重试"""
+    model = FlakyStreamingModel(failures=[0])
+    gateway = make_gateway(model)
+
+    tokens, error = await stream_writer(gateway)
+
+    assert error is None
+    assert model.calls == 2
+    assert "".join(tokens) == "a b c"
+
+
+async def test_streamed_node_not_retried_after_partial_output():
+    """流式节点中途失败时不重试，客户端不会收到重复 token"""
+    model = FlakyStreamingModel(failures=[2])
+    gateway = make_gateway(model)
+
+    tokens, error = await stream_writer(gateway)
+
+    assert isinstance(error, TimeoutError)
+    assert model.calls == 1
+    assert tokens == ["a", " b"]
+    assert gateway.stats()["writer.retries"] == 0
+
+
+async def test_attempt_timeout_triggers_retry():
+    model = ScriptedModel(5, 0)
+    gateway = make_gateway(model, timeout_seconds=0.05)
+
+    result = await gateway.ainvoke(MESSAGES)
+
+    assert result.content == "reply 2"
+
+
+async def test_deadline_limits_calls():
+    model = ScriptedModel(0)
+    gateway = make_gateway(model, min_budget_seconds=1.0)
+
+    with request_deadline(0.5), pytest.raises(DeadlineExceeded):
+        await gateway.ainvoke(MESSAGES)
+    assert model.calls == 0
+
+
+async def test_hedged_request_wins_over_slow_primary():
+    model = ScriptedModel(2.0, 0.01)
+    gateway = make_gateway(
+        model, timeout_seconds=5, hedge_enabled=True, hedge_min_samples=3, hedge_min_delay=0.05
+    )
+    gateway.nodes["unknown"] = NodeLatency()
+    gateway.nodes["unknown"].samples.extend([0.02, 0.03, 0.04])
+
+    start = time.perf_counter()
+    result = await gateway.ainvoke(MESSAGES)
+
+    assert result.content == "reply 2"
+    assert time.perf_counter() - start < 0.5
+    stats = gateway.stats()
+    assert stats["unknown.hedges"] == 1
+    assert stats["unknown.hedge_wins"] == 1
+
+
+async def test_reviewer_finishes_when_deadline_exhausted():
+    from src.app.agents.specialized_nodes import reviewer_agent
+
+    state = {"messages": [HumanMessage(content="问题")], "current_answer": "回答", "iteration": 1}
+    with patch("src.app.agents.specialized_nodes.llm") as mock_llm:
+        mock_llm.ainvoke = AsyncMock(side_effect=DeadlineExceeded("请求剩余 0.2s"))
+        result = await reviewer_agent(state)
+
+    assert result["is_satisfied"] is True
+    assert result["next_agent"] == "end"
+    assert "剩余" in result["early_stop_reason"]
+
+
+async def test_routes_calls_by_role():
+    default, small = ScriptedModel(0), ScriptedModel(0)
+    gateway = make_gateway(default, models={"check": small})
+
+    await gateway.ainvoke(MESSAGES, role="check")
+    await gateway.ainvoke(MESSAGES, role="review")
+    await gateway.ainvoke(MESSAGES)
+
+    assert small.calls == 1
+    assert default.calls == 2
+
+
+def test_get_llm_uses_role_settings_with_fallback():
+    from src.app.core.config import settings
+    from src.app.services.llm import get_llm
+
+    with patch.multiple(
+        settings, check_model="small-model", check_max_tokens=5, check_temperature=0.0
+    ):
+        check = get_llm("check")
+    generate = get_llm("generate")
+
+    assert check.model_name == "small-model"
+    assert check.max_tokens == 5
+    assert check.temperature == 0.0
+    assert check.openai_api_base == generate.openai_api_base == settings.deepseek_base_url
+    assert generate.model_name == settings.deepseek_model
+    assert generate.max_tokens is None
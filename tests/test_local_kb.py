@@ -0,0 +1,158 @@
+"""本地知识库测试"""
+
+import numpy as np
+
+from src.app.services.knowledge import KnowledgeService
+from src.app.services.local_kb import Chunk, LocalKnowledgeBase, chunk_text, load_documents
+from src.app.services.local_kb.ann import IVFIndex
+
+CORPUS = [
+    Chunk("LangGraph 是用于构建有状态智能体的框架，支持循环与检查点。", "langgraph.md"),
+    Chunk("FastAPI 是高性能的 Python Web 框架，基于 Starlette 与 Pydantic。", "fastapi.md"),
+    Chunk("BM25 是经典的稀疏检索排序函数，依赖词频与逆文档频率。", "bm25.md"),
+    Chunk("Reciprocal rank fusion merges rankings from several retrievers.", "rrf.md"),
+]
+
+
+def test_chunk_text_respects_size_and_overlap():
+    text = "# 标题\n\n" + "。".join(f"第{i}句内容比较长一些" for i in range(60)) + "。"
+    chunks = chunk_text(text, "doc.md", chunk_size=80, overlap=10)
+
+    assert len(chunks) > 1
+    assert all(len(c.content) <= 80 for c in chunks)
+    assert all(c.source == "doc.md" for c in chunks)
+    assert chunks[1].content.startswith(chunks[0].content[-10:])
+
+
+def test_chunk_text_keeps_numbers_urls_and_filenames_intact():
+    """英文标点只在其后为空白或结尾时断句，不切开小数、URL 与文件名"""
+    sentence = "Pi is 3.14159 and the docs live at https://example.com/a.html. Edit config.yaml first! 然后重启。下一步"
+    text = " ".join([sentence] * 6)
+    chunks = chunk_text(text, "doc.md", chunk_size=120, overlap=0)
+    lines = [line for c in chunks for line in c.content.split("\n")]
+
+    assert len(chunks) > 1
+    assert "Pi is 3.14159 and the docs live at https://example.com/a.html." in lines
+    assert "Edit config.yaml first!" in lines
+    assert "然后重启。" in lines
+
+
+def test_load_documents_walks_directory(tmp_path):
+    (tmp_path / "a.md").write_text("# A\n\n内容 A", encoding="utf-8")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.txt").write_text("内容 B", encoding="utf-8")
+    (tmp_path / "ignored.bin").write_bytes(b"\x00")
+
+    docs = dict(load_documents([tmp_path]))
+
+    assert set(docs) == {str(tmp_path / "a.md"), str(tmp_path / "sub" / "b.txt")}
+
+
+def test_build_and_reload(tmp_path):
+    LocalKnowledgeBase.build(CORPUS, tmp_path, dim=64)
+    kb = LocalKnowledgeBase(tmp_path)
+
+    assert len(kb) == len(CORPUS)
+    assert kb.text(2) == CORPUS[2].content
+
+
+def test_bm25_ranks_matching_chunk_first(tmp_path):
+    kb = LocalKnowledgeBase.build(CORPUS, tmp_path, dim=64)
+
+    hits = kb.search_bm25("FastAPI Web 框架", k=3)
+
+    assert hits[0][0] == 1
+    assert kb.search_bm25("完全无关zzz", k=3) == []
+
+
+def test_hybrid_search_returns_knowledge_dicts(tmp_path):
+    kb = LocalKnowledgeBase.build(CORPUS, tmp_path, dim=64)
+
+    results = kb.search("reciprocal rank fusion", max_results=2)
+
+    assert results[0]["source"] == "rrf.md"
+    assert 0 < results[0]["score"] <= 1
+    assert set(results[0]) == {"content", "source", "score"}
+    assert len(results) <= 2
+
+
+async def test_knowledge_service_local_backend(tmp_path):
+    service = KnowledgeService(cache_ttl_seconds=60, cache_max_entries=8, backend="tavily")
+    service.backend = "local"
+    service.local_kb = LocalKnowledgeBase.build(CORPUS, tmp_path, dim=64)
+
+    results = await service.search("LangGraph 检查点")
+
+    assert results[0]["source"] == "langgraph.md"
+    assert service.cache_stats()["upstream_calls"] == 1
+
+
+def random_unit_vectors(count: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_ivf_full_probe_matches_exact(tmp_path):
+    vectors = random_unit_vectors(500)
+    index = IVFIndex.build(vectors, tmp_path, nlist=10)
+    query = vectors[7]
+
+    hits = index.search(query, k=5, nprobe=index.nlist)
+
+    expected = np.argsort(-(vectors @ query))[:5]
+    assert [i for i, _ in hits] == expected.tolist()
+
+
+def test_ivf_incremental_add_remove_persist(tmp_path):
+    vectors = random_unit_vectors(200)
+    index = IVFIndex.build(vectors[:100], tmp_path, nlist=4)
+
+    index.add(np.arange(100, 200), vectors[100:])
+    index.remove([3, 150])
+    assert len(index) == 198
+    assert index.search(vectors[150], k=1, nprobe=4)[0][0] != 150
+    assert index.search(vectors[120], k=1, nprobe=4)[0][0] == 120
+
+    index.save()
+    reloaded = IVFIndex(tmp_path)
+    assert len(reloaded) == 198
+    assert reloaded.search(vectors[3], k=1, nprobe=4)[0][0] != 3
+    assert reloaded.search(vectors[120], k=1, nprobe=4)[0][0] == 120
+
+
+def test_ivf_add_new_ids_does_not_tombstone(tmp_path):
+    vectors = random_unit_vectors(60)
+    index = IVFIndex.build(vectors[:50], tmp_path, nlist=2)
+
+    index.add(np.arange(50, 60), vectors[50:])
+    index.add([5], vectors[5:6])
+    assert index.deleted == {5}
+    assert len(index) == 60
+
+    index.remove([55, 999])
+    index.save()
+    reloaded = IVFIndex(tmp_path)
+    assert reloaded.deleted == set()
+    assert len(reloaded) == 59
+    assert reloaded.search(vectors[5], k=1, nprobe=2)[0][0] == 5
+
+
+def test_ivf_tombstones_persist_without_compaction(tmp_path):
+    vectors = random_unit_vectors(50)
+    index = IVFIndex.build(vectors, tmp_path, nlist=2)
+
+    index.remove([0])
+    index.save()
+
+    reloaded = IVFIndex(tmp_path)
+    assert reloaded.deleted == {0}
+    assert len(reloaded.list_ids) == 50
+    assert reloaded.search(vectors[0], k=1, nprobe=2)[0][0] != 0
+
+
+def test_local_kb_with_ivf_index(tmp_path):
+    LocalKnowledgeBase.build(CORPUS, tmp_path, dim=64, ivf_nlist=2)
+    kb = LocalKnowledgeBase(tmp_path, vector_index="ivf", nprobe=2)
+
+    assert kb.ann is not None
+    assert kb.search("reciprocal rank fusion", max_results=1)[0]["source"] == "rrf.md"
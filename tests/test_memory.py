@@ -0,0 +1,228 @@
+"""会话记忆测试"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.app.agents.graph import build_graph
+from src.app.agents.memory import ConversationMemory, open_checkpointer
+from src.app.core.config import settings
+
+
+async def test_history_persisted_per_conversation(mock_llm):
+    """同一 conversation_id 的后续轮次能看到历史消息"""
+    memory = ConversationMemory()
+    memory.agent = build_graph(InMemorySaver())
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(content="你好，我是助手"),  # 第 1 轮 Writer（问候语由本地路由判定）
+            AIMessage(content="SATISFIED"),
+            AIMessage(content="你刚才说了你好"),  # 第 2 轮 Writer
+            AIMessage(content="SATISFIED"),
+        ]
+    )
+    config = memory.config("conv-1")
+
+    await memory.agent.ainvoke(memory.turn_input("你好"), config=config)
+    result = await memory.agent.ainvoke(memory.turn_input("谢谢"), config=config)
+
+    contents = [m.content for m in result["messages"]]
+    assert contents == ["你好", "你好，我是助手", "谢谢", "你刚才说了你好"]
+    assert result["iteration"] == 1
+    # 第 2 轮 Writer 收到了完整历史
+    writer_messages = mock_llm.ainvoke.await_args_list[2].args[0]
+    assert [m.content for m in writer_messages[1:]] == contents[:3]
+
+    other = await memory.agent.aget_state(memory.config("conv-2"))
+    assert not other.values
+
+
+async def test_knowledge_context_reused_across_turns(mock_llm):
+    """后续问题被已有检索上下文覆盖时不再检索"""
+    memory = ConversationMemory()
+    memory.agent = build_graph(InMemorySaver())
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(content="回答一"),
+            AIMessage(content="SATISFIED"),
+            AIMessage(content="回答二"),
+            AIMessage(content="SATISFIED"),
+        ]
+    )
+    config = memory.config("conv-kb")
+
+    with patch("src.app.agents.specialized_nodes.knowledge_service") as mock_ks:
+        mock_ks.search = AsyncMock(
+            return_value=[
+                {
+                    "content": "2024年诺贝尔物理学奖授予霍普菲尔德和辛顿",
+                    "source": "https://a.com",
+                    "score": 0.9,
+                }
+            ]
+        )
+        await memory.agent.ainvoke(
+            memory.turn_input("2024年诺贝尔物理学奖是谁获得的"), config=config
+        )
+        result = await memory.agent.ainvoke(
+            memory.turn_input("2024年诺贝尔物理学奖"), config=config
+        )
+
+    mock_ks.search.assert_awaited_once()
+    assert result["need_knowledge"] is True
+    assert "霍普菲尔德" in result["knowledge_context"]
+
+
+async def test_knowledge_context_scoped_to_turn(mock_llm):
+    """本轮未检索时不沿用上一轮的检索上下文，历史 passage 仍保留"""
+    memory = ConversationMemory()
+    memory.agent = build_graph(InMemorySaver())
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[
+            AIMessage(content="回答一"),
+            AIMessage(content="SATISFIED"),
+            AIMessage(content="你好"),
+            AIMessage(content="SATISFIED"),
+        ]
+    )
+    config = memory.config("conv-scope")
+
+    with patch("src.app.agents.specialized_nodes.knowledge_service") as mock_ks:
+        mock_ks.search = AsyncMock(
+            return_value=[
+                {
+                    "content": "2024年诺贝尔物理学奖授予霍普菲尔德和辛顿",
+                    "source": "https://a.com",
+                    "score": 0.9,
+                }
+            ]
+        )
+        await memory.agent.ainvoke(
+            memory.turn_input("2024年诺贝尔物理学奖是谁获得的"), config=config
+        )
+        result = await memory.agent.ainvoke(memory.turn_input("你好"), config=config)
+
+    assert result["need_knowledge"] is False
+    assert result["knowledge_context"] == ""
+    assert len(result["knowledge_passages"]) == 1
+    writer_system_prompt = mock_llm.ainvoke.await_args_list[2].args[0][0].content
+    assert "霍普菲尔德" not in writer_system_prompt
+
+
+async def test_knowledge_passages_capped(mock_llm):
+    """多轮检索累积的 passage 不超过 memory_max_passages"""
+    memory = ConversationMemory()
+    memory.agent = build_graph(InMemorySaver())
+
+    def reply(_messages, role="generate", **_kwargs):
+        return AIMessage(content="YES" if role == "check" else "SATISFIED")
+
+    mock_llm.ainvoke = AsyncMock(side_effect=reply)
+    config = memory.config("conv-cap")
+    questions = ["2024年诺贝尔物理学奖是谁获得的", "量子纠缠的原理是什么", "黑洞是如何形成的"]
+
+    with (
+        patch.object(settings, "memory_max_passages", 3),
+        patch.object(settings, "memory_context_reuse_coverage", 1.1),
+        patch("src.app.agents.specialized_nodes.knowledge_service") as mock_ks,
+    ):
+        for turn, question in enumerate(questions):
+            mock_ks.search = AsyncMock(
+                return_value=[
+                    {
+                        "content": f"资料 {turn}-{i}",
+                        "source": f"https://{turn}-{i}.com",
+                        "score": 0.5 + i / 10,
+                    }
+                    for i in range(2)
+                ]
+            )
+            result = await memory.agent.ainvoke(memory.turn_input(question), config=config)
+
+    contents = {p["content"] for p in result["knowledge_passages"]}
+    assert len(contents) == 3
+    # 本轮检索结果优先保留
+    assert {"资料 2-0", "资料 2-1"} <= contents
+    assert "资料 2-1" in result["knowledge_context"]
+
+
+async def test_long_history_compacted(mock_llm):
+    """历史超过阈值时压缩为摘要，并移除旧消息"""
+    memory = ConversationMemory()
+    memory.agent = build_graph(InMemorySaver())
+    config = memory.config("conv-long")
+    mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="SATISFIED"))
+
+    with (
+        patch.object(settings, "memory_max_history_tokens", 10),
+        patch.object(settings, "memory_keep_messages", 2),
+    ):
+        for text in ["你好", "谢谢", "再见"]:
+            await memory.agent.ainvoke(memory.turn_input(text), config=config)
+
+        mock_llm.ainvoke = AsyncMock(
+            side_effect=[
+                AIMessage(content="用户打了招呼并道谢"),  # 压缩
+                AIMessage(content="好的"),  # Writer
+                AIMessage(content="SATISFIED"),  # Reviewer
+            ]
+        )
+        result = await memory.agent.ainvoke(memory.turn_input("好的"), config=config)
+
+    assert result["conversation_summary"] == "用户打了招呼并道谢"
+    assert [m.content for m in result["messages"]] == ["再见", "SATISFIED", "好的", "好的"]
+    writer_system_prompt = mock_llm.ainvoke.await_args_list[1].args[0][0].content
+    assert "用户打了招呼并道谢" in writer_system_prompt
+
+
+async def test_sqlite_checkpointer_persists(tmp_path, mock_llm):
+    """sqlite 后端跨实例保留会话"""
+    db_path = str(tmp_path / "ckpt" / "checkpoints.sqlite")
+    mock_llm.ainvoke = AsyncMock(
+        side_effect=[AIMessage(content="你好"), AIMessage(content="SATISFIED")]
+    )
+
+    async with open_checkpointer("sqlite", db_path) as saver:
+        graph = build_graph(saver)
+        await graph.ainvoke(
+            ConversationMemory.turn_input("你好"), config=ConversationMemory.config("c")
+        )
+
+    async with open_checkpointer("sqlite", db_path) as saver:
+        state = await build_graph(saver).aget_state(ConversationMemory.config("c"))
+
+    assert [m.content for m in state.values["messages"]] == ["你好", "你好"]
+
+
+async def test_unknown_backend():
+    with pytest.raises(ValueError):
+        async with open_checkpointer("redis"):
+            pass
+
+
+def test_chat_endpoint_with_conversation_id():
+    """启用会话记忆时 /chat 按 conversation_id 调用持久化 Agent 且不走回答缓存"""
+    from fastapi.testclient import TestClient
+
+    from src.app.main import app
+
+    with (
+        patch.object(settings, "checkpointer", "memory"),
+        patch("src.app.main.build_graph") as mock_build,
+        TestClient(app) as client,
+    ):
+        mock_agent = mock_build.return_value
+        mock_agent.ainvoke = AsyncMock(
+            return_value={
+                "messages": [HumanMessage(content="你好"), AIMessage(content="回复")],
+                "iteration": 1,
+            }
+        )
+        for _ in range(2):
+            response = client.post("/chat", json={"message": "你好", "conversation_id": "abc"})
+            assert response.json()["cached"] is False
+
+    assert mock_agent.ainvoke.await_count == 2
+    assert mock_agent.ainvoke.await_args.kwargs["config"] == {"configurable": {"thread_id": "abc"}}
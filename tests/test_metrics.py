@@ -0,0 +1,75 @@
+"""运行指标测试"""
+
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from prometheus_client import REGISTRY
+
+from src.app.core.metrics import LLMMetricsHandler, register_stats, trace_request
+
+
+async def test_llm_handler_records_tokens_per_node():
+    """LLM 回调按节点记录 token 与耗时"""
+    handler = LLMMetricsHandler()
+    run_id = uuid4()
+    before = (
+        REGISTRY.get_sample_value("rag_llm_tokens_total", {"node": "writer", "kind": "completion"})
+        or 0.0
+    )
+
+    with trace_request() as spans:
+        await handler.on_chat_model_start(
+            {}, [[]], run_id=run_id, metadata={"langgraph_node": "writer"}
+        )
+        await handler.on_llm_end(
+            LLMResult(
+                generations=[[ChatGeneration(message=AIMessage(content="hi"))]],
+                llm_output={"token_usage": {"prompt_tokens": 12, "completion_tokens": 3}},
+            ),
+            run_id=run_id,
+        )
+
+    assert spans[0]["kind"] == "llm"
+    assert spans[0]["name"] == "writer"
+    assert spans[0]["prompt_tokens"] == 12
+    after = REGISTRY.get_sample_value(
+        "rag_llm_tokens_total", {"node": "writer", "kind": "completion"}
+    )
+    assert after - before == 3
+
+
+def test_metrics_endpoint_exposes_component_stats():
+    from src.app.main import app
+
+    register_stats("test_component", lambda: {"hits": 7, "label": "ignored"})
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert 'rag_component_stat{component="test_component",stat="hits"} 7.0' in response.text
+    assert "rag_node_duration_seconds" in response.text
+
+
+def test_chat_debug_timings(mock_llm):
+    """debug 模式下 ChatResponse 附带节点耗时明细"""
+    from src.app.main import app
+
+    mock_llm.ainvoke.side_effect = [AIMessage(content="你好！"), AIMessage(content="SATISFIED")]
+
+    response = TestClient(app).post("/chat", json={"message": "你好", "debug": True})
+
+    timings = response.json()["timings"]
+    nodes = [t["name"] for t in timings if t["kind"] == "node"]
+    assert nodes == ["searcher", "writer", "reviewer", "finalize"]
+    assert all(t["duration_ms"] >= 0 for t in timings if "duration_ms" in t)
+
+
+def test_chat_without_debug_has_no_timings(mock_llm):
+    from src.app.main import app
+
+    mock_llm.ainvoke.side_effect = [AIMessage(content="你好！"), AIMessage(content="SATISFIED")]
+
+    response = TestClient(app).post("/chat", json={"message": "你好"})
+
+    assert response.json()["timings"] is None
@@ -0,0 +1,145 @@
+"""检索结果重排序测试"""
+
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from src.app.agents.context import render_context
+from src.app.services.reranker import CrossEncoderScorer, LexicalScorer, Reranker, build_scorer
+
+
+def make_passage(content: str, source: str, score: float) -> dict:
+    return {"content": content, "source": source, "score": score, "round": 0, "hash": source}
+
+
+PASSAGES = [
+    make_passage("Python 是一门通用编程语言。", "a", 0.9),
+    make_passage("LangGraph 的检查点 (checkpointer) 用于持久化图状态。", "b", 0.5),
+    make_passage("今天天气晴朗，适合出游。", "c", 0.7),
+]
+
+
+def test_lexical_scorer_prefers_matching_passage():
+    scores = LexicalScorer().score(
+        "LangGraph checkpointer 怎么持久化状态", [p["content"] for p in PASSAGES]
+    )
+
+    assert int(np.argmax(scores)) == 1
+
+
+async def test_rerank_orders_context_and_limits_passages():
+    reranker = Reranker(LexicalScorer(), top_k=1, budget_ms=1000)
+
+    passages = await reranker.rerank("LangGraph checkpointer", PASSAGES)
+    context = render_context(passages, max_passages=reranker.max_passages)
+
+    assert all("rerank_score" in p for p in passages)
+    assert context.startswith("[来源: b]")
+    assert "[来源: a]" not in context
+
+
+async def test_rerank_timeout_falls_back_to_original_order():
+    class SlowScorer:
+        def score(self, _question: str, passages: list[str]) -> np.ndarray:
+            time.sleep(0.2)
+            return np.arange(len(passages), dtype=np.float32)
+
+    reranker = Reranker(SlowScorer(), top_k=2, budget_ms=10)
+    stale = [{**p, "rerank_score": 1.0} for p in PASSAGES]
+
+    passages = await reranker.rerank("q", stale)
+
+    assert all("rerank_score" not in p for p in passages)
+    assert render_context(passages, max_passages=2).startswith("[来源: a]")
+    assert reranker.stats()["timeouts"] == 1
+
+
+async def test_rerank_error_falls_back():
+    class BrokenScorer:
+        def score(self, _question: str, _passages: list[str]) -> np.ndarray:
+            raise RuntimeError("model missing")
+
+    reranker = Reranker(BrokenScorer())
+
+    passages = await reranker.rerank("q", PASSAGES)
+
+    assert passages == PASSAGES
+    assert reranker.stats()["errors"] == 1
+
+
+async def test_rerank_off_is_passthrough():
+    reranker = Reranker(build_scorer("off"))
+
+    assert await reranker.rerank("q", PASSAGES) is PASSAGES
+    assert reranker.max_passages is None
+
+
+async def test_rerank_busy_falls_back_without_queueing():
+    """超时的打分仍占着线程，线程池占满时后续请求直接退回原排序"""
+    release = threading.Event()
+
+    class BlockingScorer:
+        def score(self, _question: str, passages: list[str]) -> np.ndarray:
+            release.wait(5)
+            return np.arange(len(passages), dtype=np.float32)
+
+    reranker = Reranker(BlockingScorer(), budget_ms=10, workers=1)
+    try:
+        await reranker.rerank("q", PASSAGES)
+        passages = await reranker.rerank("q", PASSAGES)
+    finally:
+        release.set()
+        reranker.close()
+
+    assert passages == PASSAGES
+    assert reranker.stats()["timeouts"] == 1
+    assert reranker.stats()["busy"] == 1
+
+
+async def test_rerank_submit_failure_releases_slot():
+    """提交到线程池失败时归还名额，之后的请求不会被误判为繁忙"""
+
+    class ClosedPool:
+        def submit(self, *_args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    reranker = Reranker(LexicalScorer(), budget_ms=1000, workers=1)
+    with patch.object(reranker, "_get_executor", return_value=ClosedPool()):
+        passages = await reranker.rerank("q", PASSAGES)
+    reranked = await reranker.rerank("q", PASSAGES)
+    reranker.close()
+
+    assert passages == PASSAGES
+    assert reranker.stats()["errors"] == 1
+    assert reranker.stats()["busy"] == 0
+    assert all("rerank_score" in p for p in reranked)
+
+
+async def test_cross_encoder_loaded_once_at_warmup():
+    """模型在 warmup 时加载一次，并发加载不会重复创建"""
+    created = []
+
+    class FakeCrossEncoder:
+        def __init__(self, name: str) -> None:
+            time.sleep(0.05)
+            created.append(name)
+
+        def predict(self, pairs, **_kwargs):
+            return [float(len(p)) for _, p in pairs]
+
+    scorer = CrossEncoderScorer("fake-model")
+    reranker = Reranker(scorer, budget_ms=1000, workers=2)
+    with patch.dict(
+        sys.modules, {"sentence_transformers": SimpleNamespace(CrossEncoder=FakeCrossEncoder)}
+    ):
+        await asyncio.gather(reranker.warmup(), asyncio.to_thread(scorer.load))
+        passages = await reranker.rerank("q", PASSAGES)
+    reranker.close()
+
+    assert created == ["fake-model"]
+    assert all("rerank_score" in p for p in passages)
@@ -0,0 +1,33 @@
+"""评审结论解析测试"""
+
+from src.app.agents.review import parse_review
+
+
+def test_parses_json_verdict_with_surrounding_text():
+    text = '```json\n{"satisfied": false, "score": 6, "missing_info": "缺少复杂度分析", "needs_search": false}\n```'
+    verdict = parse_review(text)
+
+    assert verdict.satisfied is False
+    assert verdict.score == 6
+    assert verdict.missing_info == "缺少复杂度分析"
+    assert verdict.needs_search is False
+
+
+def test_parses_truncated_json_field_by_field():
+    verdict = parse_review(
+        '{"satisfied": false, "score": 12, "needs_search": true, "missing_info": "缺少 2024 年'
+    )
+
+    assert verdict.satisfied is False
+    assert verdict.score == 10
+    assert verdict.needs_search is True
+    assert verdict.missing_info == "缺少 2024 年"
+
+
+def test_falls_back_to_keywords():
+    assert parse_review("SATISFIED").satisfied is True
+
+    verdict = parse_review("NEEDS_IMPROVEMENT\n缺少示例")
+    assert verdict.satisfied is False
+    assert verdict.needs_search is True
+    assert verdict.missing_info == "缺少示例"
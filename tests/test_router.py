@@ -0,0 +1,101 @@
+"""检索前置路由测试"""
+
+from unittest.mock import AsyncMock
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.app.agents.router import (
+    HashedLogisticClassifier,
+    KnowledgeRouter,
+    RuleBasedClassifier,
+    evaluate,
+)
+from src.app.agents.specialized_nodes import searcher_agent
+
+
+def test_rules_small_talk_is_no():
+    classifier = RuleBasedClassifier()
+    for text in ["你好", "谢谢！", "Hello", "1+1=?"]:
+        assert classifier.classify(text) is False, text
+
+
+def test_rules_factual_is_yes():
+    classifier = RuleBasedClassifier()
+    for text in ["2024年诺贝尔物理学奖是谁获得的", "帮我搜索一下 LangGraph", "今天北京天气"]:
+        assert classifier.classify(text) is True, text
+
+
+def test_rules_explicit_search_phrases_are_yes():
+    classifier = RuleBasedClassifier()
+    for text in ["search for LangGraph docs", "Please look up RRF", "能上网查一下吗", "Google it"]:
+        assert classifier.classify(text) is True, text
+
+
+def test_rules_mentions_of_search_fall_back():
+    """只是提到搜索/价格的普通问题不强制走检索"""
+    classifier = RuleBasedClassifier()
+    for text in [
+        "二分搜索的时间复杂度是多少",
+        "SQL 查询怎么优化",
+        "How does binary search work?",
+        "Explain how a search engine ranks pages",
+        "Why is a google-style index fast",
+        "What does priceless mean",
+        "Explain enterprise-priced licensing",
+    ]:
+        assert classifier.classify(text) is None, text
+
+
+def test_rules_uncertain_falls_back():
+    assert RuleBasedClassifier().classify("解释一下快速排序") is None
+
+
+def test_logistic_classifier_fit_and_roundtrip(tmp_path):
+    """逻辑回归在训练集上学到判定，保存后加载结果一致"""
+    texts = ["讲个笑话", "写首诗", "介绍一下量子计算的最新进展", "某公司的财报数据"] * 5
+    labels = [False, False, True, True] * 5
+    model = HashedLogisticClassifier(lower=0.3, upper=0.7).fit(texts, labels)
+
+    assert evaluate(model, list(zip(texts, labels, strict=True)))["accuracy"] == 1.0
+
+    path = tmp_path / "router.npz"
+    model.save(path)
+    loaded = HashedLogisticClassifier.load(path)
+    assert loaded.classify("讲个笑话") == model.classify("讲个笑话")
+
+
+def test_router_stats_and_decision_log(tmp_path):
+    log_path = tmp_path / "decisions.jsonl"
+    router = KnowledgeRouter(RuleBasedClassifier(), decision_log_path=str(log_path))
+
+    assert router.decide("你好") is False
+    assert router.decide("解释一下快速排序") is None
+    router.record_llm_decision("解释一下快速排序", False)
+
+    stats = router.stats()
+    assert stats["short_circuit_no"] == 1
+    assert stats["llm_fallbacks"] == 1
+    assert stats["short_circuit_rate"] == 0.5
+    assert '"label": false' in log_path.read_text(encoding="utf-8")
+
+
+async def test_searcher_skips_llm_for_greeting(mock_llm):
+    """问候语不调用 LLM 判断"""
+    mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="YES"))
+
+    result = await searcher_agent({"messages": [HumanMessage(content="你好")], "iteration": 0})
+
+    assert result["need_knowledge"] is False
+    mock_llm.ainvoke.assert_not_awaited()
+
+
+async def test_searcher_falls_back_to_llm(mock_llm):
+    """规则无法判定时回退 LLM"""
+    mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="NO"))
+
+    result = await searcher_agent(
+        {"messages": [HumanMessage(content="解释一下快速排序")], "iteration": 0}
+    )
+
+    assert result["need_knowledge"] is False
+    mock_llm.ainvoke.assert_awaited_once()
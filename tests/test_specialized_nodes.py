@@ -48,3 +48,239 @@ async def test_reviewer_agent_satisfied(mock_llm):
     result = await reviewer_agent(state)
     assert result["is_satisfied"] is True
     assert result["next_agent"] == "end"
+
+
+@pytest.mark.asyncio
+async def test_searcher_speculative_search_used(mock_llm):
+    """投机检索：判断与检索并发，判断为 YES 时直接使用检索结果"""
+    import asyncio
+
+    from src.app.agents import specialized_nodes
+    from src.app.core.config import settings
+
+    # 两边都要等到对方已开始才返回：串行执行时先启动的一方会等待超时
+    check_started = asyncio.Event()
+    search_started = asyncio.Event()
+
+    async def slow_check(*_args, **_kwargs):
+        check_started.set()
+        await asyncio.wait_for(search_started.wait(), timeout=1)
+        return AIMessage(content="YES")
+
+    async def slow_search(_query, *_args, **_kwargs):
+        search_started.set()
+        await asyncio.wait_for(check_started.wait(), timeout=1)
+        return [{"content": "资料", "source": "https://example.com", "score": 0.9}]
+
+    mock_llm.ainvoke = AsyncMock(side_effect=slow_check)
+    state = {"messages": [HumanMessage(content="解释一下快速排序")], "iteration": 0}
+
+    with (
+        patch.object(settings, "speculative_search", True),
+        patch.object(specialized_nodes, "knowledge_service") as mock_ks,
+        patch.dict(specialized_nodes.speculation_stats, {"launched": 0, "used": 0}),
+    ):
+        mock_ks.search = AsyncMock(side_effect=slow_search)
+        result = await searcher_agent(state)
+
+        assert specialized_nodes.speculation_stats["used"] == 1
+
+    assert result["need_knowledge"] is True
+    assert "资料" in result["knowledge_context"]
+    mock_ks.search.assert_awaited_once_with("解释一下快速排序")
+
+
+@pytest.mark.asyncio
+async def test_searcher_speculative_search_wasted(mock_llm):
+    """投机检索：判断为 NO 时取消检索并计入浪费"""
+    import asyncio
+
+    from src.app.agents import specialized_nodes
+    from src.app.core.config import settings
+
+    cancelled = asyncio.Event()
+
+    async def hanging_search(_query, *_args, **_kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def quick_check(*_args, **_kwargs):
+        await asyncio.sleep(0.01)
+        return AIMessage(content="NO")
+
+    mock_llm.ainvoke = AsyncMock(side_effect=quick_check)
+    state = {"messages": [HumanMessage(content="解释一下快速排序")], "iteration": 0}
+
+    with (
+        patch.object(settings, "speculative_search", True),
+        patch.object(specialized_nodes, "knowledge_service") as mock_ks,
+        patch.dict(specialized_nodes.speculation_stats, {"launched": 0, "wasted": 0}),
+    ):
+        mock_ks.search = AsyncMock(side_effect=hanging_search)
+        result = await searcher_agent(state)
+        await asyncio.sleep(0)
+
+        assert specialized_nodes.speculation_stats["launched"] == 1
+        assert specialized_nodes.speculation_stats["wasted"] == 1
+
+    assert result["need_knowledge"] is False
+    assert result["knowledge_context"] == ""
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_searcher_wasted_speculation_failure_is_retrieved(mock_llm):
+    """作废的投机检索在取消过程中抛出的异常被取走，事件循环不再报未取走异常"""
+    import asyncio
+    import gc
+
+    from src.app.agents import specialized_nodes
+    from src.app.core.config import settings
+
+    async def failing_search(_query, *_args, **_kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # 如上游连接在取消时关闭失败
+            raise RuntimeError("tavily connection reset") from None
+
+    async def quick_check(*_args, **_kwargs):
+        await asyncio.sleep(0.01)
+        return AIMessage(content="NO")
+
+    unretrieved = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda _loop, context: unretrieved.append(context))
+    mock_llm.ainvoke = AsyncMock(side_effect=quick_check)
+    state = {"messages": [HumanMessage(content="解释一下快速排序")], "iteration": 0}
+
+    try:
+        with (
+            patch.object(settings, "speculative_search", True),
+            patch.object(specialized_nodes, "knowledge_service") as mock_ks,
+            patch.dict(specialized_nodes.speculation_stats, {"wasted": 0}),
+        ):
+            mock_ks.search = AsyncMock(side_effect=failing_search)
+            result = await searcher_agent(state)
+            await asyncio.sleep(0)
+            assert specialized_nodes.speculation_stats["wasted"] == 1
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert result["need_knowledge"] is False
+    assert unretrieved == []
+
+
+@pytest.mark.asyncio
+async def test_reviewer_skips_llm_when_answer_converged(mock_llm):
+    """无新增来源且回答几乎未变时不再调用 LLM 复审"""
+    answer = "LangGraph 是一个用于构建有状态多智能体应用的框架。" * 5
+    state = {
+        "messages": [HumanMessage(content="什么是 LangGraph")],
+        "current_answer": answer + "。",
+        "previous_answer": answer,
+        "knowledge_context": "",
+        "new_sources": 0,
+        "iteration": 2,
+    }
+    mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="NEEDS_IMPROVEMENT"))
+
+    result = await reviewer_agent(state)
+
+    assert result["next_agent"] == "end"
+    assert "相似度" in result["early_stop_reason"]
+    mock_llm.ainvoke.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_reviewer_reviews_when_new_sources_added(mock_llm):
+    """有新增来源时照常复审"""
+    answer = "LangGraph 是一个框架。"
+    state = {
+        "messages": [HumanMessage(content="什么是 LangGraph")],
+        "current_answer": answer,
+        "previous_answer": answer,
+        "knowledge_context": "新资料",
+        "new_sources": 2,
+        "iteration": 2,
+    }
+    mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content="SATISFIED"))
+
+    result = await reviewer_agent(state)
+
+    assert "early_stop_reason" not in result
+    mock_llm.ainvoke.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_searcher_multi_query_fans_out_and_fuses(mock_llm):
+    """多查询检索：一次拆出子查询，并发检索后融合去重"""
+    import asyncio
+
+    from src.app.agents import specialized_nodes
+    from src.app.core.config import settings
+    from src.app.services.knowledge import KnowledgeService
+
+    replies = iter([AIMessage(content="YES"), AIMessage(content="1. 快速排序 原理\n2. 快速排序 复杂度")])
+    mock_llm.ainvoke = AsyncMock(side_effect=lambda *_a, **_k: next(replies))
+
+    running = 0
+    peak = 0
+
+    async def upstream(query, *_args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        shared = {"content": "快速排序是分治算法", "source": "https://a.com", "score": 0.9}
+        return [shared, {"content": f"{query} 的资料", "source": f"https://{len(query)}.com/{query}", "score": 0.5}]
+
+    service = KnowledgeService(cache_ttl_seconds=0, cache_max_entries=0, backend="tavily")
+    service.client = AsyncMock()
+    service._search_upstream = upstream
+    state = {"messages": [HumanMessage(content="解释一下快速排序")], "iteration": 0}
+
+    with (
+        patch.object(settings, "multi_query_count", 3),
+        patch.object(settings, "multi_query_concurrency", 2),
+        patch.object(specialized_nodes, "knowledge_service", service),
+    ):
+        result = await searcher_agent(state)
+
+    contents = [p["content"] for p in result["knowledge_passages"]]
+    assert mock_llm.ainvoke.await_count == 2
+    assert contents.count("快速排序是分治算法") == 1
+    assert "快速排序 原理 的资料" in contents
+    assert "快速排序 复杂度 的资料" in contents
+    assert result["new_sources"] == 4
+    # 原问题一路 + 最多 2 个并发子查询
+    assert peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_reviewer_skips_search_when_no_new_knowledge_needed(mock_llm):
+    """结构化评审：needs_search=false 时直接回到 Writer"""
+    state = {
+        "messages": [HumanMessage(content="解释一下快速排序")],
+        "current_answer": "快速排序是一种排序算法。",
+        "knowledge_context": "快速排序是分治算法",
+        "new_sources": 1,
+        "iteration": 1,
+    }
+    mock_llm.ainvoke = AsyncMock(
+        return_value=AIMessage(
+            content='{"satisfied": false, "score": 5, "missing_info": "补充分治过程", "needs_search": false}'
+        )
+    )
+
+    result = await reviewer_agent(state)
+
+    assert result["next_agent"] == "writer"
+    assert result["reflection"] == "补充分治过程"
+    assert result["new_sources"] == 0
+    assert mock_llm.ainvoke.await_args.kwargs["response_format"] == {"type": "json_object"}